@@ -12,7 +12,8 @@ export { GroundHeatmap } from './ground-heatmap';
 export { colorize, interpolateRamp, COLOR_RAMPS } from './metric-colorizer';
 
 // Data
-export { extractArea, checkHealth } from './osm-loader';
+export { extractArea, extractAreaStreamed, applyHeightsPatch, checkHealth } from './osm-loader';
+export type { ExtractOptions, ExtractStageEvent, HeightsPatch } from './osm-loader';
 
 // Utils
 export { wgs84ToLocal, degreesToMeters, bboxAreaM2, bboxCenter } from './coordinate-utils';
@@ -1,19 +1,48 @@
-import type { BBox, FragmentPackage } from '@collage/proto-types';
+import type {
+  BBox,
+  BuildingCollection,
+  BuildingProperties,
+  FragmentMetadata,
+  FragmentPackage,
+  StandardFragmentProfile,
+  StreetCollection,
+  TessellationCellCollection,
+} from '@collage/proto-types';
 
 const DEFAULT_TIMEOUT_MS = 180_000;
 
+export interface ExtractOptions {
+  buffer_m?: number;
+  include_heights?: boolean;
+  include_tessellation?: boolean;
+  include_metrics?: boolean;
+  include_space_syntax?: boolean;
+  timeout_ms?: number;
+}
+
+/** Height attributes patched onto already-streamed buildings, one array per column. */
+export interface HeightsPatch {
+  id: string[];
+  height_m: (number | null)[];
+  floor_count: (number | null)[];
+  height_source: BuildingProperties['height_source'][];
+}
+
+/** One NDJSON line from POST /extract/stream. */
+export type ExtractStageEvent =
+  | { stage: 'buildings'; step: 1; data: BuildingCollection }
+  | { stage: 'streets'; step: 2; data: StreetCollection }
+  | { stage: 'heights'; step: 3; data: HeightsPatch | null }
+  | { stage: 'tessellation'; step: 4; data: TessellationCellCollection | null }
+  | { stage: 'metrics'; step: 5; data: StandardFragmentProfile | null }
+  | { stage: 'done'; metadata: FragmentMetadata }
+  | { stage: 'error'; detail: string };
+
 /** Extract OSM data for a bounding box via the Python backend. */
 export async function extractArea(
   bbox: BBox,
   backendUrl = 'http://localhost:8000',
-  options: {
-    buffer_m?: number;
-    include_heights?: boolean;
-    include_tessellation?: boolean;
-    include_metrics?: boolean;
-    include_space_syntax?: boolean;
-    timeout_ms?: number;
-  } = {},
+  options: ExtractOptions = {},
 ): Promise<FragmentPackage> {
   const controller = new AbortController();
   const timeout = setTimeout(
@@ -25,14 +54,7 @@ export async function extractArea(
     const response = await fetch(`${backendUrl}/extract`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({
-        bbox,
-        buffer_m: options.buffer_m ?? 200,
-        include_heights: options.include_heights ?? true,
-        include_tessellation: options.include_tessellation ?? true,
-        include_metrics: options.include_metrics ?? true,
-        include_space_syntax: options.include_space_syntax ?? true,
-      }),
+      body: extractBody(bbox, options),
       signal: controller.signal,
     });
 
@@ -47,6 +69,111 @@ export async function extractArea(
   }
 }
 
+/**
+ * Extract OSM data via POST /extract/stream, calling `onStage` as each
+ * pipeline stage arrives (buildings first, metrics last). Resolves with the
+ * assembled FragmentPackage once the backend reports `done`.
+ */
+export async function extractAreaStreamed(
+  bbox: BBox,
+  onStage: (event: ExtractStageEvent) => void,
+  backendUrl = 'http://localhost:8000',
+  options: ExtractOptions = {},
+): Promise<FragmentPackage> {
+  const controller = new AbortController();
+  const timeout = setTimeout(
+    () => controller.abort(),
+    options.timeout_ms ?? DEFAULT_TIMEOUT_MS,
+  );
+
+  try {
+    const response = await fetch(`${backendUrl}/extract/stream`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: extractBody(bbox, options),
+      signal: controller.signal,
+    });
+
+    if (!response.ok || !response.body) {
+      const text = await response.text();
+      throw new Error(`Backend error ${response.status}: ${text}`);
+    }
+
+    const pkg: Partial<FragmentPackage> = {
+      tessellation: { type: 'FeatureCollection', features: [] },
+      blocks: { type: 'FeatureCollection', features: [] },
+    };
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffered = '';
+
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffered += value;
+      const lines = buffered.split('\n');
+      buffered = lines.pop() ?? '';
+      for (const line of lines) {
+        if (!line.trim()) continue;
+        const event = JSON.parse(line) as ExtractStageEvent;
+        applyStageEvent(pkg, event);
+        onStage(event);
+        if (event.stage === 'done') return pkg as FragmentPackage;
+      }
+    }
+    throw new Error('Extraction stream ended before completion');
+  } finally {
+    clearTimeout(timeout);
+  }
+}
+
+function applyStageEvent(pkg: Partial<FragmentPackage>, event: ExtractStageEvent): void {
+  switch (event.stage) {
+    case 'buildings':
+      pkg.buildings = event.data;
+      break;
+    case 'streets':
+      pkg.streets = event.data;
+      break;
+    case 'heights':
+      if (event.data && pkg.buildings) applyHeightsPatch(pkg.buildings, event.data);
+      break;
+    case 'tessellation':
+      if (event.data) pkg.tessellation = event.data;
+      break;
+    case 'metrics':
+      if (event.data) pkg.metrics = event.data;
+      break;
+    case 'done':
+      pkg.metadata = event.metadata;
+      break;
+    case 'error':
+      throw new Error(`Backend error: ${event.detail}`);
+  }
+}
+
+/** Apply a columnar heights patch to buildings in place. */
+export function applyHeightsPatch(buildings: BuildingCollection, patch: HeightsPatch): void {
+  const index = new Map(patch.id.map((id, i) => [id, i]));
+  for (const feature of buildings.features) {
+    const i = index.get(feature.properties.id);
+    if (i === undefined) continue;
+    feature.properties.height_m = patch.height_m[i];
+    feature.properties.floor_count = patch.floor_count[i];
+    feature.properties.height_source = patch.height_source[i];
+  }
+}
+
+function extractBody(bbox: BBox, options: ExtractOptions): string {
+  return JSON.stringify({
+    bbox,
+    buffer_m: options.buffer_m ?? 200,
+    include_heights: options.include_heights ?? true,
+    include_tessellation: options.include_tessellation ?? true,
+    include_metrics: options.include_metrics ?? true,
+    include_space_syntax: options.include_space_syntax ?? true,
+  });
+}
+
 /** Check backend health. */
 export async function checkHealth(
   backendUrl = 'http://localhost:8000',
@@ -9,7 +9,7 @@ import type {
 } from '@collage/proto-types';
 import type { Map as MaplibreMap } from 'maplibre-gl';
 import { create } from 'zustand';
-import { extractArea } from './osm-loader';
+import { applyHeightsPatch, extractAreaStreamed } from './osm-loader';
 
 export interface MapStore {
   // Map state
@@ -45,7 +45,7 @@ export interface MapStore {
   reset(): void;
 }
 
-export const useMapStore = create<MapStore>((set) => ({
+export const useMapStore = create<MapStore>((set, get) => ({
   // Initial state
   map: null,
   isLoading: false,
@@ -70,7 +70,24 @@ export const useMapStore = create<MapStore>((set) => ({
   async extract(bbox, backendUrl) {
     set({ isLoading: true, error: null, selectedBbox: bbox });
     try {
-      const data = await extractArea(bbox, backendUrl);
+      // Render each layer as soon as its pipeline stage arrives
+      const data = await extractAreaStreamed(
+        bbox,
+        (event) => {
+          if (event.stage === 'buildings') {
+            set({ buildings: event.data.features as BuildingFeature[] });
+          } else if (event.stage === 'heights' && event.data) {
+            const patched = { type: 'FeatureCollection' as const, features: get().buildings };
+            applyHeightsPatch(patched, event.data);
+            set({ buildings: [...patched.features] });
+          } else if (event.stage === 'streets') {
+            set({ streets: event.data.features as StreetFeature[] });
+          } else if (event.stage === 'tessellation' && event.data) {
+            set({ tessellation: event.data.features as TessellationCellFeature[] });
+          }
+        },
+        backendUrl,
+      );
       set({
         buildings: data.buildings.features as BuildingFeature[],
         streets: data.streets.features as StreetFeature[],
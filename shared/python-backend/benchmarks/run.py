@@ -0,0 +1,238 @@
+"""Benchmark every service per FRAGMENT_SIZES tier on synthetic cities.
+
+Usage (from shared/python-backend):
+    python -m benchmarks.run                                  # all tiers, grid layout
+    python -m benchmarks.run --tiers small medium --layouts grid organic
+    python -m benchmarks.run --cases tessellation morphometrics --repeat 5
+    python -m benchmarks.run --save-baseline                  # refresh benchmarks/baseline.json
+
+Each (layout, tier) fixture — buildings, streets and their tessellation — is
+generated once and cached as GeoParquet under benchmarks/results/fixtures.
+Every case then runs in a fresh process so its peak RSS is its own. Results
+go to --out as JSON. When a baseline exists, cases slower than
+baseline × (1 + --tolerance) are listed as regressions and the exit status is 1.
+"""
+
+import argparse
+import json
+import platform
+import resource
+import sys
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import geopandas as gpd
+
+from benchmarks.synthetic import LAYOUTS
+from collage_backend.config import FRAGMENT_SIZES
+
+BENCH_DIR = Path(__file__).parent
+RESULTS_DIR = BENCH_DIR / "results"
+FIXTURES_DIR = RESULTS_DIR / "fixtures"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+
+# Differences below this are noise, whatever the ratio
+MIN_REGRESSION_S = 0.05
+
+
+def _tessellation(layers: dict) -> None:
+    from collage_backend.services.tessellation import compute_tessellation
+
+    compute_tessellation(layers["buildings"], layers["streets"])
+
+
+def _morphometrics(layers: dict) -> None:
+    from collage_backend.services.morphometrics import compute_all_metrics
+
+    compute_all_metrics(layers["buildings"], layers["streets"], layers["tessellation"])
+
+
+def _sustainability(layers: dict) -> None:
+    from collage_backend.services.sustainability import compute_sustainability_metrics
+
+    compute_sustainability_metrics(layers["buildings"], layers["streets"], layers["tessellation"])
+
+
+def _classification(layers: dict) -> None:
+    from collage_backend.services.classification import (
+        classify_gmm,
+        classify_lcz,
+        classify_spacematrix,
+    )
+
+    classify_spacematrix(layers["buildings"], layers["tessellation"])
+    classify_lcz(layers["buildings"], layers["tessellation"])
+    classify_gmm(layers["buildings"], layers["tessellation"])
+
+
+def _space_syntax(layers: dict) -> None:
+    from collage_backend.services.space_syntax import compute_space_syntax
+
+    compute_space_syntax(layers["streets"])
+
+
+def _isochrone(layers: dict) -> None:
+    from collage_backend.services.fragment_ops import compute_isochrone
+
+    minx, miny, maxx, maxy = layers["streets"].total_bounds
+    compute_isochrone(layers["streets"], ((minx + maxx) / 2, (miny + maxy) / 2))
+
+
+def _relocate(layers: dict) -> None:
+    from collage_backend.services.fragment_ops import relocate_fragment
+
+    relocate_fragment(
+        {"buildings": layers["buildings"], "streets": layers["streets"]},
+        (-0.1276, 51.5072),
+    )
+
+
+def _geojson_io(layers: dict) -> None:
+    from collage_backend.utils.io import gdf_to_geojson, geojson_to_gdf
+
+    for name in ("buildings", "streets", "tessellation"):
+        geojson_to_gdf(gdf_to_geojson(layers[name]))
+
+
+CASES: dict[str, Callable[[dict], None]] = {
+    "tessellation": _tessellation,
+    "morphometrics": _morphometrics,
+    "sustainability": _sustainability,
+    "classification": _classification,
+    "space_syntax": _space_syntax,
+    "isochrone": _isochrone,
+    "relocate": _relocate,
+    "geojson_io": _geojson_io,
+}
+
+
+def load_fixture(layout: str, tier: str) -> dict[str, gpd.GeoDataFrame]:
+    """Buildings/streets/tessellation for a tier, generated on first use."""
+    paths = {
+        name: FIXTURES_DIR / f"{layout}-{tier}-{name}.parquet"
+        for name in ("buildings", "streets", "tessellation")
+    }
+    if all(p.exists() for p in paths.values()):
+        return {name: gpd.read_parquet(p) for name, p in paths.items()}
+
+    from collage_backend.services.tessellation import compute_tessellation
+
+    buildings, streets = LAYOUTS[layout](FRAGMENT_SIZES[tier])
+    layers = {
+        "buildings": buildings,
+        "streets": streets,
+        "tessellation": compute_tessellation(buildings, streets),
+    }
+    FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+    for name, gdf in layers.items():
+        gdf.to_parquet(paths[name])
+    return layers
+
+
+def _run_case(layout: str, tier: str, case: str, repeat: int) -> dict:
+    """Child-process entry point: time one case and report its peak RSS."""
+    layers = load_fixture(layout, tier)
+    rss_before = _peak_rss_mb()
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        CASES[case](layers)
+        timings.append(time.perf_counter() - t0)
+    return {
+        "layout": layout,
+        "tier": tier,
+        "buildings": len(layers["buildings"]),
+        "case": case,
+        "seconds": round(min(timings), 4),
+        "seconds_all": [round(t, 4) for t in timings],
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "rss_delta_mb": round(_peak_rss_mb() - rss_before, 1),
+    }
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def compare(runs: list[dict], baseline: dict, tolerance: float) -> list[dict]:
+    """Runs slower than their baseline entry by more than tolerance."""
+    reference = {(r["layout"], r["tier"], r["case"]): r for r in baseline.get("runs", [])}
+    regressions = []
+    for run in runs:
+        ref = reference.get((run["layout"], run["tier"], run["case"]))
+        if ref is None:
+            continue
+        limit = ref["seconds"] * (1 + tolerance)
+        if run["seconds"] > limit and run["seconds"] - ref["seconds"] > MIN_REGRESSION_S:
+            regressions.append({**run, "baseline_seconds": ref["seconds"],
+                                "ratio": round(run["seconds"] / ref["seconds"], 2)})
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tiers", nargs="+", choices=list(FRAGMENT_SIZES), default=list(FRAGMENT_SIZES))
+    parser.add_argument("--layouts", nargs="+", choices=list(LAYOUTS), default=["grid"])
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (min is kept)")
+    parser.add_argument("--out", type=Path, default=RESULTS_DIR / "latest.json")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    runs = []
+    # One fresh interpreter per case keeps peak RSS measurements independent
+    with ProcessPoolExecutor(
+        max_workers=1, max_tasks_per_child=1, mp_context=get_context("spawn")
+    ) as pool:
+        for layout in args.layouts:
+            for tier in args.tiers:
+                try:
+                    load_fixture(layout, tier)
+                except Exception as e:
+                    # A broken fixture fails its own cases, not the whole run
+                    for case in args.cases:
+                        run = {"layout": layout, "tier": tier, "case": case,
+                               "error": f"fixture: {e}"}
+                        runs.append(run)
+                        print(json.dumps(run))
+                    continue
+                for case in args.cases:
+                    try:
+                        run = pool.submit(_run_case, layout, tier, case, args.repeat).result()
+                    except Exception as e:
+                        run = {"layout": layout, "tier": tier, "case": case, "error": str(e)}
+                    runs.append(run)
+                    print(json.dumps(run))
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "runs": runs,
+    }
+    ok_runs = [r for r in runs if "error" not in r]
+    if args.baseline.exists():
+        report["regressions"] = compare(ok_runs, json.loads(args.baseline.read_text()), args.tolerance)
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps({**report, "runs": ok_runs, "regressions": []}, indent=2))
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    for reg in report.get("regressions", []):
+        print(f"REGRESSION {reg['layout']}/{reg['tier']}/{reg['case']}: "
+              f"{reg['seconds']}s vs {reg['baseline_seconds']}s (x{reg['ratio']})")
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""Synthetic city fixtures for offline benchmarks (no network access needed).
+
+Layouts are generated in a local metric CRS around CENTER and returned in
+WGS84 with the same columns extraction.py produces, so they can be fed to
+any service exactly like an /extract result.
+"""
+
+import math
+
+import geopandas as gpd
+import numpy as np
+from shapely.affinity import rotate
+from shapely.geometry import LineString, box
+
+from collage_backend.utils.crs import custom_tmerc
+
+CENTER = (2.17, 41.39)  # Barcelona, lon/lat
+BLOCK_SIZE_M = 100.0
+STREET_HALF_WIDTH_M = 8.0
+BUILDINGS_PER_SIDE = 3  # buildings per block = BUILDINGS_PER_SIDE ** 2
+
+
+def grid_city(
+    n_buildings: int,
+    block_size: float = BLOCK_SIZE_M,
+    seed: int = 0,
+) -> tuple[gpd.GeoDataFrame, gpd.GeoDataFrame]:
+    """Orthogonal street grid with a regular lattice of buildings per block.
+
+    Returns (buildings, streets) in EPSG:4326.
+    """
+    rng = np.random.default_rng(seed)
+    per_block = BUILDINGS_PER_SIDE ** 2
+    side = math.ceil(math.sqrt(math.ceil(n_buildings / per_block)))
+    extent = side * block_size
+
+    # One segment per block edge, so every junction is a shared end point and
+    # stays exact through the WGS84 round trip (full-length lines crossing
+    # mid-segment drift apart and merge boundary enclosures)
+    coords = np.arange(side + 1) * block_size
+    streets = [
+        LineString([(x, coords[j]), (x, coords[j + 1])]) for x in coords for j in range(side)
+    ]
+    streets += [
+        LineString([(coords[i], y), (coords[i + 1], y)]) for y in coords for i in range(side)
+    ]
+
+    # Buildings on a lattice inside each block, with jittered size and tilt
+    inner = block_size - 2 * STREET_HALF_WIDTH_M
+    cell = inner / BUILDINGS_PER_SIDE
+    footprints = []
+    for bx in range(side):
+        for by in range(side):
+            origin = np.array([bx, by]) * block_size + STREET_HALF_WIDTH_M
+            for i in range(BUILDINGS_PER_SIDE):
+                for j in range(BUILDINGS_PER_SIDE):
+                    w, h = cell * rng.uniform(0.5, 0.85, 2)
+                    cx, cy = origin + (np.array([i, j]) + 0.5) * cell
+                    footprint = box(cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2)
+                    # Tilted a little: momepy's Voronoi cells for exactly aligned
+                    # boxes come out split and swapped between buildings
+                    footprints.append(rotate(footprint, rng.uniform(-2, 2)))
+
+    return _to_layers(footprints[:n_buildings], streets, extent, rng)
+
+
+def organic_city(
+    n_buildings: int,
+    block_size: float = BLOCK_SIZE_M,
+    jitter: float = 0.25,
+    seed: int = 0,
+) -> tuple[gpd.GeoDataFrame, gpd.GeoDataFrame]:
+    """Irregular street mesh with rotated buildings of varied size.
+
+    Grid nodes are displaced by up to `jitter` × block_size (jitter < 0.5),
+    streets bend at a wobbled midpoint, and buildings sit on a lattice mapped
+    bilinearly into each (non-rectangular) block, so no two footprints overlap.
+
+    Returns (buildings, streets) in EPSG:4326.
+    """
+    rng = np.random.default_rng(seed)
+    per_block = BUILDINGS_PER_SIDE ** 2
+    side = math.ceil(math.sqrt(math.ceil(n_buildings / per_block)))
+    extent = side * block_size
+
+    grid = np.arange(side + 1) * block_size
+    nodes = np.stack(np.meshgrid(grid, grid, indexing="ij"), axis=-1)
+    nodes[1:-1, 1:-1] += rng.uniform(-jitter, jitter, (side - 1, side - 1, 2)) * block_size
+
+    def wobbly(a, b):
+        mid = (a + b) / 2 + rng.normal(0, jitter * block_size / 6, 2)
+        return LineString([a, mid, b])
+
+    streets = [wobbly(nodes[i, j], nodes[i, j + 1]) for i in range(side + 1) for j in range(side)]
+    streets += [wobbly(nodes[i, j], nodes[i + 1, j]) for i in range(side) for j in range(side + 1)]
+
+    # Lattice positions in [0, 1]² leave a street margin on every side
+    margin = STREET_HALF_WIDTH_M / block_size + 0.1
+    lattice = margin + (np.arange(BUILDINGS_PER_SIDE) + 0.5) / BUILDINGS_PER_SIDE * (1 - 2 * margin)
+    # Sized for the most squeezed block so rotated footprints never overlap
+    cell = block_size * (1 - 2 * margin) * (1 - 2 * jitter) / BUILDINGS_PER_SIDE
+    footprints = []
+    for bx in range(side):
+        for by in range(side):
+            p00, p10 = nodes[bx, by], nodes[bx + 1, by]
+            p01, p11 = nodes[bx, by + 1], nodes[bx + 1, by + 1]
+            for u in lattice:
+                for v in lattice:
+                    cx, cy = (
+                        (1 - u) * (1 - v) * p00 + u * (1 - v) * p10
+                        + (1 - u) * v * p01 + u * v * p11
+                    )
+                    w, h = cell * rng.uniform(0.35, 0.6, 2)
+                    footprint = box(cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2)
+                    footprints.append(rotate(footprint, rng.uniform(0, 90)))
+
+    return _to_layers(footprints[:n_buildings], streets, extent, rng)
+
+
+LAYOUTS = {"grid": grid_city, "organic": organic_city}
+
+
+def _to_layers(
+    footprints: list,
+    streets: list,
+    extent: float,
+    rng: np.random.Generator,
+) -> tuple[gpd.GeoDataFrame, gpd.GeoDataFrame]:
+    """Wrap metric geometries (origin at the layout corner) as WGS84 layers."""
+    crs = custom_tmerc(*CENTER)
+    offset = extent / 2
+
+    heights = rng.choice([3.0, 6.0, 9.0, 12.0, 15.0, 21.0, 30.0], size=len(footprints))
+    buildings = gpd.GeoDataFrame(
+        {
+            "id": [f"b{i:06d}" for i in range(len(footprints))],
+            "height_m": heights,
+            "floor_count": np.round(heights / 3.0),
+            "use": "residential",
+            "height_source": "synthetic",
+        },
+        geometry=gpd.GeoSeries(footprints).translate(-offset, -offset).to_numpy(),
+        crs=crs,
+    ).to_crs("EPSG:4326")
+
+    streets_gdf = gpd.GeoDataFrame(
+        {
+            "id": [f"s{i:06d}" for i in range(len(streets))],
+            "name": None,
+            "highway": "residential",
+            "width_m": 2 * STREET_HALF_WIDTH_M,
+            "lanes": 2,
+            "oneway": False,
+        },
+        geometry=gpd.GeoSeries(streets).translate(-offset, -offset).to_numpy(),
+        crs=crs,
+    ).to_crs("EPSG:4326")
+    return buildings, streets_gdf
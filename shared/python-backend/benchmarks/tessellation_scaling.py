@@ -0,0 +1,66 @@
+"""Tiled tessellation scaling with worker count.
+
+Usage (from shared/python-backend):
+    python -m benchmarks.tessellation_scaling --buildings 10000 100000 --workers 1 2 4 8
+
+Prints one line per run and writes all runs to --out as JSON. Speedup is
+relative to the 1-worker run at the same size; near-linear scaling means
+speedup ≈ workers.
+"""
+
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+from benchmarks.synthetic import grid_city
+from collage_backend.services.tessellation import compute_tessellation
+from collage_backend.utils.crs import ProjectionContext
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--buildings", type=int, nargs="+", default=[5000, 20000, 100000])
+    parser.add_argument(
+        "--workers", type=int, nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+    )
+    parser.add_argument("--out", type=Path, default=Path("benchmarks/results/tessellation_scaling.json"))
+    args = parser.parse_args()
+
+    runs = []
+    for n in args.buildings:
+        buildings, streets = grid_city(n)
+        ctx = ProjectionContext.for_layers(buildings)
+        # Project once up front so the timings are tessellation only
+        buildings, streets = ctx.project(buildings), ctx.project(streets)
+        baseline = None
+        for workers in args.workers:
+            t0 = time.perf_counter()
+            try:
+                tess = compute_tessellation(buildings, streets, n_jobs=workers, tiled=True, ctx=ctx)
+            except Exception as e:
+                # One failing size/worker count should not lose the other runs
+                run = {"buildings": n, "workers": workers, "error": str(e)}
+                runs.append(run)
+                print(json.dumps(run))
+                continue
+            elapsed = time.perf_counter() - t0
+            baseline = baseline or elapsed
+            run = {
+                "buildings": n,
+                "workers": workers,
+                "cells": len(tess),
+                "seconds": round(elapsed, 3),
+                "speedup": round(baseline / elapsed, 2),
+            }
+            runs.append(run)
+            print(json.dumps(run))
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps({"cpu_count": os.cpu_count(), "runs": runs}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
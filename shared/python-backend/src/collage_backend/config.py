@@ -5,22 +5,63 @@ from pathlib import Path
 # Paths
 DATA_DIR = Path(__file__).parent.parent.parent.parent.parent / "data"
 FIXTURES_DIR = DATA_DIR / "fixtures"
+CACHE_DIR = DATA_DIR / "cache"
+FRAGMENT_DIR = DATA_DIR / "fragments"  # saved fragments (GMM training corpus)
+FRAGMENT_CATALOG_PATH = FRAGMENT_DIR / "catalog.sqlite"  # index of saved fragments
 
 # CRS
 DEFAULT_CRS = "EPSG:4326"
 
 # Extraction defaults
+OSM_SOURCE = "overpass"  # "overpass" (live) or "local" (LOCAL_OSM_PATH)
+LOCAL_OSM_PATH = DATA_DIR / "osm"  # .osm.pbf file or dir with buildings/streets.parquet
+LOCAL_OSM_CACHE_SIZE = 2  # loaded local extracts kept in memory (LRU)
 DEFAULT_BUFFER_M = 200
 DEFAULT_HEIGHT_M = 9.0
 DEFAULT_FLOOR_HEIGHT_M = 3.0
+HEIGHT_KNN_K = 5  # tagged neighbours averaged by kNN height imputation
+HEIGHT_KNN_MAX_DISTANCE_M = 250.0  # farthest neighbour considered (centroid distance)
+
+# Local height datasets: HEIGHT_DATA_DIR/<region>/<dataset>/**/*.parquet (WGS84 GeoParquet)
+HEIGHT_DATA_DIR = DATA_DIR / "heights"
+HEIGHT_DATASETS = ("overture", "gba")  # dataset subdirectories, in priority order
+HEIGHT_COLUMN = "height"  # height column (meters) in every dataset
+HEIGHT_JOIN_MIN_OVERLAP = 0.3  # min share of a building a matched footprint must cover
+HEIGHT_PARTITION_CACHE_SIZE = 64  # decoded partitions kept in memory (LRU)
+
+# Extraction jobs (POST /extract/jobs)
+JOB_MAX_WORKERS = 2
+JOB_TTL_S = 3600
 
 # Tessellation
 TESSELLATION_SEGMENT = 1.0
 TESSELLATION_SIMPLIFY = True
 TESSELLATION_N_JOBS = -1
+TESSELLATION_TILE_BUILDINGS = 2000  # target buildings per tile in tiled mode
+
+# Stage cache for /extract (GeoParquet per stage, LRU by last access)
+STAGE_CACHE_ENABLED = True
+STAGE_CACHE_MAX_BYTES = 2 * 1024**3
+STAGE_CACHE_MAX_AGE_S = 7 * 24 * 3600
+
+# Saved fragments: rows per Parquet row group (smaller = finer bbox pushdown)
+FRAGMENT_ROW_GROUP_SIZE = 8192
+
+# Tracing: per-stage tracemalloc peaks (slows allocation-heavy stages noticeably)
+TRACE_MEMORY = False
+
+# GMM classification models (fitted on saved fragments, see services/gmm_registry.py)
+GMM_MODEL_DIR = DATA_DIR / "models" / "gmm"
+GMM_FIT_MAX_SAMPLES = 200_000  # buildings sampled for a full fit
+GMM_REFIT_BATCH_SIZE = 50_000  # buildings per warm-start mini-batch
 
 # Space syntax radii (meters)
 SPACE_SYNTAX_RADII = [400, 800, 1600, 10000]
+SPACE_SYNTAX_NETWORK_CACHE_SIZE = 8  # built networks kept in memory (LRU)
+SPACE_SYNTAX_N_JOBS = -1  # worker processes for the scipy fallback (-1 = all CPUs)
+
+# Street graphs (CSR + KD-tree) kept in memory for isochrone queries (LRU)
+STREET_GRAPH_CACHE_SIZE = 8
 
 # Fragment size thresholds (building count)
 FRAGMENT_SIZES = {
@@ -29,3 +70,6 @@ FRAGMENT_SIZES = {
     "large": 2000,
     "stress": 5000,
 }
+
+# Tiled (multi-process) tessellation kicks in above the stress tier
+TESSELLATION_TILE_THRESHOLD = FRAGMENT_SIZES["stress"]
@@ -9,10 +9,13 @@ from collage_backend.routes import (
     extract,
     fragment,
     heights,
+    jobs,
     metrics,
+    monitoring,
     space_syntax,
     tessellate,
 )
+from collage_backend.utils.tracing import TracingMiddleware, start_memory_tracing
 
 app = FastAPI(
     title="Collage Earth Backend",
@@ -27,16 +30,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# Per-stage spans → Server-Timing header and Prometheus histograms (GET /metrics)
+app.add_middleware(TracingMiddleware)
+start_memory_tracing()
+
 # Mount routers
 app.include_router(extract.router, tags=["extraction"])
+app.include_router(jobs.router, tags=["jobs"])
 app.include_router(heights.router, tags=["heights"])
 app.include_router(tessellate.router, tags=["tessellation"])
 app.include_router(metrics.router, tags=["metrics"])
 app.include_router(space_syntax.router, tags=["space-syntax"])
 app.include_router(classify.router, tags=["classification"])
 app.include_router(fragment.router, tags=["fragment"])
+app.include_router(monitoring.router, tags=["monitoring"])
 
 
 @app.get("/health")
@@ -1,5 +1,7 @@
 """Pydantic request models for all endpoints."""
 
+from typing import Literal
+
 from pydantic import BaseModel, Field
 
 
@@ -10,17 +12,35 @@ class ExtractRequest(BaseModel):
         ..., description="Bounding box [west, south, east, north] in WGS84"
     )
     buffer_m: float = Field(default=200, description="Buffer distance in meters")
+    source: Literal["overpass", "local"] | None = Field(
+        default=None, description="OSM source; defaults to config.OSM_SOURCE"
+    )
+    source_path: str | None = Field(
+        default=None,
+        description="Local .osm.pbf or GeoParquet directory under LOCAL_OSM_PATH for source='local'",
+    )
+    region: str = Field(
+        default="other",
+        pattern=r"^[A-Za-z0-9_-]+$",
+        description="Region for local height datasets (config.HEIGHT_DATA_DIR/<region>)",
+    )
+    simplify_streets: bool = Field(default=True, description="Simplify the street network with neatnet")
     include_heights: bool = Field(default=True)
     include_tessellation: bool = Field(default=True)
     include_metrics: bool = Field(default=True)
     include_space_syntax: bool = Field(default=True)
+    use_cache: bool = Field(default=True, description="Reuse cached stage results")
 
 
 class HeightsRequest(BaseModel):
     """Request for POST /heights."""
 
     buildings: dict = Field(..., description="GeoJSON FeatureCollection of buildings")
-    region: str = Field(default="other", description="Region hint: 'europe', 'us', or 'other'")
+    region: str = Field(
+        default="other",
+        pattern=r"^[A-Za-z0-9_-]+$",
+        description="Region for local height datasets: 'europe', 'us', 'other', ...",
+    )
 
 
 class TessellateRequest(BaseModel):
@@ -31,6 +51,24 @@ class TessellateRequest(BaseModel):
     segment: float = Field(default=1.0)
     simplify: bool = Field(default=True)
     n_jobs: int = Field(default=-1)
+    tiled: bool | None = Field(
+        default=None,
+        description="Tessellate enclosure tiles in parallel processes (None = auto above 5000 buildings)",
+    )
+
+
+class TessellateUpdateRequest(BaseModel):
+    """Request for POST /tessellate/update."""
+
+    buildings: dict = Field(..., description="GeoJSON FeatureCollection of buildings after the edit")
+    streets: dict = Field(..., description="GeoJSON FeatureCollection of streets")
+    tessellation: dict = Field(..., description="Tessellation returned for the buildings before the edit")
+    added: list[str] = Field(default=[], description="Ids of added buildings")
+    removed: list[str] = Field(default=[], description="Ids of removed buildings")
+    modified: list[str] = Field(default=[], description="Ids of moved/reshaped buildings")
+    segment: float = Field(default=1.0)
+    simplify: bool = Field(default=True)
+    n_jobs: int = Field(default=-1)
 
 
 class MomepyMetricsRequest(BaseModel):
@@ -40,6 +78,16 @@ class MomepyMetricsRequest(BaseModel):
     streets: dict = Field(..., description="GeoJSON FeatureCollection of streets")
     tessellation: dict = Field(..., description="GeoJSON FeatureCollection of tessellation cells")
     metrics: list[str] = Field(default=["all"], description="Metric keys or ['all']")
+    output_format: Literal["nested", "columnar"] = Field(
+        default="nested",
+        description="'nested' {building_id: {metric: value}} or 'columnar' {ids, columns}",
+    )
+    previous: dict | None = Field(
+        default=None, description="Result of an earlier call, for incremental recomputation"
+    )
+    changed_ids: list[str] | None = Field(
+        default=None, description="Building ids added or modified since `previous`"
+    )
 
 
 class SustainabilityMetricsRequest(BaseModel):
@@ -48,6 +96,21 @@ class SustainabilityMetricsRequest(BaseModel):
     buildings: dict = Field(..., description="GeoJSON FeatureCollection of buildings")
     streets: dict = Field(..., description="GeoJSON FeatureCollection of streets")
     tessellation: dict = Field(..., description="GeoJSON FeatureCollection of tessellation cells")
+    canyon_method: Literal["nearest", "rays"] = Field(
+        default="nearest",
+        description="'nearest' (2 × nearest-street distance) or 'rays' (facade-to-facade width)",
+    )
+    previous: dict | None = Field(
+        default=None, description="Result of an earlier call, for incremental recomputation"
+    )
+    changed_ids: list[str] | None = Field(
+        default=None, description="Building ids added or modified since `previous`"
+    )
+    previous_buildings: dict | None = Field(
+        default=None,
+        description="GeoJSON buildings `previous` was computed for; with canyon_method='rays' "
+        "they locate buildings facing removed or moved ones (else those edits recompute fully)",
+    )
 
 
 class SpaceSyntaxRequest(BaseModel):
@@ -66,6 +129,25 @@ class ClassifyRequest(BaseModel):
     methods: list[str] = Field(
         default=["spacematrix", "lcz", "gmm"], description="Classification methods"
     )
+    include_scores: bool = Field(
+        default=False,
+        description="Return Spacematrix/LCZ penalty scores and soft membership per type",
+    )
+    n_clusters: int = Field(default=5, ge=2, le=50, description="GMM cluster count (selects the model)")
+
+
+class GMMFitRequest(BaseModel):
+    """Request for POST /classify/gmm/fit."""
+
+    n_clusters: int = Field(default=5, ge=2, le=50)
+    paths: list[str] | None = Field(
+        default=None,
+        description="Saved fragment GeoParquet files under FRAGMENT_DIR (default: all of them)",
+    )
+    warm_start: bool = Field(
+        default=False,
+        description="Mini-batch refit from the current model, keeping its cluster ids",
+    )
 
 
 class FragmentSaveRequest(BaseModel):
@@ -79,6 +161,39 @@ class FragmentLoadRequest(BaseModel):
     """Request for POST /fragment/load."""
 
     path: str = Field(..., description="GeoParquet file path")
+    layers: list[Literal["buildings", "streets", "tessellation", "blocks"]] | None = Field(
+        default=None, description="Layers to load (default: all)"
+    )
+    columns: list[str] | None = Field(
+        default=None, description="Attribute columns to keep besides geometry (default: all)"
+    )
+    bbox: tuple[float, float, float, float] | None = Field(
+        default=None, description="Only features intersecting [west, south, east, north] (WGS84)"
+    )
+
+
+class FragmentCatalogRequest(BaseModel):
+    """Request for POST /fragment/catalog."""
+
+    bbox: tuple[float, float, float, float] | None = Field(
+        default=None, description="Fragments intersecting [west, south, east, north] (WGS84)"
+    )
+    city: str | None = Field(default=None, description="City name (case-insensitive)")
+    metrics: dict[str, tuple[float | None, float | None]] = Field(
+        default_factory=dict,
+        description="Summary metric ranges {name: [min, max]}; null leaves a bound open",
+    )
+    limit: int = Field(default=100, ge=1, le=1000)
+    offset: int = Field(default=0, ge=0)
+
+
+class FragmentReindexRequest(BaseModel):
+    """Request for POST /fragment/catalog/reindex."""
+
+    root: str | None = Field(
+        default=None,
+        description="Directory to scan, under config.FRAGMENT_DIR (default: all of it)",
+    )
 
 
 class FragmentRelocateRequest(BaseModel):
@@ -90,6 +205,15 @@ class FragmentRelocateRequest(BaseModel):
     )
 
 
+class FragmentRelocateBatchRequest(BaseModel):
+    """Request for POST /fragment/relocate/batch."""
+
+    fragment: dict = Field(..., description="FragmentPackage JSON")
+    target_centers: list[tuple[float, float]] = Field(
+        ..., min_length=1, description="Target centers [[lng, lat], ...] in WGS84"
+    )
+
+
 class NetworkMergeRequest(BaseModel):
     """Request for POST /network/merge."""
 
@@ -103,3 +227,20 @@ class NetworkIsochroneRequest(BaseModel):
     streets: dict = Field(..., description="Street network GeoJSON")
     origin: tuple[float, float] = Field(..., description="Origin point [lng, lat]")
     max_distance_m: float = Field(default=800, description="Maximum walk distance in meters")
+
+
+class NetworkIsochronesRequest(BaseModel):
+    """Request for POST /network/isochrones."""
+
+    streets: dict = Field(..., description="Street network GeoJSON")
+    origins: list[tuple[float, float]] = Field(
+        ..., min_length=1, description="Origin points [[lng, lat], ...]"
+    )
+    bands: list[float] = Field(
+        default=[400, 800], min_length=1, description="Walk distance bands in meters"
+    )
+    shape: Literal["edges", "concave", "convex"] = Field(
+        default="concave",
+        description="'concave'/'convex' hull the reachable streets; 'edges' buffers them (slow)",
+    )
+    buffer_m: float = Field(default=25.0, gt=0, description="Street buffer for 'edges' shapes")
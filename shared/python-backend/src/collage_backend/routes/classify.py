@@ -1,38 +1,70 @@
-"""POST /classify — Spacematrix + LCZ + GMM morphometric clustering."""
+"""POST /classify — Spacematrix + LCZ + GMM morphometric clustering.
+
+GMM models are fitted on saved fragments via /classify/gmm/fit and reused
+by every /classify call.
+"""
 
 import logging
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 
-from collage_backend.models.request import ClassifyRequest
+from collage_backend.models.request import ClassifyRequest, GMMFitRequest
 from collage_backend.services.classification import classify_gmm, classify_lcz, classify_spacematrix
-from collage_backend.utils.io import geojson_to_gdf
+from collage_backend.services.gmm_registry import get_gmm_registry
+from collage_backend.utils.crs import ProjectionContext
+from collage_backend.utils.transport import LayerBody, body_openapi, layer_body
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-@router.post("/classify")
-async def classify(req: ClassifyRequest):
+@router.post("/classify", openapi_extra=body_openapi(ClassifyRequest))
+async def classify(
+    body: LayerBody = Depends(layer_body(ClassifyRequest, ("buildings", "tessellation"))),
+):
     """Run classification (Spacematrix, LCZ, GMM clustering)."""
+    req = body.req
     try:
-        buildings_gdf = geojson_to_gdf(req.buildings)
-        tessellation_gdf = geojson_to_gdf(req.tessellation)
+        buildings_gdf = body.layers["buildings"]
+        tessellation_gdf = body.layers["tessellation"]
+        ctx = ProjectionContext.for_layers(buildings_gdf)
 
         results = {}
 
         if "spacematrix" in req.methods:
-            results["spacematrix"] = classify_spacematrix(buildings_gdf, tessellation_gdf)
+            results["spacematrix"] = classify_spacematrix(
+                buildings_gdf, tessellation_gdf, include_scores=req.include_scores, ctx=ctx
+            )
 
         if "lcz" in req.methods:
-            results["lcz"] = classify_lcz(buildings_gdf, tessellation_gdf)
+            results["lcz"] = classify_lcz(
+                buildings_gdf, tessellation_gdf, include_scores=req.include_scores, ctx=ctx
+            )
 
         if "gmm" in req.methods:
             results["gmm"] = classify_gmm(
-                buildings_gdf, tessellation_gdf, metrics_df=req.metrics or None
+                buildings_gdf, tessellation_gdf, metrics_df=req.metrics or None,
+                n_clusters=req.n_clusters, ctx=ctx,
             )
 
         return results
     except Exception as e:
         logger.exception("Classification failed")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/classify/gmm/models")
+async def list_gmm_models():
+    """Fitted GMM models (by cluster count) and the last background fit."""
+    return get_gmm_registry().status()
+
+
+@router.post("/classify/gmm/fit", status_code=202)
+async def fit_gmm_model(req: GMMFitRequest):
+    """Fit or warm-start refit a GMM on saved fragments in the background."""
+    try:
+        return get_gmm_registry().submit_fit(req.n_clusters, req.paths, req.warm_start)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
@@ -3,127 +3,130 @@
 Pipeline: OSMnx → neatnet → height cascade → tessellation → momepy metrics → space syntax.
 """
 
+import itertools
+import json
 import logging
-import time
-import uuid
+from collections.abc import Iterator
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
 from collage_backend.models.request import ExtractRequest
-from collage_backend.services.extraction import extract_buildings, extract_streets
-from collage_backend.services.height_cascade import enrich_heights
-from collage_backend.services.morphometrics import compute_summary_metrics
-from collage_backend.services.tessellation import compute_tessellation
+from collage_backend.services.local_source import InvalidSourceError
+from collage_backend.services.pipeline import (
+    PIPELINE_STAGES,
+    NoBuildingsError,
+    build_metadata,
+    iter_extract_stages,
+    run_extract,
+)
+from collage_backend.services.stage_cache import get_stage_cache
 from collage_backend.utils.io import gdf_to_geojson
+from collage_backend.utils.transport import EMPTY_FEATURE_COLLECTION, package_response
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
 @router.post("/extract")
-async def extract(req: ExtractRequest):
+def extract(req: ExtractRequest, request: Request):
     """Extract OSM data for a bounding box.
 
     Returns a FragmentPackage-compatible JSON response with buildings,
-    streets, tessellation, and basic metrics.
+    streets, tessellation, and basic metrics (or Arrow/GeoParquet layers when
+    the Accept header asks for them). Declared sync so FastAPI runs
+    the CPU-bound pipeline in its threadpool instead of on the event loop;
+    use /extract/jobs for long extractions.
     """
-    t0 = time.time()
-    bbox = tuple(req.bbox)
-
     try:
-        # Step 1: Extract buildings
-        logger.info("Step 1: Extracting buildings...")
-        buildings_gdf = extract_buildings(bbox, buffer_m=req.buffer_m)
-
-        if buildings_gdf.empty:
-            raise HTTPException(status_code=404, detail="No buildings found in bbox")
-
-        # Step 2: Extract streets
-        logger.info("Step 2: Extracting streets...")
-        streets_gdf = extract_streets(bbox, buffer_m=req.buffer_m)
-
-        # Step 3: Height enrichment
-        if req.include_heights:
-            logger.info("Step 3: Enriching heights...")
-            buildings_gdf = enrich_heights(buildings_gdf)
-
-        # Step 4: Tessellation
-        tessellation_gdf = None
-        if req.include_tessellation and not streets_gdf.empty:
-            logger.info("Step 4: Computing tessellation...")
-            try:
-                tessellation_gdf = compute_tessellation(buildings_gdf, streets_gdf)
-            except Exception as e:
-                logger.warning("Tessellation failed: %s", e)
-
-        # Step 5: Summary metrics
-        metrics = None
-        if req.include_metrics:
-            logger.info("Step 5: Computing summary metrics...")
-            try:
-                summary = compute_summary_metrics(
-                    buildings_gdf, streets_gdf,
-                    tessellation_gdf if tessellation_gdf is not None else buildings_gdf.iloc[:0],
-                )
-                metrics = {
-                    "fragment_id": str(uuid.uuid4())[:8],
-                    "computed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                    "tier1": [
-                        {"key": k, "label": k.replace("_", " ").title(), "value": v,
-                         "unit": "", "tier": 1, "category": "dimension"}
-                        for k, v in summary.items()
-                    ],
-                    "tier2": [],
-                    "tier3": [],
-                }
-            except Exception as e:
-                logger.warning("Metrics failed: %s", e)
-
-        elapsed = time.time() - t0
-        logger.info("Extraction complete in %.1fs: %d buildings, %d streets",
-                     elapsed, len(buildings_gdf), len(streets_gdf))
-
-        # Build response
-        buildings_geojson = gdf_to_geojson(buildings_gdf)
-        streets_geojson = gdf_to_geojson(streets_gdf)
-        tess_geojson = gdf_to_geojson(tessellation_gdf) if tessellation_gdf is not None else {
-            "type": "FeatureCollection", "features": []
-        }
-
-        height_coverage = (
-            (buildings_gdf["height_source"] != "type_default").sum() / len(buildings_gdf)
-            if len(buildings_gdf) > 0 else 0
-        )
+        return package_response(request, run_extract(req))
+    except InvalidSourceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except NoBuildingsError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.exception("Extraction failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
 
-        return {
-            "metadata": {
-                "id": str(uuid.uuid4())[:8],
-                "name": f"Extract {bbox[0]:.4f},{bbox[1]:.4f}",
-                "city": "unknown",
-                "country": "unknown",
-                "extracted_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
-                "crs": "EPSG:4326",
-                "bbox": list(bbox),
-                "data_sources": ["osm"],
-                "building_count": len(buildings_gdf),
-                "street_segment_count": len(streets_gdf),
-                "tessellation_cell_count": len(tessellation_gdf) if tessellation_gdf is not None else 0,
-                "quality": {
-                    "building_completeness": 1.0,
-                    "height_coverage": float(height_coverage),
-                    "street_network_connected": True,
-                    "tessellation_success": tessellation_gdf is not None,
-                },
-            },
-            "buildings": buildings_geojson,
-            "streets": streets_geojson,
-            "tessellation": tess_geojson,
-            "blocks": {"type": "FeatureCollection", "features": []},
-            "metrics": metrics,
-        }
-
-    except HTTPException:
-        raise
+@router.post("/extract/stream")
+def extract_stream(req: ExtractRequest):
+    """Extract OSM data, streaming each stage as NDJSON as soon as it completes.
+
+    One JSON object per line, in order:
+      {"stage": "buildings", "step": 1, "data": FeatureCollection}
+      {"stage": "streets", "step": 2, "data": FeatureCollection}
+      {"stage": "heights", "step": 3, "data": {"id": [...], "height_m": [...], ...} | null}
+      {"stage": "tessellation", "step": 4, "data": FeatureCollection | null}
+      {"stage": "metrics", "step": 5, "data": FragmentMetrics | null}
+      {"stage": "done", "metadata": FragmentMetadata}
+    A failure after the first line is reported as {"stage": "error", "detail": ...}.
+    """
+    stages = iter_extract_stages(req)
+    # Run step 1 before the response starts so an empty bbox is still a 404
+    try:
+        first = next(stages)
+    except InvalidSourceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except NoBuildingsError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         logger.exception("Extraction failed")
         raise HTTPException(status_code=500, detail=str(e))
+
+    return StreamingResponse(
+        _ndjson_stages(req, first, stages),
+        media_type="application/x-ndjson",
+    )
+
+
+def _ndjson_stages(
+    req: ExtractRequest,
+    first: tuple,
+    stages: Iterator[tuple],
+) -> Iterator[bytes]:
+    layers: dict = {}
+    try:
+        for name, value in itertools.chain([first], stages):
+            layers[name] = value
+            yield _ndjson(_stage_event(name, value))
+
+        buildings = layers["heights"] if layers["heights"] is not None else layers["buildings"]
+        metadata = build_metadata(
+            tuple(req.bbox), buildings, layers["streets"], layers["tessellation"]
+        )
+        yield _ndjson({"stage": "done", "metadata": metadata})
+    except Exception as e:
+        logger.exception("Streamed extraction failed")
+        yield _ndjson({"stage": "error", "detail": str(e)})
+
+
+def _stage_event(name: str, value) -> dict:
+    event = {"stage": name, "step": PIPELINE_STAGES.index(name) + 1}
+    if value is None:
+        event["data"] = None
+    elif name == "heights":
+        # Only the height attributes change; send them as a columnar patch
+        cols = ["id", "height_m", "floor_count", "height_source"]
+        event["data"] = {c: json.loads(value[c].to_json(orient="values")) for c in cols}
+    elif name in ("buildings", "streets", "tessellation"):
+        event["data"] = gdf_to_geojson(value) if len(value) else EMPTY_FEATURE_COLLECTION
+    else:
+        event["data"] = value
+    return event
+
+
+def _ndjson(obj: dict) -> bytes:
+    return (json.dumps(obj, default=str) + "\n").encode()
+
+
+@router.get("/extract/cache")
+async def extract_cache_stats():
+    """Stage cache hit/miss counters and on-disk footprint."""
+    return get_stage_cache().stats()
+
+
+@router.delete("/extract/cache")
+async def clear_extract_cache():
+    """Drop every cached stage result."""
+    return {"status": "ok", "removed": get_stage_cache().clear()}
@@ -1,32 +1,56 @@
-"""Fragment operations: save, load, relocate, network merge, isochrone."""
+"""Fragment operations: save, load, catalog, relocate, network merge, isochrone."""
 
+import json
 import logging
+from collections.abc import Iterator
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
+from collage_backend.config import FRAGMENT_DIR
 from collage_backend.models.request import (
+    FragmentCatalogRequest,
     FragmentLoadRequest,
+    FragmentReindexRequest,
+    FragmentRelocateBatchRequest,
     FragmentRelocateRequest,
     FragmentSaveRequest,
     NetworkIsochroneRequest,
+    NetworkIsochronesRequest,
     NetworkMergeRequest,
 )
+from collage_backend.services.fragment_catalog import get_fragment_catalog
 from collage_backend.services.fragment_ops import (
     compute_isochrone,
     load_fragment,
     merge_networks,
+    reindex_fragments,
     relocate_fragment,
+    relocate_fragment_batch,
     save_fragment,
 )
-from collage_backend.utils.io import geojson_to_gdf, gdf_to_geojson
+from collage_backend.services.street_graph import compute_isochrones
+from collage_backend.utils.io import resolve_under
+from collage_backend.utils.transport import (
+    LayerBody,
+    body_openapi,
+    layer_body,
+    layer_response,
+    package_geojson,
+    package_response,
+    passes_wkb_tables,
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-@router.post("/fragment/save")
-async def save_fragment_endpoint(req: FragmentSaveRequest):
-    """Save a fragment as GeoParquet."""
+@router.post("/fragment/save", openapi_extra=body_openapi(FragmentSaveRequest))
+async def save_fragment_endpoint(
+    body: LayerBody = Depends(layer_body(FragmentSaveRequest, package="fragment")),
+):
+    """Save a fragment (all layers, metadata and metrics) as GeoParquet."""
+    req = body.req
     try:
         path = save_fragment(req.fragment, req.path)
         return {"status": "ok", "path": path}
@@ -36,10 +60,14 @@ async def save_fragment_endpoint(req: FragmentSaveRequest):
 
 
 @router.post("/fragment/load")
-async def load_fragment_endpoint(req: FragmentLoadRequest):
-    """Load a fragment from GeoParquet."""
+async def load_fragment_endpoint(req: FragmentLoadRequest, request: Request):
+    """Load a fragment (optionally a subset of layers, columns and area) from GeoParquet."""
     try:
-        return load_fragment(req.path)
+        # Binary WKB clients get the stored Arrow buffers without a geometry decode
+        fragment = load_fragment(
+            req.path, req.layers, req.columns, req.bbox, decode=not passes_wkb_tables(request)
+        )
+        return package_response(request, fragment)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"File not found: {req.path}")
     except Exception as e:
@@ -47,35 +75,137 @@ async def load_fragment_endpoint(req: FragmentLoadRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/fragment/relocate")
-async def relocate_fragment_endpoint(req: FragmentRelocateRequest):
+@router.post("/fragment/catalog")
+async def fragment_catalog_endpoint(req: FragmentCatalogRequest):
+    """List saved fragments by area, city and summary metric ranges."""
+    try:
+        return get_fragment_catalog().query(
+            bbox=req.bbox,
+            city=req.city,
+            metrics=req.metrics,
+            limit=req.limit,
+            offset=req.offset,
+        )
+    except Exception as e:
+        logger.exception("Fragment catalog query failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/fragment/catalog/reindex")
+async def reindex_fragments_endpoint(req: FragmentReindexRequest):
+    """Rebuild catalog entries from the fragment files on disk.
+
+    root is resolved under FRAGMENT_DIR; 400 for a directory outside it.
+    """
+    try:
+        indexed = reindex_fragments(resolve_under(req.root or "", FRAGMENT_DIR))
+        return {"status": "ok", "indexed": indexed}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception("Fragment reindex failed")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/fragment/relocate", openapi_extra=body_openapi(FragmentRelocateRequest))
+async def relocate_fragment_endpoint(
+    request: Request,
+    body: LayerBody = Depends(layer_body(FragmentRelocateRequest, package="fragment")),
+):
     """Relocate a fragment to a new center using CRS reassignment."""
+    req = body.req
     try:
-        return relocate_fragment(req.fragment, tuple(req.target_center))
+        relocated = relocate_fragment(req.fragment, tuple(req.target_center))
+        return package_response(request, relocated)
     except Exception as e:
         logger.exception("Fragment relocation failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/network/merge")
-async def merge_networks_endpoint(req: NetworkMergeRequest):
+@router.post(
+    "/fragment/relocate/batch", openapi_extra=body_openapi(FragmentRelocateBatchRequest)
+)
+async def relocate_fragment_batch_endpoint(
+    body: LayerBody = Depends(layer_body(FragmentRelocateBatchRequest, package="fragment")),
+):
+    """Relocate a fragment to many target centers, streaming NDJSON per target.
+
+    One JSON object per line, in target order:
+      {"target": i, "center": [lng, lat], "fragment": FragmentPackage}
+    then {"done": true, "count": n}. A failure is reported as
+    {"error": detail} and ends the stream.
+    """
+    req = body.req
+    return StreamingResponse(
+        _ndjson_relocations(req.fragment, [tuple(c) for c in req.target_centers]),
+        media_type="application/x-ndjson",
+    )
+
+
+def _ndjson_relocations(fragment: dict, centers: list[tuple[float, float]]) -> Iterator[bytes]:
+    count = 0
+    try:
+        for i, (center, relocated) in enumerate(
+            zip(centers, relocate_fragment_batch(fragment, centers), strict=True)
+        ):
+            event = {"target": i, "center": list(center), "fragment": package_geojson(relocated)}
+            yield _ndjson(event)
+            count += 1
+        yield _ndjson({"done": True, "count": count})
+    except Exception as e:
+        logger.exception("Batch relocation failed")
+        yield _ndjson({"error": str(e)})
+
+
+def _ndjson(obj: dict) -> bytes:
+    return (json.dumps(obj, default=str) + "\n").encode()
+
+
+@router.post("/network/merge", openapi_extra=body_openapi(NetworkMergeRequest))
+async def merge_networks_endpoint(
+    request: Request,
+    body: LayerBody = Depends(
+        layer_body(NetworkMergeRequest, ("design_streets", "context_streets"))
+    ),
+):
     """Merge design and context street networks."""
     try:
-        design = geojson_to_gdf(req.design_streets)
-        context = geojson_to_gdf(req.context_streets)
-        merged = merge_networks(design, context)
-        return gdf_to_geojson(merged)
+        merged = merge_networks(body.layers["design_streets"], body.layers["context_streets"])
+        return layer_response(request, merged, "streets")
     except Exception as e:
         logger.exception("Network merge failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/network/isochrone")
-async def compute_isochrone_endpoint(req: NetworkIsochroneRequest):
+@router.post("/network/isochrone", openapi_extra=body_openapi(NetworkIsochroneRequest))
+async def compute_isochrone_endpoint(
+    body: LayerBody = Depends(layer_body(NetworkIsochroneRequest, ("streets",))),
+):
     """Compute walking isochrone from an origin point."""
+    req = body.req
     try:
-        streets = geojson_to_gdf(req.streets)
-        return compute_isochrone(streets, tuple(req.origin), req.max_distance_m)
+        return compute_isochrone(body.layers["streets"], tuple(req.origin), req.max_distance_m)
     except Exception as e:
         logger.exception("Isochrone computation failed")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/network/isochrones", openapi_extra=body_openapi(NetworkIsochronesRequest))
+async def compute_isochrones_endpoint(
+    request: Request,
+    body: LayerBody = Depends(layer_body(NetworkIsochronesRequest, ("streets",))),
+):
+    """Isochrone polygons for many origins and distance bands (one row per pair)."""
+    req = body.req
+    try:
+        isochrones = compute_isochrones(
+            body.layers["streets"],
+            [tuple(o) for o in req.origins],
+            req.bands,
+            shape=req.shape,
+            buffer_m=req.buffer_m,
+        )
+        return layer_response(request, isochrones, "isochrones")
+    except Exception as e:
+        logger.exception("Isochrones computation failed")
+        raise HTTPException(status_code=500, detail=str(e))
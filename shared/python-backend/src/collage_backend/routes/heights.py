@@ -2,23 +2,25 @@
 
 import logging
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 
 from collage_backend.models.request import HeightsRequest
 from collage_backend.services.height_cascade import enrich_heights
-from collage_backend.utils.io import gdf_to_geojson, geojson_to_gdf
+from collage_backend.utils.transport import LayerBody, body_openapi, layer_body, layer_response
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-@router.post("/heights")
-async def enrich_heights_endpoint(req: HeightsRequest):
+@router.post("/heights", openapi_extra=body_openapi(HeightsRequest))
+async def enrich_heights_endpoint(
+    request: Request,
+    body: LayerBody = Depends(layer_body(HeightsRequest, ("buildings",))),
+):
     """Enrich building heights using region-adaptive cascade."""
     try:
-        buildings_gdf = geojson_to_gdf(req.buildings)
-        enriched = enrich_heights(buildings_gdf, region=req.region)
-        return gdf_to_geojson(enriched)
+        enriched = enrich_heights(body.layers["buildings"], region=body.req.region)
+        return layer_response(request, enriched, "buildings")
     except Exception as e:
         logger.exception("Height enrichment failed")
         raise HTTPException(status_code=500, detail=str(e))
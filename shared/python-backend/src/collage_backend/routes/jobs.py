@@ -0,0 +1,60 @@
+"""Extraction jobs — submit, poll per-stage progress, fetch results, cancel."""
+
+import logging
+
+from fastapi import APIRouter, HTTPException, Request
+
+from collage_backend.models.request import ExtractRequest
+from collage_backend.services.jobs import Job, get_job_manager
+from collage_backend.services.local_source import InvalidSourceError, resolve_source
+from collage_backend.utils.transport import package_response
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.post("/extract/jobs", status_code=202)
+async def submit_extract_job(req: ExtractRequest):
+    """Queue an extraction; returns a job id immediately."""
+    try:
+        resolve_source(req.source, req.source_path)
+    except InvalidSourceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return get_job_manager().submit(req).to_dict()
+
+
+@router.get("/extract/jobs")
+async def list_extract_jobs():
+    """List known jobs (finished jobs expire after config.JOB_TTL_S)."""
+    return {"jobs": [job.to_dict() for job in get_job_manager().jobs()]}
+
+
+@router.get("/extract/jobs/{job_id}")
+async def get_extract_job(job_id: str):
+    """Job status with which of pipeline steps 1–5 are done."""
+    return _get_job(job_id).to_dict()
+
+
+@router.get("/extract/jobs/{job_id}/result")
+async def get_extract_job_result(job_id: str, request: Request):
+    """FragmentPackage of a finished job (GeoJSON, or binary per Accept)."""
+    job = _get_job(job_id)
+    if job.status == "done":
+        return package_response(request, job.result)
+    if job.status == "failed":
+        raise HTTPException(status_code=job.error_status or 500, detail=job.error)
+    raise HTTPException(status_code=409, detail=f"Job {job_id} is {job.status}")
+
+
+@router.delete("/extract/jobs/{job_id}")
+async def cancel_extract_job(job_id: str):
+    """Cancel a job, terminating its worker process if running."""
+    get_job_manager().cancel(job_id)
+    return _get_job(job_id).to_dict()
+
+
+def _get_job(job_id: str) -> Job:
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
@@ -2,27 +2,36 @@
 
 import logging
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 
 from collage_backend.models.request import MomepyMetricsRequest, SustainabilityMetricsRequest
 from collage_backend.services.morphometrics import compute_all_metrics
 from collage_backend.services.sustainability import compute_sustainability_metrics
-from collage_backend.utils.io import geojson_to_gdf
+from collage_backend.utils.transport import LayerBody, body_openapi, layer_body
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+METRIC_LAYERS = ("buildings", "streets", "tessellation")
 
-@router.post("/metrics/momepy")
-async def compute_momepy_metrics(req: MomepyMetricsRequest):
-    """Compute momepy morphometric metrics."""
+
+@router.post("/metrics/momepy", openapi_extra=body_openapi(MomepyMetricsRequest))
+async def compute_momepy_metrics(
+    body: LayerBody = Depends(layer_body(MomepyMetricsRequest, METRIC_LAYERS)),
+):
+    """Compute momepy morphometric metrics.
+
+    Pass `previous` and `changed_ids` to recompute only the buildings an edit
+    affected.
+    """
+    req = body.req
     try:
-        buildings_gdf = geojson_to_gdf(req.buildings)
-        streets_gdf = geojson_to_gdf(req.streets)
-        tessellation_gdf = geojson_to_gdf(req.tessellation)
         results = compute_all_metrics(
-            buildings_gdf, streets_gdf, tessellation_gdf,
+            body.layers["buildings"], body.layers["streets"], body.layers["tessellation"],
             metric_keys=req.metrics if req.metrics != ["all"] else None,
+            output_format=req.output_format,
+            previous=req.previous,
+            changed_ids=req.changed_ids,
         )
         return results
     except Exception as e:
@@ -30,14 +39,21 @@ async def compute_momepy_metrics(req: MomepyMetricsRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/metrics/sustainability")
-async def compute_sustainability_metrics_endpoint(req: SustainabilityMetricsRequest):
+@router.post("/metrics/sustainability", openapi_extra=body_openapi(SustainabilityMetricsRequest))
+async def compute_sustainability_metrics_endpoint(
+    body: LayerBody = Depends(
+        layer_body(SustainabilityMetricsRequest, (*METRIC_LAYERS, "previous_buildings"))
+    ),
+):
     """Compute sustainability metrics (ISR, BAF, runoff, canyon H/W, SVF)."""
     try:
-        buildings_gdf = geojson_to_gdf(req.buildings)
-        streets_gdf = geojson_to_gdf(req.streets)
-        tessellation_gdf = geojson_to_gdf(req.tessellation)
-        results = compute_sustainability_metrics(buildings_gdf, streets_gdf, tessellation_gdf)
+        results = compute_sustainability_metrics(
+            body.layers["buildings"], body.layers["streets"], body.layers["tessellation"],
+            canyon_method=body.req.canyon_method,
+            previous=body.req.previous,
+            changed_ids=body.req.changed_ids,
+            previous_buildings=body.layers["previous_buildings"],
+        )
         return results
     except Exception as e:
         logger.exception("Sustainability metrics failed")
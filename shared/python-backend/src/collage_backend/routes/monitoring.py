@@ -0,0 +1,21 @@
+"""Prometheus scrape endpoint (GET /metrics)."""
+
+from fastapi import APIRouter, HTTPException, Response
+
+from collage_backend.services.stage_cache import get_stage_cache
+from collage_backend.utils.memo import memo_stats
+from collage_backend.utils.tracing import CONTENT_TYPE_LATEST, export_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics")
+async def prometheus_metrics():
+    """Request/stage latency, feature-count and memory histograms, cache hit rates."""
+    body = export_metrics({"stage_cache": get_stage_cache().stats(), **memo_stats()})
+    if body is None:
+        raise HTTPException(
+            status_code=503,
+            detail="prometheus_client not installed (pip install collage-backend[observability])",
+        )
+    return Response(content=body, media_type=CONTENT_TYPE_LATEST)
@@ -2,22 +2,23 @@
 
 import logging
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 
 from collage_backend.models.request import SpaceSyntaxRequest
 from collage_backend.services.space_syntax import compute_space_syntax
-from collage_backend.utils.io import geojson_to_gdf
+from collage_backend.utils.transport import LayerBody, body_openapi, layer_body
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-@router.post("/space-syntax")
-async def compute_space_syntax_endpoint(req: SpaceSyntaxRequest):
+@router.post("/space-syntax", openapi_extra=body_openapi(SpaceSyntaxRequest))
+async def compute_space_syntax_endpoint(
+    body: LayerBody = Depends(layer_body(SpaceSyntaxRequest, ("streets",))),
+):
     """Compute space syntax metrics (NAIN/NACH) at specified radii."""
     try:
-        streets_gdf = geojson_to_gdf(req.streets)
-        results = compute_space_syntax(streets_gdf, radii=req.radii)
+        results = compute_space_syntax(body.layers["streets"], radii=body.req.radii)
         return results
     except Exception as e:
         logger.exception("Space syntax computation failed")
@@ -2,29 +2,65 @@
 
 import logging
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
-from collage_backend.models.request import TessellateRequest
-from collage_backend.services.tessellation import compute_tessellation
-from collage_backend.utils.io import gdf_to_geojson, geojson_to_gdf
+from collage_backend.models.request import TessellateRequest, TessellateUpdateRequest
+from collage_backend.services.tessellation import compute_tessellation, update_tessellation
+from collage_backend.utils.transport import LayerBody, body_openapi, layer_body, layer_response
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-@router.post("/tessellate")
-async def tessellate(req: TessellateRequest):
+@router.post("/tessellate", openapi_extra=body_openapi(TessellateRequest))
+async def tessellate(
+    request: Request,
+    body: LayerBody = Depends(layer_body(TessellateRequest, ("buildings", "streets"))),
+):
     """Compute morphological tessellation."""
+    req = body.req
     try:
-        buildings_gdf = geojson_to_gdf(req.buildings)
-        streets_gdf = geojson_to_gdf(req.streets)
         tess = compute_tessellation(
-            buildings_gdf, streets_gdf,
+            body.layers["buildings"], body.layers["streets"],
             segment=req.segment,
             simplify=req.simplify,
             n_jobs=req.n_jobs,
+            tiled=req.tiled,
         )
-        return gdf_to_geojson(tess)
+        return layer_response(request, tess, "tessellation")
     except Exception as e:
         logger.exception("Tessellation failed")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/tessellate/update", openapi_extra=body_openapi(TessellateUpdateRequest))
+async def tessellate_update(
+    request: Request,
+    response: Response,
+    body: LayerBody = Depends(
+        layer_body(TessellateUpdateRequest, ("buildings", "streets", "tessellation"))
+    ),
+):
+    """Update a tessellation after a building edit, recomputing only affected enclosures.
+
+    The X-Tessellation-Update header reports 'incremental' or 'full' (fallback).
+    """
+    req = body.req
+    try:
+        tess, stats = update_tessellation(
+            body.layers["buildings"], body.layers["streets"], body.layers["tessellation"],
+            added=req.added,
+            removed=req.removed,
+            modified=req.modified,
+            segment=req.segment,
+            simplify=req.simplify,
+            n_jobs=req.n_jobs,
+        )
+        result = layer_response(request, tess, "tessellation")
+        # Binary bodies are returned as a Response, GeoJSON through `response`
+        headers = result.headers if isinstance(result, Response) else response.headers
+        headers["X-Tessellation-Update"] = stats["mode"]
+        return result
+    except Exception as e:
+        logger.exception("Tessellation update failed")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -7,8 +7,11 @@ import logging
 
 import geopandas as gpd
 import numpy as np
+import pandas as pd
 
-from collage_backend.utils.crs import ensure_projected
+from collage_backend.services.gmm_registry import get_gmm_registry, gmm_features
+from collage_backend.utils.crs import ProjectionContext
+from collage_backend.utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -39,85 +42,102 @@ SPACEMATRIX_TYPES = {
 }
 
 
+SPACEMATRIX_INDICATORS = ["fsi", "gsi", "layers"]
+LCZ_INDICATORS = ["bsf", "bh", "hw"]
+
+
+@traced("classify.spacematrix")
 def classify_spacematrix(
     buildings_gdf: gpd.GeoDataFrame,
     tessellation_gdf: gpd.GeoDataFrame,
+    include_scores: bool = False,
+    ctx: ProjectionContext | None = None,
 ) -> dict:
     """Classify using Spacematrix (FSI/GSI/L → 8 types).
 
     Returns dict with per-building classification and fragment-level type.
+    With include_scores, also returns the (buildings × types) penalty matrix
+    and the derived soft membership under "scores".
     """
     if buildings_gdf.empty:
         return {"per_building": {}, "fragment_type": None}
 
-    bldg = ensure_projected(buildings_gdf)
-    tess = tessellation_gdf.to_crs(bldg.crs) if not tessellation_gdf.empty else tessellation_gdf
+    ctx = ctx or ProjectionContext.for_layers(buildings_gdf)
+    bldg = ctx.project(buildings_gdf)
+    tess = ctx.project(tessellation_gdf)
 
     # Compute FSI, GSI, L per building
-    per_building: dict[str, dict] = {}
-
+    footprint = bldg.geometry.area.to_numpy()
+    height = (
+        pd.to_numeric(bldg["height_m"], errors="coerce").to_numpy(dtype=float)
+        if "height_m" in bldg.columns else np.full(len(bldg), np.nan)
+    )
+    height = np.where(np.isnan(height) | (height == 0), 9.0, height)
+    floors = np.maximum(1, np.round(height / 3.0))
+
+    site_area = footprint * 2  # rough approximation
     if not tess.empty and "building_id" in tess.columns:
         tess_areas = tess.groupby("building_id")["area_m2"].sum()
-    else:
-        tess_areas = None
-
-    for _, row in bldg.iterrows():
-        bid = row["id"]
-        footprint = row.geometry.area
-        height = float(row.get("height_m", 9) or 9)
-        floors = max(1, round(height / 3.0))
-
-        if tess_areas is not None and bid in tess_areas.index:
-            site_area = tess_areas[bid]
-        else:
-            site_area = footprint * 2  # rough approximation
-
-        gsi = footprint / site_area if site_area > 0 else 0
-        fsi = (footprint * floors) / site_area if site_area > 0 else 0
-        layers = fsi / gsi if gsi > 0 else floors
-
-        # Score against types
-        best_type = "unclassified"
-        best_score = float("inf")
-        for stype, thresholds in SPACEMATRIX_TYPES.items():
-            score = _range_score(fsi, thresholds["fsi"]) + \
-                    _range_score(gsi, thresholds["gsi"]) + \
-                    _range_score(layers, thresholds["layers"])
-            if score < best_score:
-                best_score = score
-                best_type = stype
-
-        per_building[bid] = {
-            "fsi": float(fsi),
-            "gsi": float(gsi),
-            "layers": float(layers),
-            "spacematrix_type": best_type,
+        mapped = bldg["id"].map(tess_areas).to_numpy(dtype=float)
+        site_area = np.where(np.isnan(mapped), site_area, mapped)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gsi = np.where(site_area > 0, footprint / site_area, 0.0)
+        fsi = np.where(site_area > 0, footprint * floors / site_area, 0.0)
+        layers = np.where(gsi > 0, fsi / gsi, floors)
+
+    # Score against types: (n_buildings × n_types), lowest penalty wins
+    type_names = list(SPACEMATRIX_TYPES)
+    penalty = _penalty_matrix(np.column_stack([fsi, gsi, layers]), *_SPACEMATRIX_BOUNDS)
+    best = np.asarray(type_names)[penalty.argmin(axis=1)]
+
+    ids = bldg["id"].tolist()
+    per_building = {
+        bid: {
+            "fsi": f,
+            "gsi": g,
+            "layers": n,
+            "spacematrix_type": t,
         }
+        for bid, f, g, n, t in zip(
+            ids, fsi.tolist(), gsi.tolist(), layers.tolist(), best.tolist(), strict=True
+        )
+    }
 
     # Fragment-level: majority vote
-    type_counts: dict[str, int] = {}
-    for m in per_building.values():
-        t = m["spacematrix_type"]
-        type_counts[t] = type_counts.get(t, 0) + 1
-    fragment_type = max(type_counts, key=type_counts.get) if type_counts else None
+    values, counts = np.unique(best, return_counts=True)
+    fragment_type = str(values[counts.argmax()])
 
     logger.info("Spacematrix: %d buildings, fragment type=%s", len(per_building), fragment_type)
-    return {"per_building": per_building, "fragment_type": fragment_type}
+    result = {"per_building": per_building, "fragment_type": fragment_type}
+    if include_scores:
+        result["scores"] = {
+            "types": type_names,
+            "ids": ids,
+            "penalty": penalty.tolist(),
+            "membership": _membership(penalty).tolist(),
+        }
+    return result
 
 
+@traced("classify.lcz")
 def classify_lcz(
     buildings_gdf: gpd.GeoDataFrame,
     tessellation_gdf: gpd.GeoDataFrame,
+    include_scores: bool = False,
+    ctx: ProjectionContext | None = None,
 ) -> dict:
     """Classify using Local Climate Zones (threshold-based, 14.3ms per K4).
 
-    Returns dict with LCZ class, confidence, and indicator values.
+    Returns dict with LCZ class, confidence, and indicator values. With
+    include_scores, also returns penalty and soft membership per LCZ class.
     """
     if buildings_gdf.empty:
         return {"lcz_class": None, "confidence": 0, "indicators": {}}
 
-    bldg = ensure_projected(buildings_gdf)
-    tess = tessellation_gdf.to_crs(bldg.crs) if not tessellation_gdf.empty else tessellation_gdf
+    ctx = ctx or ProjectionContext.for_layers(buildings_gdf)
+    bldg = ctx.project(buildings_gdf)
+    tess = ctx.project(tessellation_gdf)
 
     # Compute indicators
     total_area = bldg.geometry.area.sum()
@@ -140,17 +160,10 @@ def classify_lcz(
     }
 
     # Score against LCZ types
-    best_lcz = 1
-    best_score = float("inf")
-    for lcz_id, thresholds in LCZ_THRESHOLDS.items():
-        score = (
-            _range_score(bsf, thresholds["bsf"]) +
-            _range_score(bh_mean, thresholds["bh"]) +
-            _range_score(hw, thresholds["hw"])
-        )
-        if score < best_score:
-            best_score = score
-            best_lcz = lcz_id
+    lcz_ids = list(LCZ_THRESHOLDS)
+    penalty = _penalty_matrix(np.array([[bsf, bh_mean, hw]]), *_LCZ_BOUNDS)[0]
+    best_lcz = lcz_ids[int(penalty.argmin())]
+    best_score = float(penalty.min())
 
     confidence = max(0, 1.0 - best_score) if best_score < 1.0 else 0.0
 
@@ -160,82 +173,126 @@ def classify_lcz(
         "confidence": float(confidence),
         "indicators": indicators,
     }
+    if include_scores:
+        membership = _membership(penalty[None, :])[0]
+        result["scores"] = {
+            str(lcz_id): {
+                "label": LCZ_THRESHOLDS[lcz_id]["label"],
+                "penalty": float(p),
+                "membership": float(m),
+            }
+            for lcz_id, p, m in zip(lcz_ids, penalty, membership, strict=True)
+        }
 
     logger.info("LCZ classification: %s (class %d, confidence %.2f)", result["lcz_label"], best_lcz, confidence)
     return result
 
 
+@traced("classify.gmm")
 def classify_gmm(
     buildings_gdf: gpd.GeoDataFrame,
     tessellation_gdf: gpd.GeoDataFrame,
     metrics_df: dict | None = None,
     n_clusters: int = 5,
+    ctx: ProjectionContext | None = None,
 ) -> dict:
     """Classify using Gaussian Mixture Model on morphometric characters.
 
+    Uses the pre-fitted model for n_clusters from the GMM registry, so
+    cluster ids are comparable across fragments. Without one, a model is
+    fitted on this fragment alone (ids then only hold within the fragment).
+
     Args:
         buildings_gdf: Building polygons.
         tessellation_gdf: Tessellation cells.
         metrics_df: Pre-computed metrics dict (from compute_all_metrics).
         n_clusters: Number of GMM clusters.
+        ctx: Shared projection context; one is created from the buildings if omitted.
 
     Returns:
-        Dict with per-building cluster assignments and cluster profiles.
+        Dict with per-building cluster assignments (with probability),
+        cluster profiles and the model used.
     """
     if buildings_gdf.empty:
         return {"per_building": {}, "cluster_profiles": {}}
 
-    from sklearn.mixture import GaussianMixture
-    from sklearn.preprocessing import StandardScaler
+    bldg = (ctx or ProjectionContext.for_layers(buildings_gdf)).project(buildings_gdf)
+    X = gmm_features(bldg)
+    bids = bldg["id"].tolist()
 
-    bldg = ensure_projected(buildings_gdf)
+    model = get_gmm_registry().get(n_clusters)
+    if model is not None:
+        labels, probability = model.predict(X)
+        model_info = {"source": "registry", "version": model.version}
+    else:
+        if len(X) < n_clusters:
+            logger.warning("Too few buildings (%d) for %d clusters", len(X), n_clusters)
+            return {"per_building": {bid: {"cluster": 0} for bid in bids}, "cluster_profiles": {}}
+
+        from sklearn.mixture import GaussianMixture
+        from sklearn.preprocessing import StandardScaler
+
+        logger.warning("No fitted GMM for k=%d, fitting on this fragment only", n_clusters)
+        X_scaled = StandardScaler().fit_transform(X)
+        gmm = GaussianMixture(n_components=n_clusters, random_state=42).fit(X_scaled)
+        proba = gmm.predict_proba(X_scaled)
+        labels = proba.argmax(axis=1)
+        probability = proba[np.arange(len(labels)), labels]
+        model_info = {"source": "fragment", "version": None}
+
+    per_building = {
+        bid: {"cluster": int(label), "probability": round(float(p), 4)}
+        for bid, label, p in zip(bids, labels, probability, strict=True)
+    }
 
-    # Build feature matrix from basic building properties
-    features = []
-    bids = []
-    for _, row in bldg.iterrows():
-        area = row.geometry.area
-        perimeter = row.geometry.length
-        height = float(row.get("height_m", 9) or 9)
-        features.append([area, perimeter, height, area / max(perimeter, 1)])
-        bids.append(row["id"])
+    # Cluster profiles
+    counts = np.bincount(labels, minlength=n_clusters)
+    cluster_profiles = {
+        str(c): {
+            "count": int(counts[c]),
+            "mean_area": float(X[labels == c, 0].mean()),
+            "mean_height": float(X[labels == c, 2].mean()),
+        }
+        for c in np.flatnonzero(counts)
+    }
 
-    if len(features) < n_clusters:
-        logger.warning("Too few buildings (%d) for %d clusters", len(features), n_clusters)
-        return {"per_building": {bid: {"cluster": 0} for bid in bids}, "cluster_profiles": {}}
+    logger.info("GMM clustering: %d buildings → %d clusters (%s model)",
+                len(bids), len(cluster_profiles), model_info["source"])
+    return {"per_building": per_building, "cluster_profiles": cluster_profiles, "model": model_info}
 
-    X = np.array(features)
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
 
-    gmm = GaussianMixture(n_components=min(n_clusters, len(features)), random_state=42)
-    labels = gmm.fit_predict(X_scaled)
+def _threshold_bounds(
+    table: dict,
+    indicators: list[str],
+) -> tuple[np.ndarray, np.ndarray]:
+    """(n_types × n_indicators) lower/upper bound arrays; open bounds become ∓inf."""
+    low = np.array([
+        [-np.inf if t[k][0] is None else t[k][0] for k in indicators] for t in table.values()
+    ], dtype=float)
+    high = np.array([
+        [np.inf if t[k][1] is None else t[k][1] for k in indicators] for t in table.values()
+    ], dtype=float)
+    return low, high
 
-    per_building = {}
-    for i, bid in enumerate(bids):
-        per_building[bid] = {"cluster": int(labels[i])}
 
-    # Cluster profiles
-    cluster_profiles = {}
-    for c in range(gmm.n_components):
-        mask = labels == c
-        cluster_features = X[mask]
-        if len(cluster_features) > 0:
-            cluster_profiles[str(c)] = {
-                "count": int(mask.sum()),
-                "mean_area": float(cluster_features[:, 0].mean()),
-                "mean_height": float(cluster_features[:, 2].mean()),
-            }
+def _penalty_matrix(values: np.ndarray, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+    """Score how well each row of values fits each type's ranges. 0 = perfect fit.
+
+    values is (n × k), low/high are (t × k); returns (n × t). Per indicator the
+    penalty is the squared distance outside the range, relative to the violated
+    bound (at least 1), summed over indicators.
+    """
+    v = values[:, None, :]
+    below = np.clip(low - v, 0, None) / np.maximum(np.abs(low), 1)
+    above = np.clip(v - high, 0, None) / np.maximum(np.abs(high), 1)
+    return (below ** 2 + above ** 2).sum(axis=2)
+
 
-    logger.info("GMM clustering: %d buildings → %d clusters", len(bids), gmm.n_components)
-    return {"per_building": per_building, "cluster_profiles": cluster_profiles}
+def _membership(penalty: np.ndarray) -> np.ndarray:
+    """Soft membership per row: softmax of the negated penalties."""
+    weights = np.exp(-(penalty - penalty.min(axis=1, keepdims=True)))
+    return weights / weights.sum(axis=1, keepdims=True)
 
 
-def _range_score(value: float, range_tuple: tuple) -> float:
-    """Score how well a value fits within a range. 0 = perfect fit."""
-    low, high = range_tuple
-    if low is not None and value < low:
-        return ((low - value) / max(abs(low), 1)) ** 2
-    if high is not None and value > high:
-        return ((value - high) / max(abs(high), 1)) ** 2
-    return 0.0
+_SPACEMATRIX_BOUNDS = _threshold_bounds(SPACEMATRIX_TYPES, SPACEMATRIX_INDICATORS)
+_LCZ_BOUNDS = _threshold_bounds(LCZ_THRESHOLDS, LCZ_INDICATORS)
@@ -1,47 +1,68 @@
 """OSM extraction + neatnet street simplification.
 
 Based on B1 spike: OSMnx → neatnet.neatify → GeoDataFrame output.
+Buildings and streets come from live Overpass or a local extract
+(see services/local_source.py); both map to the same column schema.
 """
 
 import logging
 import uuid
 
 import geopandas as gpd
+import numpy as np
 import osmnx as ox
+import pandas as pd
 
+from collage_backend.config import DEFAULT_FLOOR_HEIGHT_M, DEFAULT_HEIGHT_M
+from collage_backend.services.local_source import get_local_source, resolve_source
 from collage_backend.utils.crs import ensure_projected
 from collage_backend.utils.geometry import buffer_bbox
+from collage_backend.utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
 
+@traced("extraction.buildings")
 def extract_buildings(
     bbox: tuple[float, float, float, float],
     buffer_m: float = 200,
+    source: str | None = None,
+    source_path: str | None = None,
 ) -> gpd.GeoDataFrame:
-    """Extract buildings from OSM via OSMnx.
+    """Extract buildings from OSM via OSMnx or a local extract.
 
     Args:
         bbox: (west, south, east, north) in WGS84.
         buffer_m: Buffer distance in meters for extraction boundary.
+        source: 'overpass' or 'local' (default: config.OSM_SOURCE).
+        source_path: Local .osm.pbf / GeoParquet extract (default: config.LOCAL_OSM_PATH).
 
     Returns:
         GeoDataFrame with building polygons in WGS84.
     """
     buffered = buffer_bbox(bbox, buffer_m)
     west, south, east, north = buffered
+    source, source_path = resolve_source(source, source_path)
 
-    logger.info("Extracting buildings: bbox=%s buffer=%sm", bbox, buffer_m)
+    logger.info("Extracting buildings: bbox=%s buffer=%sm source=%s", bbox, buffer_m, source)
 
-    buildings = ox.features_from_bbox(
-        bbox=(west, south, east, north),
-        tags={"building": True},
-    )
+    if source == "local":
+        buildings = get_local_source(source_path).buildings(buffered)
+    else:
+        buildings = ox.features_from_bbox(
+            bbox=(west, south, east, north),
+            tags={"building": True},
+        )
 
     if buildings.empty:
         logger.warning("No buildings found in bbox")
         return _empty_buildings_gdf()
 
+    return _standardize_buildings(buildings)
+
+
+def _standardize_buildings(buildings: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """Map raw OSM building features to the backend building schema."""
     # Filter to Polygon/MultiPolygon only
     buildings = buildings[buildings.geometry.type.isin(["Polygon", "MultiPolygon"])].copy()
     if buildings.empty:
@@ -49,34 +70,36 @@ def extract_buildings(
 
     # Standardize columns
     buildings["id"] = [str(uuid.uuid4())[:8] for _ in range(len(buildings))]
-    buildings["height_m"] = None
-    buildings["height_source"] = None
-    buildings["floor_count"] = None
     buildings["use"] = buildings.get("building", "yes").astype(str)
 
+    height = np.full(len(buildings), np.nan)
+    floor_count = np.full(len(buildings), np.nan)
+    source = np.full(len(buildings), "type_default", dtype=object)
+
     # Height from 'height' tag
     if "height" in buildings.columns:
-        h = buildings["height"].apply(_parse_height)
-        mask = h.notna()
-        buildings.loc[mask, "height_m"] = h[mask]
-        buildings.loc[mask, "height_source"] = "osm_tag"
+        tagged = parse_heights(buildings["height"]).to_numpy()
+        mask = ~np.isnan(tagged)
+        height[mask] = tagged[mask]
+        source[mask] = "osm_tag"
 
     # Height from 'building:levels' tag
     if "building:levels" in buildings.columns:
-        levels = buildings["building:levels"].apply(_parse_levels)
-        mask = levels.notna() & buildings["height_m"].isna()
-        buildings.loc[mask, "height_m"] = levels[mask] * 3.0
-        buildings.loc[mask, "floor_count"] = levels[mask]
-        buildings.loc[mask, "height_source"] = "osm_levels"
-
-    # Default height for remaining
-    mask = buildings["height_m"].isna()
-    buildings.loc[mask, "height_m"] = 9.0
-    buildings.loc[mask, "height_source"] = "type_default"
-
+        levels = parse_levels(buildings["building:levels"]).to_numpy()
+        mask = ~np.isnan(levels) & np.isnan(height)
+        height[mask] = levels[mask] * DEFAULT_FLOOR_HEIGHT_M
+        floor_count[mask] = levels[mask]
+        source[mask] = "osm_levels"
+
+    # Default height for remaining (height_cascade may impute these)
+    height[np.isnan(height)] = DEFAULT_HEIGHT_M
     # Compute floor count where missing
-    mask = buildings["floor_count"].isna()
-    buildings.loc[mask, "floor_count"] = (buildings.loc[mask, "height_m"] / 3.0).round()
+    missing = np.isnan(floor_count)
+    floor_count[missing] = np.round(height[missing] / DEFAULT_FLOOR_HEIGHT_M)
+
+    buildings["height_m"] = height
+    buildings["floor_count"] = floor_count
+    buildings["height_source"] = source
 
     result = buildings[["id", "height_m", "floor_count", "use", "height_source", "geometry"]].copy()
     result = result.set_crs("EPSG:4326", allow_override=True)
@@ -85,33 +108,44 @@ def extract_buildings(
     return result
 
 
+@traced("extraction.streets")
 def extract_streets(
     bbox: tuple[float, float, float, float],
     buffer_m: float = 200,
     simplify: bool = True,
+    source: str | None = None,
+    source_path: str | None = None,
 ) -> gpd.GeoDataFrame:
-    """Extract and simplify streets from OSM via OSMnx + neatnet.
+    """Extract and simplify streets from OSM (OSMnx or local extract) + neatnet.
 
     Args:
         bbox: (west, south, east, north) in WGS84.
         buffer_m: Buffer distance in meters.
         simplify: Whether to apply neatnet simplification.
+        source: 'overpass' or 'local' (default: config.OSM_SOURCE).
+        source_path: Local .osm.pbf / GeoParquet extract (default: config.LOCAL_OSM_PATH).
 
     Returns:
         GeoDataFrame with street LineStrings in WGS84.
     """
     buffered = buffer_bbox(bbox, buffer_m)
     west, south, east, north = buffered
+    source, source_path = resolve_source(source, source_path)
 
-    logger.info("Extracting streets: bbox=%s buffer=%sm", bbox, buffer_m)
+    logger.info("Extracting streets: bbox=%s buffer=%sm source=%s", bbox, buffer_m, source)
 
     try:
-        G = ox.graph_from_bbox(bbox=(west, south, east, north), network_type="all")
+        if source == "local":
+            edges = get_local_source(source_path).streets(buffered)
+        else:
+            G = ox.graph_from_bbox(bbox=(west, south, east, north), network_type="all")
+            edges = ox.graph_to_gdfs(G, nodes=False, edges=True)
     except Exception as e:
         logger.warning("Street extraction failed: %s", e)
         return _empty_streets_gdf()
 
-    edges = ox.graph_to_gdfs(G, nodes=False, edges=True)
+    if edges.empty:
+        return _empty_streets_gdf()
 
     if simplify and len(edges) > 0:
         try:
@@ -140,23 +174,69 @@ def extract_streets(
     return result
 
 
-def _parse_height(val) -> float | None:
-    if val is None or (isinstance(val, float) and val != val):
-        return None
-    s = str(val).strip().lower().rstrip("m").strip()
-    try:
-        return float(s)
-    except ValueError:
-        return None
+# Bumped when tag parsing changes, so cached building stages are re-extracted
+HEIGHT_PARSER_VERSION = 2
 
+FOOT_M = 0.3048
+INCH_M = 0.0254
+MAX_HEIGHT_M = 1000.0
+MAX_LEVELS = 200.0
 
-def _parse_levels(val) -> float | None:
-    if val is None or (isinstance(val, float) and val != val):
-        return None
-    try:
-        return float(str(val).strip())
-    except ValueError:
-        return None
+_NUMBER = r"(\d+(?:[.,]\d+)?)"
+_RANGE = rf"{_NUMBER}\s*(?:(?:-|–|to)\s*{_NUMBER})?"
+# 12 | 12.5 m | 12,5 metres | 40 ft | 40' | 12'6" | 12-15 | 12 to 15 m
+_HEIGHT_RE = (
+    rf"^{_RANGE}\s*(m|meters?|metres?|ft|feet|foot|'|’)?"
+    rf"\s*(?:{_NUMBER}\s*(?:\"|”|in|inch|inches))?$"
+)
+_LEVELS_RE = rf"^{_RANGE}$"
+
+
+def parse_heights(values: pd.Series) -> pd.Series:
+    """OSM 'height' tag values → meters (NaN where unparseable).
+
+    Vectorized over the whole column. Handles metre and foot/inch units,
+    decimal commas, ranges ('12-15' → 13.5) and multiple ';'-separated
+    values (the largest wins).
+    """
+    parts = _tag_parts(values)
+    m = parts.str.extract(_HEIGHT_RE)
+    height = _range_mean(m[0], m[1])
+    feet = m[2].isin(["ft", "feet", "foot", "'", "’"]).to_numpy(dtype=bool)
+    inches = _to_float(m[3]).fillna(0).to_numpy()
+    height = np.where(feet, height * FOOT_M + inches * INCH_M, height)
+    return _largest_part(parts, height, MAX_HEIGHT_M, values.index)
+
+
+def parse_levels(values: pd.Series) -> pd.Series:
+    """OSM 'building:levels' tag values → level count (NaN where unparseable).
+
+    Same conventions as parse_heights, without units.
+    """
+    parts = _tag_parts(values)
+    m = parts.str.extract(_LEVELS_RE)
+    return _largest_part(parts, _range_mean(m[0], m[1]), MAX_LEVELS, values.index)
+
+
+def _tag_parts(values: pd.Series) -> pd.Series:
+    """Lower-cased ';'-separated tag values, one row each, indexed by position."""
+    text = pd.Series(values.to_numpy(), dtype="string").str.strip().str.lower()
+    return text.str.split(";").explode().str.strip()
+
+
+def _range_mean(low: pd.Series, high: pd.Series) -> np.ndarray:
+    low = _to_float(low)
+    return ((low + _to_float(high).fillna(low)) / 2).to_numpy()
+
+
+def _largest_part(parts: pd.Series, parsed: np.ndarray, upper: float, index) -> pd.Series:
+    parsed = np.where((parsed > 0) & (parsed <= upper), parsed, np.nan)
+    largest = pd.Series(parsed, index=parts.index).groupby(level=0).max()
+    return pd.Series(largest.to_numpy(dtype=float), index=index)
+
+
+def _to_float(values: pd.Series) -> pd.Series:
+    return pd.to_numeric(values.str.replace(",", ".", regex=False), errors="coerce").astype(float)
 
 
 def _empty_buildings_gdf() -> gpd.GeoDataFrame:
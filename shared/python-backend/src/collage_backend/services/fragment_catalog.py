@@ -0,0 +1,269 @@
+"""Catalog of saved fragments for browsing the fragment library.
+
+Every fragment written by save_fragment is registered in one SQLite file
+with its bbox, centroid, building count and summary metrics
+(compute_summary_metrics), so finding fragments by area, city or metric
+range is an indexed query instead of opening every GeoParquet file.
+
+Bounding boxes live in an SQLite R-tree; metrics in a narrow
+(fragment, name, value) table indexed on (name, value) for range scans.
+"""
+
+import json
+import logging
+import math
+import sqlite3
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+
+from collage_backend.config import FRAGMENT_CATALOG_PATH
+from collage_backend.services.morphometrics import compute_summary_metrics
+from collage_backend.utils.crs import ProjectionContext
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fragments (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    fragment_id TEXT,
+    name TEXT,
+    city TEXT,
+    country TEXT,
+    saved_at REAL NOT NULL,
+    west REAL, south REAL, east REAL, north REAL,
+    centroid_lng REAL, centroid_lat REAL,
+    building_count INTEGER NOT NULL,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS fragments_city ON fragments (city COLLATE NOCASE);
+CREATE VIRTUAL TABLE IF NOT EXISTS fragment_bbox USING rtree (id, west, east, south, north);
+CREATE TABLE IF NOT EXISTS fragment_metrics (
+    fragment INTEGER NOT NULL REFERENCES fragments (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (fragment, name)
+);
+CREATE INDEX IF NOT EXISTS fragment_metrics_range ON fragment_metrics (name, value, fragment);
+"""
+
+
+class FragmentCatalog:
+    """SQLite index of saved fragments (one row per file path)."""
+
+    def __init__(self, db_path: str | Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def register(
+        self,
+        path: str | Path,
+        layers: dict[str, gpd.GeoDataFrame | None],
+        metadata: dict | None = None,
+    ) -> dict:
+        """Index (or re-index) the fragment saved at path; returns its entry."""
+        metadata = metadata or {}
+        buildings = _layer(layers.get("buildings"))
+        streets = _layer(layers.get("streets"))
+        tessellation = _layer(layers.get("tessellation"))
+        present = [g for g in (buildings, streets, tessellation) if not g.empty]
+
+        west = south = east = north = centroid_lng = centroid_lat = None
+        summary: dict = {"building_count": 0}
+        if present:
+            west, south, east, north = _union_bounds(present)
+            ctx = ProjectionContext.for_layers(*present)
+            if not buildings.empty:
+                if "height_m" not in buildings.columns:
+                    buildings = buildings.assign(height_m=np.nan)
+                summary = compute_summary_metrics(buildings, streets, tessellation, ctx=ctx)
+                centroids = ctx.project(buildings).geometry.centroid
+                centroid_lng, centroid_lat = ctx.to_wgs84.transform(
+                    float(centroids.x.mean()), float(centroids.y.mean())
+                )
+            else:
+                centroid_lng, centroid_lat = (west + east) / 2, (south + north) / 2
+
+        row = {
+            "path": str(Path(path).resolve()),
+            "fragment_id": metadata.get("id"),
+            "name": metadata.get("name"),
+            "city": metadata.get("city"),
+            "country": metadata.get("country"),
+            "saved_at": time.time(),
+            "west": west, "south": south, "east": east, "north": north,
+            "centroid_lng": centroid_lng, "centroid_lat": centroid_lat,
+            "building_count": int(summary.get("building_count", 0)),
+            "metadata": json.dumps(metadata, default=str),
+        }
+        metrics = [
+            (name, float(value)) for name, value in summary.items()
+            if isinstance(value, (int, float)) and math.isfinite(value)
+        ]
+        with self._connection(write=True) as conn:
+            conn.execute("DELETE FROM fragment_bbox WHERE id IN "
+                         "(SELECT id FROM fragments WHERE path = ?)", (row["path"],))
+            conn.execute("DELETE FROM fragments WHERE path = ?", (row["path"],))
+            cur = conn.execute(
+                f"INSERT INTO fragments ({', '.join(row)}) "
+                f"VALUES ({', '.join(':' + k for k in row)})",
+                row,
+            )
+            fid = cur.lastrowid
+            if west is not None:
+                conn.execute(
+                    "INSERT INTO fragment_bbox VALUES (?, ?, ?, ?, ?)",
+                    (fid, west, east, south, north),
+                )
+            conn.executemany(
+                "INSERT INTO fragment_metrics VALUES (?, ?, ?)",
+                [(fid, name, value) for name, value in metrics],
+            )
+        logger.info("Catalogued fragment %s (%d buildings)", row["path"], row["building_count"])
+        return _entry(row, dict(metrics))
+
+    def remove(self, path: str | Path) -> bool:
+        """Drop a fragment from the catalog; False if it was not listed."""
+        path = str(Path(path).resolve())
+        with self._connection(write=True) as conn:
+            conn.execute("DELETE FROM fragment_bbox WHERE id IN "
+                         "(SELECT id FROM fragments WHERE path = ?)", (path,))
+            return conn.execute("DELETE FROM fragments WHERE path = ?", (path,)).rowcount > 0
+
+    def query(
+        self,
+        bbox: tuple[float, float, float, float] | None = None,
+        city: str | None = None,
+        metrics: dict[str, tuple[float | None, float | None]] | None = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> dict:
+        """Fragments matching every given filter, newest first.
+
+        Args:
+            bbox: (west, south, east, north) in WGS84; fragments whose bbox
+                intersects it (R-tree lookup).
+            city: City name (case-insensitive).
+            metrics: {metric name: (min, max)}, either bound may be None.
+            limit: Page size.
+            offset: Page start.
+
+        Returns:
+            {"total": matching fragments, "fragments": [entry, ...]}.
+        """
+        where, params = [], []
+        if bbox is not None:
+            west, south, east, north = bbox
+            where.append(
+                "f.id IN (SELECT id FROM fragment_bbox "
+                "WHERE west <= ? AND east >= ? AND south <= ? AND north >= ?)"
+            )
+            params += [east, west, north, south]
+        if city is not None:
+            where.append("f.city = ? COLLATE NOCASE")
+            params.append(city)
+        for name, (low, high) in (metrics or {}).items():
+            clause = "SELECT fragment FROM fragment_metrics WHERE name = ?"
+            params.append(name)
+            if low is not None:
+                clause += " AND value >= ?"
+                params.append(low)
+            if high is not None:
+                clause += " AND value <= ?"
+                params.append(high)
+            where.append(f"f.id IN ({clause})")
+        condition = f"WHERE {' AND '.join(where)}" if where else ""
+
+        with self._connection() as conn:
+            total = conn.execute(
+                f"SELECT COUNT(*) FROM fragments f {condition}", params
+            ).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT * FROM fragments f {condition} "
+                "ORDER BY f.saved_at DESC LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            ).fetchall()
+            values: dict[int, dict[str, float]] = {r["id"]: {} for r in rows}
+            if rows:
+                for fid, name, value in conn.execute(
+                    "SELECT fragment, name, value FROM fragment_metrics "
+                    f"WHERE fragment IN ({', '.join('?' * len(rows))})",
+                    list(values),
+                ):
+                    values[fid][name] = value
+        return {"total": total, "fragments": [_entry(dict(r), values[r["id"]]) for r in rows]}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        if not self._ready:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SCHEMA)
+            self._ready = True
+        return conn
+
+    @contextmanager
+    def _connection(self, write: bool = False) -> Iterator[sqlite3.Connection]:
+        """One connection per operation, in a transaction; writes are serialized."""
+        with self._lock if write else nullcontext():
+            conn = self._connect()
+            try:
+                with conn:
+                    yield conn
+            finally:
+                conn.close()
+
+
+def _layer(layer: gpd.GeoDataFrame | None) -> gpd.GeoDataFrame:
+    if layer is None:
+        return gpd.GeoDataFrame(geometry=[], crs="EPSG:4326")
+    return layer
+
+
+def _union_bounds(layers: list[gpd.GeoDataFrame]) -> tuple[float, float, float, float]:
+    """WGS84 (west, south, east, north) over all layers."""
+    bounds = np.array([
+        (g if g.crs is None or g.crs.equals("EPSG:4326") else g.to_crs("EPSG:4326")).total_bounds
+        for g in layers
+    ])
+    return (
+        float(bounds[:, 0].min()), float(bounds[:, 1].min()),
+        float(bounds[:, 2].max()), float(bounds[:, 3].max()),
+    )
+
+
+def _entry(row: dict, metrics: dict[str, float]) -> dict:
+    """Public shape of a catalog row."""
+    has_bbox = row["west"] is not None
+    return {
+        "path": row["path"],
+        "id": row["fragment_id"],
+        "name": row["name"],
+        "city": row["city"],
+        "country": row["country"],
+        "saved_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(row["saved_at"])),
+        "bbox": [row["west"], row["south"], row["east"], row["north"]] if has_bbox else None,
+        "centroid": [row["centroid_lng"], row["centroid_lat"]] if has_bbox else None,
+        "building_count": row["building_count"],
+        "metrics": metrics,
+    }
+
+
+_catalog: FragmentCatalog | None = None
+
+
+def get_fragment_catalog() -> FragmentCatalog:
+    """Return the process-wide fragment catalog."""
+    global _catalog
+    if _catalog is None:
+        _catalog = FragmentCatalog(FRAGMENT_CATALOG_PATH)
+    return _catalog
@@ -5,77 +5,168 @@ Based on D1/D2/K3 spikes.
 
 import json
 import logging
+from collections.abc import Iterator
 from pathlib import Path
 
 import geopandas as gpd
-import networkx as nx
 import numpy as np
-from scipy.spatial import cKDTree
-
-from collage_backend.utils.crs import custom_tmerc, ensure_projected
-from collage_backend.utils.io import gdf_to_geojson, load_geoparquet, save_geoparquet
+import pandas as pd
+import shapely
+import shapely.geometry
+
+from collage_backend.config import FRAGMENT_DIR, FRAGMENT_ROW_GROUP_SIZE
+from collage_backend.services.fragment_catalog import get_fragment_catalog
+from collage_backend.services.street_graph import compute_isochrones
+from collage_backend.utils.crs import ProjectionContext, custom_tmerc, ensure_projected
+from collage_backend.utils.geometry import line_ends, snap_nodes, split_lines_at
+from collage_backend.utils.io import (
+    arrow_to_gdf,
+    gdf_to_arrow,
+    is_layered_parquet,
+    load_geoparquet,
+    read_layered_parquet,
+    write_layered_parquet,
+)
+from collage_backend.utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
+# Network merge: end points closer than NODE_SNAP_M coincide; a snap this
+# close to a context street's end joins that end instead of splitting
+NODE_SNAP_M = 0.01
+ENDPOINT_SNAP_M = 2.0
+
+
+def layer_gdf(layer: dict | gpd.GeoDataFrame | None) -> gpd.GeoDataFrame:
+    """Normalize a package layer (GeoJSON dict, GeoDataFrame or None) to a GeoDataFrame."""
+    if isinstance(layer, gpd.GeoDataFrame):
+        return layer
+    if not layer or not layer.get("features"):
+        return gpd.GeoDataFrame(geometry=[], crs="EPSG:4326")
+    return gpd.GeoDataFrame.from_features(layer["features"], crs="EPSG:4326")
+
+
+# Layers stored in a saved fragment, in file order
+FRAGMENT_LAYERS = ("buildings", "streets", "tessellation", "blocks")
+
 
+@traced("fragment.save")
 def save_fragment(fragment_data: dict, path: str) -> str:
-    """Save fragment as GeoParquet.
+    """Save fragment as one multi-layer GeoParquet file.
+
+    All layers share the file (see utils/io.write_layered_parquet); metadata
+    and metrics go in its key-value metadata.
 
     Args:
-        fragment_data: FragmentPackage JSON dict.
+        fragment_data: FragmentPackage dict (layers as GeoJSON or GeoDataFrames).
         path: Output file path.
 
     Returns:
         Saved file path.
     """
     path = Path(path)
-    path.parent.mkdir(parents=True, exist_ok=True)
-
-    # Save buildings as primary parquet
-    buildings_gdf = gpd.GeoDataFrame.from_features(
-        fragment_data["buildings"]["features"], crs="EPSG:4326"
-    )
-    save_geoparquet(buildings_gdf, path)
+    layers = {name: layer_gdf(fragment_data.get(name)) for name in FRAGMENT_LAYERS}
+    meta = {
+        "metadata": fragment_data.get("metadata") or {},
+        "metrics": fragment_data.get("metrics"),
+    }
+    counts = write_layered_parquet(path, layers, meta, row_group_size=FRAGMENT_ROW_GROUP_SIZE)
+    try:
+        get_fragment_catalog().register(path, layers, meta["metadata"])
+    except Exception as e:
+        # The file is saved; reindex_fragments() can catch the catalog up later
+        logger.warning("Cataloguing %s failed: %s", path, e)
+
+    logger.info("Saved fragment to %s (%s)", path, counts)
+    return str(path)
 
-    # Save metadata alongside
-    meta_path = path.with_suffix(".meta.json")
-    meta_path.write_text(json.dumps(fragment_data.get("metadata", {}), indent=2))
 
-    logger.info("Saved fragment to %s (%d buildings)", path, len(buildings_gdf))
-    return str(path)
+def reindex_fragments(root: str | Path = FRAGMENT_DIR) -> int:
+    """(Re)register every fragment file under root in the catalog; returns the count."""
+    catalog = get_fragment_catalog()
+    indexed = 0
+    for path in sorted(Path(root).rglob("*.parquet")):
+        try:
+            fragment = load_fragment(path, layers=["buildings", "streets", "tessellation"])
+            catalog.register(path, fragment, fragment["metadata"])
+            indexed += 1
+        except Exception as e:
+            logger.warning("Skipping fragment %s: %s", path, e)
+    logger.info("Catalogued %d fragments under %s", indexed, root)
+    return indexed
+
+
+@traced("fragment.load")
+def load_fragment(
+    path: str,
+    layers: list[str] | None = None,
+    columns: list[str] | None = None,
+    bbox: tuple[float, float, float, float] | None = None,
+    decode: bool = True,
+) -> dict:
+    """Load fragment from GeoParquet, reading only what was asked for.
 
+    The file is memory-mapped. With decode=False layers stay Arrow tables
+    with WKB geometry, for callers that only pass them on (binary
+    responses); arrow_to_gdf decodes one when geometry is needed.
 
-def load_fragment(path: str) -> dict:
-    """Load fragment from GeoParquet.
+    Files saved before the multi-layer format (buildings only, metadata in
+    a .meta.json sidecar) are still readable; there layers/columns/bbox are
+    applied after reading.
 
     Args:
         path: GeoParquet file path.
+        layers: Layers to load (default: all).
+        columns: Attribute columns to keep besides geometry (default: all).
+        bbox: (west, south, east, north) in WGS84; keep intersecting features.
+        decode: Decode geometry into GeoDataFrames (else WKB Arrow tables).
 
     Returns:
-        FragmentPackage-like dict.
+        FragmentPackage-like dict with GeoDataFrame (or pa.Table) layers,
+        None when absent.
     """
     path = Path(path)
-    buildings_gdf = load_geoparquet(path)
+    if not path.exists():
+        raise FileNotFoundError(path)
+    if is_layered_parquet(path):
+        loaded, meta = read_layered_parquet(path, layers, columns, bbox)
+        if decode:
+            loaded = {name: arrow_to_gdf(table) for name, table in loaded.items()}
+        metadata, metrics = meta.get("metadata", {}), meta.get("metrics")
+    else:
+        loaded, metadata, metrics = _load_legacy_fragment(path, columns, bbox), {}, None
+        if not decode:
+            loaded = {name: gdf_to_arrow(gdf) for name, gdf in loaded.items()}
+        meta_path = path.with_suffix(".meta.json")
+        if meta_path.exists():
+            metadata = json.loads(meta_path.read_text())
+
+    wanted = FRAGMENT_LAYERS if layers is None else [n for n in FRAGMENT_LAYERS if n in layers]
+    result = {"metadata": metadata, "metrics": metrics}
+    result.update({name: loaded.get(name) if name in wanted else None for name in FRAGMENT_LAYERS})
 
-    # Load metadata if exists
-    meta_path = path.with_suffix(".meta.json")
-    metadata = {}
-    if meta_path.exists():
-        metadata = json.loads(meta_path.read_text())
+    logger.info(
+        "Loaded fragment from %s (%s)",
+        path, {name: len(layer) for name, layer in loaded.items() if name in wanted},
+    )
+    return result
 
-    buildings_geojson = gdf_to_geojson(buildings_gdf)
 
-    logger.info("Loaded fragment from %s (%d buildings)", path, len(buildings_gdf))
-    return {
-        "metadata": metadata,
-        "buildings": buildings_geojson,
-        "streets": {"type": "FeatureCollection", "features": []},
-        "tessellation": {"type": "FeatureCollection", "features": []},
-        "blocks": {"type": "FeatureCollection", "features": []},
-        "metrics": None,
-    }
+def _load_legacy_fragment(
+    path: Path,
+    columns: list[str] | None,
+    bbox: tuple[float, float, float, float] | None,
+) -> dict[str, gpd.GeoDataFrame]:
+    """Buildings from a pre-multi-layer fragment file."""
+    buildings = load_geoparquet(path)
+    if bbox is not None:
+        buildings = buildings.iloc[np.sort(buildings.sindex.query(shapely.box(*bbox)))]
+    if columns is not None:
+        buildings = buildings[[c for c in buildings.columns if c in columns or c == "geometry"]]
+    return {"buildings": buildings}
 
 
+@traced("fragment.relocate")
 def relocate_fragment(
     fragment_data: dict,
     target_center: tuple[float, float],
@@ -86,49 +177,91 @@ def relocate_fragment(
     Zero geometric distortion — verified in D1 spike at 0.000000m drift.
 
     Args:
-        fragment_data: FragmentPackage JSON dict.
+        fragment_data: FragmentPackage dict (layers as GeoJSON or GeoDataFrames).
         target_center: (longitude, latitude) of destination.
 
     Returns:
-        Relocated FragmentPackage dict.
+        Relocated FragmentPackage dict with GeoDataFrame layers.
     """
-    buildings_gdf = gpd.GeoDataFrame.from_features(
-        fragment_data["buildings"]["features"], crs="EPSG:4326"
-    )
+    return next(relocate_fragment_batch(fragment_data, [target_center]))
 
-    if buildings_gdf.empty:
-        return fragment_data
 
-    # Compute source center
-    source_centroid = buildings_gdf.geometry.union_all().centroid
-    source_crs = custom_tmerc(source_centroid.x, source_centroid.y)
-    target_crs = custom_tmerc(target_center[0], target_center[1])
+def relocate_fragment_batch(
+    fragment_data: dict,
+    target_centers: list[tuple[float, float]],
+) -> Iterator[dict]:
+    """Relocate one fragment to many sites, yielding one package per target.
 
-    # Project to source meters → reassign CRS to target → back to WGS84
-    buildings_proj = buildings_gdf.to_crs(source_crs)
-    buildings_proj = buildings_proj.set_crs(target_crs, allow_override=True)
-    buildings_relocated = buildings_proj.to_crs("EPSG:4326")
+    Every layer is projected into the source tmerc once; each target then
+    only needs one vectorized inverse transform (target tmerc → WGS84) of
+    those local coordinates. Same result as relocate_fragment per target.
 
-    result = fragment_data.copy()
-    result["buildings"] = gdf_to_geojson(buildings_relocated)
+    Args:
+        fragment_data: FragmentPackage dict (layers as GeoJSON or GeoDataFrames).
+        target_centers: (longitude, latitude) per destination.
 
-    # Relocate streets if present
-    if fragment_data.get("streets", {}).get("features"):
-        streets_gdf = gpd.GeoDataFrame.from_features(
-            fragment_data["streets"]["features"], crs="EPSG:4326"
+    Yields:
+        Relocated FragmentPackage dicts with GeoDataFrame layers, in order.
+    """
+    layers = {name: layer_gdf(fragment_data.get(name)) for name in FRAGMENT_LAYERS}
+    if layers["buildings"].empty:
+        for _ in target_centers:
+            yield {**fragment_data, "buildings": layers["buildings"]}
+        return
+
+    source_center = _footprint_center(layers["buildings"])
+    source_crs = custom_tmerc(*source_center)
+    # name → (attributes, geometry in source tmerc meters)
+    local = {
+        name: (
+            pd.DataFrame(gdf.drop(columns=gdf.geometry.name)),
+            gdf.to_crs(source_crs).geometry.to_numpy(),
         )
-        streets_proj = streets_gdf.to_crs(source_crs)
-        streets_proj = streets_proj.set_crs(target_crs, allow_override=True)
-        result["streets"] = gdf_to_geojson(streets_proj.to_crs("EPSG:4326"))
+        for name, gdf in layers.items()
+        if not gdf.empty
+    }
+
+    for target_center in target_centers:
+        to_wgs84 = ProjectionContext(custom_tmerc(*target_center)).to_wgs84
+
+        def inverse(xy: np.ndarray, to_wgs84=to_wgs84) -> np.ndarray:
+            return np.column_stack(to_wgs84.transform(xy[:, 0], xy[:, 1]))
+
+        result = fragment_data.copy()
+        for name, (attributes, geoms) in local.items():
+            result[name] = gpd.GeoDataFrame(
+                attributes,
+                geometry=gpd.GeoSeries(
+                    shapely.transform(geoms, inverse), index=attributes.index, crs="EPSG:4326"
+                ),
+            )
+        logger.info(
+            "Relocated fragment from (%.4f, %.4f) to (%.4f, %.4f)",
+            *source_center, *target_center,
+        )
+        yield result
 
-    logger.info(
-        "Relocated fragment from (%.4f, %.4f) to (%.4f, %.4f)",
-        source_centroid.x, source_centroid.y,
-        target_center[0], target_center[1],
-    )
-    return result
 
+def _footprint_center(buildings: gpd.GeoDataFrame) -> tuple[float, float]:
+    """WGS84 centroid of the building footprints.
 
+    Area-weighted mean of the building centroids, which equals the centroid
+    of their union when footprints do not overlap, without the union.
+    """
+    if buildings.crs is not None and not buildings.crs.equals("EPSG:4326"):
+        buildings = buildings.to_crs("EPSG:4326")
+    geoms = buildings.geometry.to_numpy()
+    geoms = geoms[~(shapely.is_missing(geoms) | shapely.is_empty(geoms))]
+    centroids = shapely.get_coordinates(shapely.centroid(geoms))
+    area = shapely.area(geoms)
+    if area.sum() > 0:
+        x, y = np.average(centroids, axis=0, weights=area)
+    else:
+        x, y = centroids.mean(axis=0)
+    return float(x), float(y)
+
+
+@traced("fragment.merge_networks")
 def merge_networks(
     design_streets_gdf: gpd.GeoDataFrame,
     context_streets_gdf: gpd.GeoDataFrame,
@@ -136,7 +269,15 @@ def merge_networks(
 ) -> gpd.GeoDataFrame:
     """Merge design and context street networks using edge-split approach.
 
-    Based on K3 spike: KD-tree nearest-node snapping with hybrid edge-split.
+    Based on K3 spike: every dangling design end (an end point no other
+    design street shares) within snap_threshold_m of a context street is
+    joined to it. The context street is split at the nearest point on it,
+    or the join goes to its end point when that is within ENDPOINT_SNAP_M
+    (hybrid node/edge snapping). A connector segment bridges any remaining
+    gap. The result is not necessarily one connected network: a design
+    component with no dangling end within snap_threshold_m of the context
+    (e.g. a closed loop, or a grid whose ends all meet other design
+    streets) is kept as is and stays a separate component.
 
     Args:
         design_streets_gdf: Design network GeoDataFrame.
@@ -144,25 +285,82 @@ def merge_networks(
         snap_threshold_m: Max distance for snapping (meters).
 
     Returns:
-        Merged GeoDataFrame.
+        Merged GeoDataFrame (design CRS) with provenance columns: source
+        ('design', 'context' or 'connector'), source_id (id of the original
+        street; for connectors, the design street they extend), part (order
+        of a split context piece along its street) and a unique id.
     """
-    design = ensure_projected(design_streets_gdf)
-    context = context_streets_gdf.to_crs(design.crs)
-
-    # Simple concatenation with boundary snapping
+    design = ensure_projected(design_streets_gdf).explode(index_parts=False)
+    context = context_streets_gdf.to_crs(design.crs).explode(index_parts=False)
+    design_ids, context_ids = _street_ids(design), _street_ids(context)
+    design_geoms, context_geoms = design.geometry.to_numpy(), context.geometry.to_numpy()
+
+    # Dangling design ends: end points of degree one within the design network
+    valid, coords, first, last = line_ends(design_geoms)
+    end_xy = np.concatenate([coords[first], coords[last]])
+    end_line = np.tile(valid, 2)
+    _, end_node = snap_nodes(end_xy, NODE_SNAP_M)
+    dangling = np.bincount(end_node)[end_node] == 1
+    ends = shapely.points(end_xy[dangling])
+
+    end_idx, edge_idx = (
+        context.sindex.nearest(ends, max_distance=snap_threshold_m, return_all=False)
+        if len(ends) and len(context) else (np.empty(0, dtype=int), np.empty(0, dtype=int))
+    )
+    edges = context_geoms[edge_idx]
+    along = shapely.line_locate_point(edges, ends[end_idx])
+    length = shapely.length(edges)
+    along = np.where(along < ENDPOINT_SNAP_M, 0.0, along)
+    along = np.where(along > length - ENDPOINT_SNAP_M, length, along)
+    targets = shapely.line_interpolate_point(edges, along)
+
+    pieces, piece_line, piece_part = split_lines_at(context_geoms, edge_idx, along)
+    was_split = np.zeros(len(context), dtype=bool)
+    was_split[piece_line] = True
+
+    gap = shapely.distance(ends[end_idx], targets) > NODE_SNAP_M
+    connectors = shapely.shortest_line(ends[end_idx][gap], targets[gap])
+    connector_of = design_ids[end_line[dangling][end_idx][gap]]
+
+    piece_ids = [
+        f"{sid}-{part}" for sid, part in zip(context_ids[piece_line], piece_part, strict=True)
+    ]
+    connector_ids = [f"{sid}-c{k}" for k, sid in enumerate(connector_of)]
+    parts = [
+        # (geometries, source, source ids, part, ids)
+        (design_geoms, "design", design_ids, 0, design_ids),
+        (context_geoms[~was_split], "context", context_ids[~was_split], 0, context_ids[~was_split]),
+        (pieces, "context", context_ids[piece_line], piece_part, piece_ids),
+        (connectors, "connector", connector_of, 0, connector_ids),
+    ]
     merged = gpd.GeoDataFrame(
-        data={"source": (["design"] * len(design)) + (["context"] * len(context))},
-        geometry=list(design.geometry) + list(context.geometry),
+        {
+            "id": np.concatenate([np.asarray(ids, dtype=object) for *_, ids in parts]),
+            "source": np.concatenate([np.full(len(g), src) for g, src, *_ in parts]),
+            "source_id": np.concatenate([sids for _, _, sids, _, _ in parts]),
+            "part": np.concatenate([np.broadcast_to(part, len(g)) for g, _, _, part, _ in parts]),
+        },
+        geometry=np.concatenate([g for g, *_ in parts]),
         crs=design.crs,
     )
+    # Multi-part streets were exploded into rows sharing an id; number them
+    repeat = merged.groupby("id").cumcount()
+    dup = repeat > 0
+    merged.loc[dup, "id"] = merged.loc[dup, "id"] + "~" + repeat[dup].astype(str)
 
-    # TODO: Implement edge-split snapping from K3 spike
-    # For now, simple union is sufficient for prototype use
-    logger.info("Merged networks: %d design + %d context = %d total",
-                len(design), len(context), len(merged))
+    logger.info(
+        "Merged networks: %d design + %d context streets, %d split into %d pieces, %d connectors",
+        len(design), len(context), int(was_split.sum()), len(pieces), len(connectors),
+    )
     return merged
 
 
+def _street_ids(gdf: gpd.GeoDataFrame) -> np.ndarray:
+    ids = gdf["id"] if "id" in gdf.columns else gdf.index.to_series()
+    return ids.astype(str).to_numpy()
+
+
+@traced("fragment.isochrone")
 def compute_isochrone(
     streets_gdf: gpd.GeoDataFrame,
     origin: tuple[float, float],
@@ -170,7 +368,9 @@ def compute_isochrone(
 ) -> dict:
     """Compute walking isochrone from an origin point.
 
-    Based on K3 spike: Dijkstra shortest-path, 0.011s for ~2000 nodes.
+    Based on K3 spike: Dijkstra shortest-path, 0.011s for ~2000 nodes. Runs
+    on the cached street graph (services/street_graph.py); see
+    compute_isochrones for many origins and bands at once.
 
     Args:
         streets_gdf: Street network GeoDataFrame.
@@ -180,51 +380,14 @@ def compute_isochrone(
     Returns:
         Dict with reachable nodes and convex hull polygon.
     """
-    import osmnx as ox
-    from shapely.geometry import MultiPoint
-
-    streets = ensure_projected(streets_gdf)
-
-    # Build NetworkX graph from edges
-    G = nx.Graph()
-    for _, row in streets.iterrows():
-        coords = list(row.geometry.coords)
-        start = coords[0]
-        end = coords[-1]
-        length = row.geometry.length
-        G.add_edge(start, end, length=length)
-
-    if len(G.nodes) == 0:
+    result = compute_isochrones(streets_gdf, [origin], [max_distance_m], shape="convex")
+    if result.empty or result["reachable_nodes"].iloc[0] == 0:
         return {"reachable_nodes": 0, "hull": None}
 
-    # Find nearest node to origin
-    origin_proj = gpd.GeoDataFrame(
-        geometry=gpd.points_from_xy([origin[0]], [origin[1]], crs="EPSG:4326")
-    ).to_crs(streets.crs)
-    origin_pt = (origin_proj.geometry.iloc[0].x, origin_proj.geometry.iloc[0].y)
-
-    nodes = np.array(list(G.nodes))
-    tree = cKDTree(nodes)
-    _, nearest_idx = tree.query(origin_pt)
-    source_node = tuple(nodes[nearest_idx])
-
-    # Dijkstra
-    distances = nx.single_source_dijkstra_path_length(G, source_node, weight="length", cutoff=max_distance_m)
-
-    if not distances:
-        return {"reachable_nodes": 0, "hull": None}
-
-    # Convex hull of reachable nodes
-    reachable_pts = [node for node in distances.keys()]
-    hull = MultiPoint(reachable_pts).convex_hull
-
-    # Convert hull back to WGS84
-    hull_gdf = gpd.GeoDataFrame(geometry=[hull], crs=streets.crs).to_crs("EPSG:4326")
-    hull_geojson = json.loads(hull_gdf.to_json())
-
-    logger.info("Isochrone: %d reachable nodes within %dm", len(distances), max_distance_m)
+    row = result.iloc[0]
+    logger.info("Isochrone: %d reachable nodes within %dm", row["reachable_nodes"], max_distance_m)
     return {
-        "reachable_nodes": len(distances),
+        "reachable_nodes": int(row["reachable_nodes"]),
         "max_distance_m": max_distance_m,
-        "hull": hull_geojson["features"][0]["geometry"] if hull_geojson["features"] else None,
+        "hull": shapely.geometry.mapping(row.geometry) if row.geometry is not None else None,
     }
@@ -0,0 +1,257 @@
+"""Pre-fitted GMM models for morphometric clustering.
+
+One StandardScaler + GaussianMixture per cluster count is fitted on a corpus
+of saved fragments, persisted with joblib under GMM_MODEL_DIR and kept in
+memory, so /classify only runs predict_proba and cluster ids mean the same
+thing across fragments.
+
+Refits run in a background thread. A warm-start refit keeps the scaler and
+continues EM from the current components over mini-batches of the corpus,
+so existing cluster ids stay stable; a full fit starts from scratch.
+"""
+
+import atexit
+import copy
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import geopandas as gpd
+import numpy as np
+
+from collage_backend.config import (
+    DEFAULT_HEIGHT_M,
+    FRAGMENT_DIR,
+    GMM_FIT_MAX_SAMPLES,
+    GMM_MODEL_DIR,
+    GMM_REFIT_BATCH_SIZE,
+)
+from collage_backend.services.fragment_ops import load_fragment
+from collage_backend.utils.crs import ProjectionContext
+from collage_backend.utils.io import resolve_under
+
+logger = logging.getLogger(__name__)
+
+FEATURE_NAMES = ["area_m2", "perimeter_m", "height_m", "area_perimeter_ratio"]
+RANDOM_STATE = 42
+
+
+def gmm_features(buildings: gpd.GeoDataFrame) -> np.ndarray:
+    """(n × 4) feature matrix from projected buildings, see FEATURE_NAMES."""
+    area = buildings.geometry.area.to_numpy()
+    perimeter = buildings.geometry.length.to_numpy()
+    if "height_m" in buildings.columns:
+        height = buildings["height_m"].to_numpy(dtype=float, na_value=np.nan)
+        height = np.where(np.isnan(height) | (height == 0), DEFAULT_HEIGHT_M, height)
+    else:
+        height = np.full(len(buildings), DEFAULT_HEIGHT_M)
+    return np.column_stack([area, perimeter, height, area / np.maximum(perimeter, 1)])
+
+
+@dataclass
+class GMMModel:
+    """A fitted scaler + mixture and where it came from."""
+
+    n_clusters: int
+    scaler: Any
+    gmm: Any
+    version: str
+    n_samples: int
+    fitted_at: float = field(default_factory=time.time)
+    corpus: list[str] = field(default_factory=list)
+    warm_started: bool = False
+
+    def predict(self, features: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(labels, probability of the label) per row."""
+        proba = self.gmm.predict_proba(self.scaler.transform(features))
+        labels = proba.argmax(axis=1)
+        return labels, proba[np.arange(len(labels)), labels]
+
+    def info(self) -> dict:
+        return {
+            "n_clusters": self.n_clusters,
+            "version": self.version,
+            "n_samples": self.n_samples,
+            "fitted_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.fitted_at)),
+            "corpus_fragments": len(self.corpus),
+            "warm_started": self.warm_started,
+            "features": FEATURE_NAMES,
+        }
+
+
+class GMMRegistry:
+    """In-memory, disk-backed registry of GMMModels by cluster count."""
+
+    def __init__(self, model_dir: str | Path):
+        self.model_dir = Path(model_dir)
+        self._models: dict[int, GMMModel] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gmm-refit")
+        self._refit: Future | None = None
+        self._refit_info: dict | None = None
+
+    def get(self, n_clusters: int) -> GMMModel | None:
+        """The model for n_clusters, loading it from disk on first use."""
+        with self._lock:
+            model = self._models.get(n_clusters)
+        if model is not None:
+            return model
+        path = self._path(n_clusters)
+        if not path.exists():
+            return None
+        import joblib
+
+        try:
+            model = joblib.load(path)
+        except Exception as e:
+            logger.warning("GMM model %s unreadable, ignoring: %s", path, e)
+            return None
+        with self._lock:
+            return self._models.setdefault(n_clusters, model)
+
+    def fit(
+        self,
+        n_clusters: int,
+        paths: list[str] | None = None,
+        warm_start: bool = False,
+    ) -> GMMModel:
+        """Fit (or warm-start refit) a model on saved fragments and install it."""
+        from sklearn.mixture import GaussianMixture
+        from sklearn.preprocessing import StandardScaler
+
+        paths = paths or corpus_paths()
+        features = _corpus_features(paths)
+        if len(features) < n_clusters:
+            raise ValueError(f"Corpus has {len(features)} buildings, need at least {n_clusters}")
+        rng = np.random.default_rng(RANDOM_STATE)
+        rng.shuffle(features)
+
+        current = self.get(n_clusters) if warm_start else None
+        if current is None:
+            sample = features[:GMM_FIT_MAX_SAMPLES]
+            scaler = StandardScaler().fit(sample)
+            gmm = GaussianMixture(n_components=n_clusters, random_state=RANDOM_STATE)
+            gmm.fit(scaler.transform(sample))
+        else:
+            # Keep the feature space fixed; continue EM batch by batch
+            scaler = current.scaler
+            gmm = copy.deepcopy(current.gmm)
+            gmm.set_params(warm_start=True, max_iter=10)
+            for start in range(0, len(features), GMM_REFIT_BATCH_SIZE):
+                batch = features[start:start + GMM_REFIT_BATCH_SIZE]
+                if len(batch) >= n_clusters:
+                    gmm.fit(scaler.transform(batch))
+
+        model = GMMModel(
+            n_clusters=n_clusters,
+            scaler=scaler,
+            gmm=gmm,
+            version=time.strftime("%Y%m%dT%H%M%S", time.gmtime()),
+            n_samples=len(features),
+            corpus=[str(p) for p in paths],
+            warm_started=current is not None,
+        )
+        self._save(model)
+        with self._lock:
+            self._models[n_clusters] = model
+        logger.info(
+            "GMM k=%d %s on %d buildings from %d fragments",
+            n_clusters, "refitted" if current else "fitted", len(features), len(paths),
+        )
+        return model
+
+    def submit_fit(
+        self,
+        n_clusters: int,
+        paths: list[str] | None = None,
+        warm_start: bool = False,
+    ) -> dict:
+        """Run fit() in the background; at most one (re)fit runs at a time.
+
+        Paths are resolved under FRAGMENT_DIR; ValueError for any outside it.
+        """
+        if paths is not None:
+            paths = [str(resolve_under(p, FRAGMENT_DIR)) for p in paths]
+        with self._lock:
+            if self._refit is not None and not self._refit.done():
+                raise RuntimeError("A GMM fit is already running")
+            self._refit_info = {
+                "status": "running",
+                "n_clusters": n_clusters,
+                "warm_start": warm_start,
+                "error": None,
+            }
+            self._refit = self._executor.submit(self._run_fit, n_clusters, paths, warm_start)
+        return self.status()
+
+    def status(self) -> dict:
+        """Loaded/persisted models and the state of the last background fit."""
+        on_disk = sorted(
+            int(p.stem[1:]) for p in self.model_dir.glob("k*.joblib") if p.stem[1:].isdigit()
+        )
+        models = [m.info() for k in on_disk if (m := self.get(k)) is not None]
+        with self._lock:
+            fit = dict(self._refit_info) if self._refit_info else None
+        return {"model_dir": str(self.model_dir), "models": models, "fit": fit}
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run_fit(self, n_clusters: int, paths: list[str] | None, warm_start: bool) -> None:
+        try:
+            model = self.fit(n_clusters, paths, warm_start)
+            update = {"status": "done", "version": model.version}
+        except Exception as e:
+            logger.exception("Background GMM fit failed")
+            update = {"status": "failed", "error": str(e)}
+        with self._lock:
+            self._refit_info.update(update)
+
+    def _save(self, model: GMMModel) -> None:
+        import joblib
+
+        path = self._path(model.n_clusters)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        joblib.dump(model, tmp)
+        os.replace(tmp, path)
+
+    def _path(self, n_clusters: int) -> Path:
+        return self.model_dir / f"k{n_clusters}.joblib"
+
+
+def corpus_paths(root: str | Path = FRAGMENT_DIR) -> list[str]:
+    """Saved fragment GeoParquet files under root."""
+    return sorted(str(p) for p in Path(root).rglob("*.parquet"))
+
+
+def _corpus_features(paths: list[str]) -> np.ndarray:
+    """Stacked features of every fragment's buildings, each projected locally."""
+    blocks = []
+    for path in paths:
+        try:
+            buildings = load_fragment(path, layers=["buildings"], columns=["height_m"])["buildings"]
+        except Exception as e:
+            logger.warning("Skipping fragment %s: %s", path, e)
+            continue
+        if buildings is None or buildings.empty:
+            continue
+        blocks.append(gmm_features(ProjectionContext.for_layers(buildings).project(buildings)))
+    return np.concatenate(blocks) if blocks else np.empty((0, len(FEATURE_NAMES)))
+
+
+_registry: GMMRegistry | None = None
+
+
+def get_gmm_registry() -> GMMRegistry:
+    """Return the process-wide GMM registry."""
+    global _registry
+    if _registry is None:
+        _registry = GMMRegistry(GMM_MODEL_DIR)
+        atexit.register(_registry.shutdown)
+    return _registry
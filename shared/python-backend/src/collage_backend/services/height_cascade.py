@@ -3,14 +3,22 @@
 Based on B2 spike:
   T1: OSM 'height' tag (parsed to meters)
   T2: OSM 'building:levels' × floor height (3.0m residential, 3.5m office, 4.0m retail)
-  T3: Default (9.0m = ~3 floors)
-
-Overture and GBA integration deferred to P4 fragment workflow.
+  T3: Local height datasets for the region (Overture, GBA; see height_source.py)
+  T4: k nearest tagged neighbours of the same use (inverse-distance weighted)
+  T5: Default (9.0m = ~3 floors)
 """
 
 import logging
 
 import geopandas as gpd
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from collage_backend.config import HEIGHT_DATASETS, HEIGHT_KNN_K, HEIGHT_KNN_MAX_DISTANCE_M
+from collage_backend.services.height_source import region_datasets
+from collage_backend.utils.crs import ProjectionContext
+from collage_backend.utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -29,39 +37,156 @@ FLOOR_HEIGHTS = {
 DEFAULT_FLOOR_HEIGHT = 3.0
 DEFAULT_HEIGHT = 9.0
 
+# height_source values, in cascade order (part of the /extract heights cache key)
+HEIGHT_TIERS = ("osm_tag", "osm_levels", *HEIGHT_DATASETS, "knn_imputed", "type_default")
+# Distance between uses along the kNN tree's third axis: far beyond any
+# search radius, so only neighbours of the same use are ever found
+USE_SEPARATION_M = 1e7
+
 
+@traced("heights")
 def enrich_heights(
     buildings_gdf: gpd.GeoDataFrame,
     region: str = "other",
+    ctx: ProjectionContext | None = None,
 ) -> gpd.GeoDataFrame:
     """Enrich building heights using region-adaptive cascade.
 
     Priority:
       1. OSM height tag (already parsed during extraction)
       2. OSM building:levels × type-specific floor height
-      3. Default 9.0m
+      3. Local height datasets of the region, largest footprint overlap
+      4. kNN imputation from tagged buildings of the same use
+      5. Default 9.0m
 
     Args:
         buildings_gdf: GeoDataFrame with 'height_m', 'height_source', 'floor_count', 'use'.
-        region: Region hint ('europe', 'us', 'other'). Reserved for future GBA/Overture.
+        region: Region ('europe', 'us', 'other', ...): selects the local height
+            datasets under HEIGHT_DATA_DIR/<region>; none present skips tier 3.
+        ctx: Shared projection context (created from the buildings if omitted).
 
     Returns:
         GeoDataFrame with enriched height_m and height_source columns.
     """
     gdf = buildings_gdf.copy()
+    for col in ("height_m", "floor_count"):
+        gdf[col] = pd.to_numeric(gdf[col], errors="coerce") if col in gdf else np.nan
+    if "height_source" not in gdf:
+        gdf["height_source"] = np.where(gdf["height_m"].notna(), "osm_tag", None)
+    if "use" not in gdf:
+        gdf["use"] = "yes"
+    floor_h = gdf["use"].map(FLOOR_HEIGHTS).fillna(DEFAULT_FLOOR_HEIGHT)
 
     # Re-derive from levels with type-specific floor heights where source is osm_levels
     mask_levels = gdf["height_source"] == "osm_levels"
     if mask_levels.any():
-        floor_h = gdf.loc[mask_levels, "use"].map(FLOOR_HEIGHTS).fillna(DEFAULT_FLOOR_HEIGHT)
-        gdf.loc[mask_levels, "height_m"] = gdf.loc[mask_levels, "floor_count"] * floor_h
+        levels = gdf.loc[mask_levels, "floor_count"]
+        gdf.loc[mask_levels, "height_m"] = levels * floor_h[mask_levels]
+
+    # Untagged buildings (extraction marks them type_default) go down the cascade;
+    # heights from any other source, including callers' own, are kept
+    missing = (
+        gdf["height_m"].isna() | (gdf["height_source"] == "type_default")
+    ).to_numpy(copy=True)
+    floor_h = floor_h.to_numpy(dtype=float)
+
+    # Local height datasets, in priority order
+    for dataset in region_datasets(region) if missing.any() else []:
+        rows = np.flatnonzero(missing)
+        found = dataset.heights_for(gdf.iloc[rows], ctx=ctx)
+        _assign(gdf, rows, found, dataset.name, floor_h)
+        missing[rows[~np.isnan(found)]] = False
 
-    # Fill remaining NaN with default
-    mask_null = gdf["height_m"].isna()
-    gdf.loc[mask_null, "height_m"] = DEFAULT_HEIGHT
-    gdf.loc[mask_null, "height_source"] = "type_default"
+    # Impute the rest from their tagged neighbours
+    if missing.any() and not missing.all():
+        imputed = impute_heights_knn(gdf, missing, ctx=ctx)
+        rows = np.flatnonzero(missing)
+        _assign(gdf, rows, imputed, "knn_imputed", floor_h)
+        missing[rows[~np.isnan(imputed)]] = False
+
+    # Fill the rest with the default
+    mask_default = missing | gdf["height_m"].isna().to_numpy()
+    gdf.loc[mask_default, "height_m"] = DEFAULT_HEIGHT
+    gdf.loc[mask_default, "height_source"] = "type_default"
 
     coverage = (gdf["height_source"] != "type_default").sum() / len(gdf) if len(gdf) > 0 else 0
     logger.info("Height enrichment: %d buildings, %.1f%% non-default", len(gdf), coverage * 100)
 
     return gdf
+
+
+def _assign(
+    gdf: gpd.GeoDataFrame,
+    rows: np.ndarray,
+    heights: np.ndarray,
+    source: str,
+    floor_h: np.ndarray,
+) -> None:
+    """Set height, floor count and source for the rows with a non-NaN height."""
+    found = ~np.isnan(heights)
+    rows, heights = rows[found], heights[found]
+    gdf.iloc[rows, gdf.columns.get_loc("height_m")] = heights
+    gdf.iloc[rows, gdf.columns.get_loc("floor_count")] = np.maximum(
+        np.round(heights / floor_h[rows]), 1
+    )
+    gdf.iloc[rows, gdf.columns.get_loc("height_source")] = source
+
+
+def impute_heights_knn(
+    buildings_gdf: gpd.GeoDataFrame,
+    missing: np.ndarray,
+    k: int = HEIGHT_KNN_K,
+    max_distance_m: float = HEIGHT_KNN_MAX_DISTANCE_M,
+    ctx: ProjectionContext | None = None,
+) -> np.ndarray:
+    """Heights for the missing buildings from their k nearest tagged neighbours.
+
+    Neighbours must share the building's use and lie within max_distance_m
+    (centroid to centroid); their heights are inverse-distance weighted. One
+    KD-tree over (x, y, use × USE_SEPARATION_M) answers every building in a
+    single query.
+
+    Args:
+        buildings_gdf: Buildings with 'height_m' and 'use'.
+        missing: Boolean mask of buildings to impute; the others are the donors.
+        k: Neighbours per building.
+        max_distance_m: Search radius (meters).
+        ctx: Shared projection context.
+
+    Returns:
+        Height per missing building, in mask order (NaN when no neighbour).
+    """
+    ctx = ctx or ProjectionContext.for_layers(buildings_gdf)
+    centroids = ctx.project(buildings_gdf).geometry.centroid
+    use_code = pd.factorize(buildings_gdf["use"].fillna("yes"))[0]
+    points = np.column_stack([
+        centroids.x.to_numpy(), centroids.y.to_numpy(), use_code * USE_SEPARATION_M,
+    ])
+    finite = np.isfinite(points).all(axis=1)
+    height = buildings_gdf["height_m"].to_numpy(dtype=float)
+    donors = ~missing & finite & np.isfinite(height)
+
+    out = np.full(int(missing.sum()), np.nan)
+    queried = missing & finite
+    if not donors.any() or not queried.any():
+        return out
+
+    tree = cKDTree(points[donors])
+    dist, nn = tree.query(
+        points[queried], k=min(k, int(donors.sum())), distance_upper_bound=max_distance_m
+    )
+    dist, nn = dist.reshape(len(dist), -1), nn.reshape(len(nn), -1)
+    # Absent neighbours come back as distance inf, index n
+    found = np.isfinite(dist)
+    donor_height = height[donors][np.where(found, nn, 0)]
+    weight = np.where(found, 1.0 / np.maximum(dist, 1.0), 0.0)
+    total = weight.sum(axis=1)
+    estimate = np.full(len(total), np.nan)
+    np.divide((weight * donor_height).sum(axis=1), total, out=estimate, where=total > 0)
+
+    out[queried[missing]] = estimate
+    logger.info(
+        "kNN height imputation: %d of %d buildings imputed",
+        np.isfinite(estimate).sum(), len(out),
+    )
+    return out
@@ -0,0 +1,243 @@
+"""Local building-height datasets (Overture, GBA) for the height cascade.
+
+Each region is a directory under HEIGHT_DATA_DIR holding one subdirectory
+per dataset, each a spatially partitioned WGS84 GeoParquet dataset (any file
+layout, e.g. one file per tile) with a height column:
+
+    HEIGHT_DATA_DIR/<region>/<dataset>/**/*.parquet
+
+Per dataset a partition index (file → bbox, read from the GeoParquet
+metadata or bbox covering statistics) is kept in memory, so a lookup only
+opens partitions intersecting the fragment. Decoded partitions, with their
+STRtree, stay in an LRU. Buildings take the height of the footprint they
+overlap most (largest-overlap rule).
+"""
+
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pyarrow.parquet as pq
+import shapely
+
+from collage_backend.config import (
+    HEIGHT_COLUMN,
+    HEIGHT_DATA_DIR,
+    HEIGHT_DATASETS,
+    HEIGHT_JOIN_MIN_OVERLAP,
+    HEIGHT_PARTITION_CACHE_SIZE,
+)
+from collage_backend.utils.crs import ProjectionContext
+from collage_backend.utils.memo import LRUMemo
+
+logger = logging.getLogger(__name__)
+
+# Partition files are re-listed at most this often (seconds)
+PARTITION_RESCAN_S = 30.0
+MAX_HEIGHT_M = 1000.0
+_REGION_RE = re.compile(r"[A-Za-z0-9_-]+")
+
+_PARTITION_CACHE = LRUMemo("height_partitions", HEIGHT_PARTITION_CACHE_SIZE)
+
+
+@dataclass(frozen=True)
+class Partition:
+    """One GeoParquet file of a height dataset."""
+
+    path: str
+    mtime_ns: int
+    size: int
+    bbox: tuple[float, float, float, float]  # WGS84 (west, south, east, north)
+
+
+class HeightDataset:
+    """A partitioned height dataset with a cached partition index."""
+
+    def __init__(self, root: str | Path, name: str):
+        self.root = Path(root)
+        self.name = name
+        self._lock = threading.Lock()
+        self._partitions: dict[str, Partition] = {}
+        self._scanned_at = 0.0
+
+    def partitions(self) -> list[Partition]:
+        """Partition index, refreshed when files were added, changed or removed."""
+        with self._lock:
+            if time.monotonic() - self._scanned_at > PARTITION_RESCAN_S:
+                self._rescan()
+            return list(self._partitions.values())
+
+    def fingerprint(self) -> str:
+        """Hash of the partition files (path, size, mtime) for cache keys."""
+        h = hashlib.blake2b(digest_size=8)
+        for p in sorted(self.partitions(), key=lambda p: p.path):
+            h.update(f"{p.path}:{p.size}:{p.mtime_ns}".encode())
+        return h.hexdigest()
+
+    def heights_for(
+        self,
+        buildings_gdf: gpd.GeoDataFrame,
+        ctx: ProjectionContext | None = None,
+    ) -> np.ndarray:
+        """Height per building from the dataset footprint it overlaps most.
+
+        NaN where no footprint covers at least HEIGHT_JOIN_MIN_OVERLAP of
+        the building.
+        """
+        out = np.full(len(buildings_gdf), np.nan)
+        if buildings_gdf.empty:
+            return out
+        wgs84 = _to_wgs84(buildings_gdf)
+        west, south, east, north = wgs84.total_bounds
+        hits = [
+            p for p in self.partitions()
+            if p.bbox[0] <= east and p.bbox[2] >= west
+            and p.bbox[1] <= north and p.bbox[3] >= south
+        ]
+        if not hits:
+            return out
+
+        geoms = wgs84.geometry.to_numpy()
+        left, footprint, height = [], [], []
+        for partition in hits:
+            part = _load_partition(partition)
+            # Bulk spatial join of all buildings against the partition's STRtree
+            b, f = part.sindex.query(geoms, predicate="intersects")
+            left.append(b)
+            footprint.append(part.geometry.to_numpy()[f])
+            height.append(part[HEIGHT_COLUMN].to_numpy(dtype=float)[f])
+        left = np.concatenate(left)
+        if len(left) == 0:
+            return out
+        footprint, height = np.concatenate(footprint), np.concatenate(height)
+
+        # Overlap areas in meters, in the fragment's projection
+        ctx = ctx or ProjectionContext.for_layers(wgs84)
+        to_local = ctx.from_wgs84
+
+        def project(xy: np.ndarray) -> np.ndarray:
+            return np.column_stack(to_local.transform(xy[:, 0], xy[:, 1]))
+
+        local_buildings = shapely.transform(geoms, project)
+        local_footprints = shapely.transform(footprint, project)
+        overlap = shapely.area(shapely.intersection(local_buildings[left], local_footprints))
+        share = overlap / np.maximum(shapely.area(local_buildings[left]), 1e-9)
+
+        valid = (share >= HEIGHT_JOIN_MIN_OVERLAP) & (height > 0) & (height <= MAX_HEIGHT_M)
+        left, overlap, height = left[valid], overlap[valid], height[valid]
+        # Largest overlap first per building, then keep the first row of each
+        order = np.lexsort((-overlap, left))
+        left, height = left[order], height[order]
+        first = np.ones(len(left), dtype=bool)
+        first[1:] = left[1:] != left[:-1]
+        out[left[first]] = height[first]
+        return out
+
+    def _rescan(self) -> None:
+        files = {
+            str(path): path.stat()
+            for path in self.root.rglob("*.parquet")
+            if not path.name.startswith(".")
+        }
+        partitions = {}
+        for path, stat in files.items():
+            known = self._partitions.get(path)
+            if known and known.mtime_ns == stat.st_mtime_ns and known.size == stat.st_size:
+                partitions[path] = known
+                continue
+            try:
+                bbox = _partition_bbox(path)
+            except Exception as e:
+                logger.warning("Skipping height partition %s: %s", path, e)
+                continue
+            partitions[path] = Partition(path, stat.st_mtime_ns, stat.st_size, bbox)
+        self._partitions = partitions
+        self._scanned_at = time.monotonic()
+        logger.info(
+            "Height dataset %s: %d partitions under %s", self.name, len(partitions), self.root
+        )
+
+
+def _partition_bbox(path: str) -> tuple[float, float, float, float]:
+    """Partition extent from GeoParquet metadata, bbox covering stats, or the data."""
+    pf = pq.ParquetFile(path)
+    geo = json.loads((pf.schema_arrow.metadata or {}).get(b"geo", b"{}"))
+    column = geo.get("columns", {}).get(geo.get("primary_column", "geometry"), {})
+
+    bbox = column.get("bbox") or []
+    if len(bbox) == 4:
+        return tuple(float(v) for v in bbox)
+    if len(bbox) == 6:  # 3D: xmin, ymin, zmin, xmax, ymax, zmax
+        return float(bbox[0]), float(bbox[1]), float(bbox[3]), float(bbox[4])
+
+    covering = column.get("covering", {}).get("bbox")
+    if covering:
+        paths = {key: ".".join(covering[key]) for key in ("xmin", "ymin", "xmax", "ymax")}
+        stats = {key: [] for key in paths}
+        meta = pf.metadata
+        for i in range(meta.num_row_groups):
+            row_group = meta.row_group(i)
+            for j in range(row_group.num_columns):
+                chunk = row_group.column(j)
+                for key, leaf in paths.items():
+                    if chunk.path_in_schema == leaf and chunk.statistics is not None:
+                        lower = key in ("xmin", "ymin")
+                        stats[key].append(
+                            chunk.statistics.min if lower else chunk.statistics.max
+                        )
+        if all(stats.values()):
+            return min(stats["xmin"]), min(stats["ymin"]), max(stats["xmax"]), max(stats["ymax"])
+
+    # No metadata: read the geometry once (the index keeps the result)
+    return tuple(float(v) for v in gpd.read_parquet(path, columns=["geometry"]).total_bounds)
+
+
+def _load_partition(partition: Partition) -> gpd.GeoDataFrame:
+    """Decoded partition (geometry + height, WGS84) with its STRtree built."""
+
+    def load() -> gpd.GeoDataFrame:
+        gdf = gpd.read_parquet(partition.path, columns=["geometry", HEIGHT_COLUMN])
+        gdf = _to_wgs84(gdf[gdf[HEIGHT_COLUMN].notna()].reset_index(drop=True))
+        _ = gdf.sindex
+        return gdf
+
+    return _PARTITION_CACHE.get_or_compute(f"{partition.path}:{partition.mtime_ns}", load)
+
+
+def _to_wgs84(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    if gdf.crs is None or gdf.crs.equals("EPSG:4326"):
+        return gdf
+    return gdf.to_crs("EPSG:4326")
+
+
+_datasets: dict[str, HeightDataset] = {}
+_datasets_lock = threading.Lock()
+
+
+def region_datasets(region: str) -> list[HeightDataset]:
+    """The region's local height datasets present on disk, in HEIGHT_DATASETS order."""
+    if not _REGION_RE.fullmatch(region):
+        raise ValueError(f"Invalid region '{region}'")
+    datasets = []
+    with _datasets_lock:
+        for name in HEIGHT_DATASETS:
+            root = Path(HEIGHT_DATA_DIR) / region / name
+            if not root.is_dir():
+                continue
+            key = str(root.resolve())
+            if key not in _datasets:
+                _datasets[key] = HeightDataset(root, name)
+            datasets.append(_datasets[key])
+    return datasets
+
+
+def height_data_fingerprint(region: str) -> dict:
+    """Identify a region's height datasets for cache keys."""
+    return {"region": region, **{d.name: d.fingerprint() for d in region_datasets(region)}}
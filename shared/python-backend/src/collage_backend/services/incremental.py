@@ -0,0 +1,151 @@
+"""Dependency tracking for incremental metric recomputation.
+
+Each metric declares the inputs it reads (see METRIC_DEPENDENCIES in
+morphometrics.py and sustainability.py):
+
+    SELF    the building's own footprint and attributes
+    CELL    its tessellation cell, which changes whenever a building in the
+            same enclosure is added, removed or moved; detected by comparing
+            cell areas with the previous result
+    FACING  buildings facing it across a street (ray-cast canyon width);
+            dirty near the old and new footprints of edited buildings
+
+Given the ids an edit touched, dirty_inputs() marks which buildings have a
+stale value for each input, and rows_to_update() combines that with the
+dependency graph into the rows each metric must recompute. Everything else
+is carried over from the previous result.
+"""
+
+from collections.abc import Collection, Iterable
+
+import geopandas as gpd
+import numpy as np
+
+SELF = "self"
+CELL = "cell"
+FACING = "facing"
+
+
+def previous_columns(previous: dict) -> tuple[list[str], dict[str, list]]:
+    """(ids, columns) from a prior metrics result in nested or columnar form."""
+    if previous.get("format") == "columnar":
+        return list(previous["ids"]), previous["columns"]
+    per_building = previous.get("per_building", {})
+    ids = list(per_building)
+    keys = list(dict.fromkeys(k for row in per_building.values() for k in row))
+    return ids, {k: [per_building[bid].get(k) for bid in ids] for k in keys}
+
+
+def align_previous(previous: dict, ids: list[str]) -> tuple[dict[str, np.ndarray], np.ndarray]:
+    """Previous numeric columns re-ordered to `ids` (NaN for unseen buildings).
+
+    Returns (columns, known) where known marks buildings present before.
+    """
+    prev_ids, prev_cols = previous_columns(previous)
+    position = {bid: i for i, bid in enumerate(prev_ids)}
+    idx = np.array([position.get(bid, -1) for bid in ids], dtype=int)
+    known = idx >= 0
+    columns = {}
+    for key, values in prev_cols.items():
+        arr = np.array([np.nan if v is None else v for v in values], dtype=float)
+        aligned = np.full(len(ids), np.nan)
+        aligned[known] = arr[idx[known]]
+        columns[key] = aligned
+    return columns, known
+
+
+def dirty_inputs(
+    buildings: gpd.GeoDataFrame,
+    changed_ids: Iterable[str],
+    known: np.ndarray,
+    cell_area: np.ndarray | None = None,
+    previous_cell_area: np.ndarray | None = None,
+    facing_distance: float | None = None,
+    previous_footprints: gpd.GeoSeries | None = None,
+) -> dict[str, np.ndarray]:
+    """Per-input boolean masks over buildings whose inputs changed.
+
+    Args:
+        buildings: Current buildings (projected), in result order.
+        changed_ids: Ids added or modified by the edit.
+        known: Buildings present in the previous result; new ones are dirty.
+        cell_area, previous_cell_area: Tessellation cell area per building now
+            and in the previous result. CELL is dirty where they differ, which
+            catches every neighbour whose cell grew or shrank, including next
+            to removed buildings. Without them CELL falls back to SELF.
+        facing_distance: Radius for FACING dependents (None skips FACING).
+        previous_footprints: Footprints before the edit of the buildings it
+            removed or modified (same CRS). FACING is dirty within
+            facing_distance of these as well as of the current dirty ones.
+    """
+    ids = buildings["id"].to_numpy()
+    self_dirty = np.isin(ids, list(set(changed_ids))) | ~known
+    masks = {SELF: self_dirty}
+
+    cell_dirty = self_dirty.copy()
+    if cell_area is not None and previous_cell_area is not None:
+        cell_dirty |= ~np.isclose(cell_area, previous_cell_area, rtol=1e-9, equal_nan=True)
+    masks[CELL] = cell_dirty
+
+    if facing_distance is not None:
+        facing_dirty = self_dirty.copy()
+        around = buildings.geometry.to_numpy()[self_dirty]
+        if previous_footprints is not None:
+            around = np.concatenate([around, previous_footprints.to_numpy()])
+        if len(around):
+            _, near = buildings.sindex.query(
+                around, predicate="dwithin", distance=facing_distance
+            )
+            facing_dirty[near] = True
+        masks[FACING] = facing_dirty
+    return masks
+
+
+def dirty_rows(update: dict[str, np.ndarray]) -> np.ndarray:
+    """Positions of buildings with at least one metric to recompute."""
+    return np.flatnonzero(np.logical_or.reduce(list(update.values())))
+
+
+def rows_to_update(
+    dependencies: dict[str, set[str]],
+    masks: dict[str, np.ndarray],
+    available: Collection[str] | None = None,
+) -> dict[str, np.ndarray]:
+    """Rows each metric must recompute: the union of its inputs' dirty masks.
+
+    Metrics not in `available` (the previous result's columns, when given)
+    have nothing to carry over and are recomputed for every row.
+    """
+    n = len(next(iter(masks.values())))
+    return {
+        metric: (
+            np.ones(n, bool) if available is not None and metric not in available
+            else np.logical_or.reduce([masks[d] for d in deps if d in masks] or [np.zeros(n, bool)])
+        )
+        for metric, deps in dependencies.items()
+    }
+
+
+def merge_columns(
+    previous: dict[str, np.ndarray],
+    fresh: dict[str, np.ndarray],
+    rows: np.ndarray,
+    update: dict[str, np.ndarray],
+) -> dict[str, np.ndarray]:
+    """Previous values with each metric's dirty rows replaced by fresh ones.
+
+    fresh holds values for the buildings selected by `rows` (positions);
+    update holds each metric's dirty mask over all buildings (all rows for
+    metrics missing from previous, see rows_to_update). Metrics missing from
+    fresh (their computation failed) become NaN where dirty.
+    """
+    merged = {}
+    for metric, dirty in update.items():
+        column = previous.get(metric)
+        column = np.full(len(dirty), np.nan) if column is None else column.copy()
+        full = np.full(len(dirty), np.nan)
+        if metric in fresh:
+            full[rows] = fresh[metric]
+        column[dirty] = full[dirty]
+        merged[metric] = column
+    return merged
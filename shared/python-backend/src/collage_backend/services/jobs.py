@@ -0,0 +1,208 @@
+"""Background extraction jobs with per-stage progress.
+
+Each job runs the extraction pipeline in its own worker process so the
+uvicorn event loop stays responsive. At most JOB_MAX_WORKERS jobs run at
+once; further jobs wait in the queue. Processes are forked from a
+forkserver that has the pipeline modules preloaded, so start-up is cheap,
+and cancelling a running job terminates its process to free the slot.
+"""
+
+import atexit
+import logging
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from collage_backend.config import JOB_MAX_WORKERS, JOB_TTL_S
+from collage_backend.models.request import ExtractRequest
+from collage_backend.services.pipeline import PIPELINE_STAGES, NoBuildingsError, run_extract
+from collage_backend.utils.parallel import pool_context
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    """State of one extraction job."""
+
+    id: str
+    status: str = "queued"  # queued → running → done | failed | cancelled
+    stages_done: list[str] = field(default_factory=list)
+    error: str | None = None
+    error_status: int | None = None
+    result: dict | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    process: Any = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def to_dict(self) -> dict:
+        """Status payload with step-by-step progress."""
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "progress": len(self.stages_done) / len(PIPELINE_STAGES),
+            "stages": [
+                {"step": i, "name": name, "done": name in self.stages_done}
+                for i, name in enumerate(PIPELINE_STAGES, start=1)
+            ],
+            "current_stage": (
+                PIPELINE_STAGES[len(self.stages_done)]
+                if self.status == "running" and len(self.stages_done) < len(PIPELINE_STAGES)
+                else None
+            ),
+            "error": self.error,
+            "created_at": _iso(self.created_at),
+            "started_at": _iso(self.started_at),
+            "finished_at": _iso(self.finished_at),
+        }
+
+
+class JobManager:
+    """Queues extraction jobs and runs them in bounded worker processes."""
+
+    def __init__(
+        self,
+        max_workers: int = JOB_MAX_WORKERS,
+        ttl_s: float = JOB_TTL_S,
+        worker: Callable[[ExtractRequest, Any], None] | None = None,
+    ):
+        self.ttl_s = ttl_s
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._ctx = pool_context(preload=["collage_backend.services.pipeline"])
+        # Process entry point (req, conn); see _worker for the pipe protocol
+        self._worker = worker or _worker
+
+    def submit(self, req: ExtractRequest) -> Job:
+        """Queue an extraction and return its job immediately."""
+        self._prune()
+        job = Job(id=uuid.uuid4().hex[:12])
+        with self._lock:
+            self._jobs[job.id] = job
+        threading.Thread(target=self._run, args=(job, req), daemon=True).start()
+        logger.info("Queued extraction job %s for bbox=%s", job.id, req.bbox)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> list[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Job | None:
+        """Cancel a queued or running job; running workers are terminated."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished:
+                return job
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            proc = job.process
+        if proc is not None and proc.is_alive():
+            proc.terminate()
+        logger.info("Cancelled extraction job %s", job_id)
+        return job
+
+    def shutdown(self) -> None:
+        """Terminate every running worker (called at interpreter exit)."""
+        for job in self.jobs():
+            if not job.finished:
+                self.cancel(job.id)
+
+    def _run(self, job: Job, req: ExtractRequest) -> None:
+        with self._slots:
+            with self._lock:
+                if job.status == "cancelled":
+                    return
+                recv, send = self._ctx.Pipe(duplex=False)
+                # Non-daemonic so joblib inside momepy can still start workers;
+                # shutdown() terminates stragglers at exit instead.
+                job.process = self._ctx.Process(
+                    target=self._worker, args=(req, send), name=f"extract-{job.id}"
+                )
+                job.status = "running"
+                job.started_at = time.time()
+                job.process.start()
+            send.close()
+
+            try:
+                while True:
+                    kind, *payload = recv.recv()
+                    if kind == "stage":
+                        job.stages_done.append(payload[0])
+                    elif kind == "result":
+                        self._finish(job, "done", result=payload[0])
+                        break
+                    elif kind == "error":
+                        self._finish(job, "failed", error=payload[1], error_status=payload[0])
+                        break
+            except EOFError:
+                # Worker exited without a result: terminated by cancel() or crashed
+                self._finish(job, "failed", error="Worker process exited unexpectedly")
+            finally:
+                recv.close()
+                job.process.join()
+
+    def _finish(self, job: Job, status: str, **fields) -> None:
+        with self._lock:
+            if job.status == "cancelled":
+                return
+            job.status = status
+            job.finished_at = time.time()
+            for name, value in fields.items():
+                setattr(job, name, value)
+        logger.info("Extraction job %s %s", job.id, status)
+
+    def _prune(self) -> None:
+        """Forget finished jobs (and their results) older than ttl_s."""
+        cutoff = time.time() - self.ttl_s
+        with self._lock:
+            for job_id in [
+                j.id for j in self._jobs.values() if j.finished and j.finished_at < cutoff
+            ]:
+                del self._jobs[job_id]
+
+
+def _worker(req: ExtractRequest, conn) -> None:
+    """Process entry point: run the pipeline and report progress over a pipe.
+
+    Sends ("stage", name) per completed stage, then ("result", package) or
+    ("error", http status, message).
+    """
+    try:
+        result = run_extract(req, on_stage=lambda step, name: conn.send(("stage", name)))
+        conn.send(("result", result))
+    except NoBuildingsError as e:
+        conn.send(("error", 404, str(e)))
+    except Exception as e:
+        logger.exception("Extraction job failed")
+        conn.send(("error", 500, str(e)))
+    finally:
+        conn.close()
+
+
+def _iso(ts: float | None) -> str | None:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts)) if ts is not None else None
+
+
+_manager: JobManager | None = None
+
+
+def get_job_manager() -> JobManager:
+    """Return the process-wide job manager."""
+    global _manager
+    if _manager is None:
+        _manager = JobManager()
+        atexit.register(_manager.shutdown)
+    return _manager
@@ -0,0 +1,209 @@
+"""Local OSM extracts as an offline alternative to live Overpass.
+
+A local source is either a regional ``.osm.pbf`` (read once through the GDAL
+OSM driver) or a directory of pre-converted GeoParquet files
+(``buildings.parquet`` + ``streets.parquet``, see convert_pbf_to_geoparquet).
+Layers are loaded once per process, indexed with an STRtree and answer bbox
+queries with the same raw tag columns OSMnx returns, so extraction.py can map
+both sources to one schema.
+
+Requests may pick an extract with source_path, resolved under
+LOCAL_OSM_PATH (the path itself when it is a file); anything outside it is
+rejected. PBF ways are split where they share a node with another way, like
+OSMnx graph edges.
+"""
+
+import logging
+import threading
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import box
+
+from collage_backend.config import LOCAL_OSM_CACHE_SIZE, LOCAL_OSM_PATH, OSM_SOURCE
+from collage_backend.utils.io import resolve_under
+from collage_backend.utils.memo import LRUMemo
+
+logger = logging.getLogger(__name__)
+
+OSM_SOURCES = ("overpass", "local")
+
+# Tags pulled out of the GDAL OSM driver's hstore 'other_tags' column
+BUILDING_TAGS = ["height", "building:levels"]
+STREET_TAGS = ["width", "lanes", "oneway"]
+
+# Mirrors OSMnx network_type="all": drop non-routable highway values
+EXCLUDED_HIGHWAYS = {
+    "abandoned", "construction", "no", "planned", "platform", "proposed", "raceway", "razed",
+}
+
+
+class InvalidSourceError(ValueError):
+    """Unknown OSM source, or a source_path outside LOCAL_OSM_PATH."""
+
+
+class LocalOSMSource:
+    """Spatially indexed buildings + streets layers from a local extract."""
+
+    def __init__(self, buildings: gpd.GeoDataFrame, streets: gpd.GeoDataFrame):
+        self._buildings = buildings.to_crs("EPSG:4326").reset_index(drop=True)
+        self._streets = streets.to_crs("EPSG:4326").reset_index(drop=True)
+        # Build both STRtrees up front so the first request pays nothing
+        _ = self._buildings.sindex, self._streets.sindex
+
+    @classmethod
+    def from_path(cls, path: str | Path) -> "LocalOSMSource":
+        """Load a .osm.pbf file or a directory of pre-converted GeoParquet."""
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"Local OSM source not found: {path}")
+        if path.is_dir():
+            buildings = gpd.read_parquet(path / "buildings.parquet")
+            streets = gpd.read_parquet(path / "streets.parquet")
+        else:
+            buildings, streets = read_pbf(path)
+        logger.info(
+            "Loaded local OSM source %s: %d buildings, %d streets",
+            path, len(buildings), len(streets),
+        )
+        return cls(buildings, streets)
+
+    def buildings(self, bbox: tuple[float, float, float, float]) -> gpd.GeoDataFrame:
+        """Building features intersecting a WGS84 (west, south, east, north) bbox."""
+        return _query(self._buildings, bbox)
+
+    def streets(self, bbox: tuple[float, float, float, float]) -> gpd.GeoDataFrame:
+        """Street features intersecting a WGS84 (west, south, east, north) bbox."""
+        return _query(self._streets, bbox)
+
+
+_SOURCE_CACHE = LRUMemo("local_osm_sources", LOCAL_OSM_CACHE_SIZE)
+# Extracts can take gigabytes: load one at a time rather than racing
+_sources_lock = threading.Lock()
+
+
+def get_local_source(path: str | Path | None = None) -> LocalOSMSource:
+    """Return the (cached) local source for a path, loading it on first use.
+
+    Reloaded when the file changes; the least recently used extracts are
+    dropped beyond LOCAL_OSM_CACHE_SIZE.
+    """
+    path = Path(path or LOCAL_OSM_PATH).resolve()
+    mtime = path.stat().st_mtime_ns if path.exists() else None
+    with _sources_lock:
+        return _SOURCE_CACHE.get_or_compute(
+            f"{path}:{mtime}", lambda: LocalOSMSource.from_path(path)
+        )
+
+
+def resolve_source(
+    source: str | None,
+    source_path: str | None,
+) -> tuple[str, str | None]:
+    """Apply config defaults to a per-request source selection.
+
+    Raises:
+        InvalidSourceError: Unknown source, or source_path outside LOCAL_OSM_PATH.
+    """
+    source = source or OSM_SOURCE
+    if source not in OSM_SOURCES:
+        raise InvalidSourceError(f"Unknown OSM source '{source}', expected one of {OSM_SOURCES}")
+    if source == "local":
+        try:
+            source_path = str(resolve_under(source_path or "", LOCAL_OSM_PATH))
+        except ValueError as e:
+            raise InvalidSourceError(str(e)) from e
+    return source, source_path
+
+
+def source_fingerprint(source: str | None, source_path: str | None) -> dict:
+    """Identify a source for cache keys (path + mtime for local extracts)."""
+    source, source_path = resolve_source(source, source_path)
+    if source != "local":
+        return {"source": source}
+    path = Path(source_path)
+    mtime = path.stat().st_mtime if path.exists() else None
+    return {"source": source, "path": str(path.resolve()), "mtime": mtime}
+
+
+def read_pbf(path: str | Path) -> tuple[gpd.GeoDataFrame, gpd.GeoDataFrame]:
+    """Read buildings (multipolygons layer) and streets (lines layer) from a PBF."""
+    import pyogrio
+
+    buildings = pyogrio.read_dataframe(
+        path, layer="multipolygons", columns=["building", "other_tags"],
+        where="building IS NOT NULL",
+    )
+    streets = pyogrio.read_dataframe(
+        path, layer="lines", columns=["name", "highway", "other_tags"],
+        where="highway IS NOT NULL",
+    )
+    streets = streets[~streets["highway"].isin(EXCLUDED_HIGHWAYS)]
+
+    buildings = _expand_other_tags(buildings, BUILDING_TAGS)
+    streets = _expand_other_tags(streets, STREET_TAGS)
+    return buildings, split_at_intersections(streets)
+
+
+def split_at_intersections(streets: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """Split ways at every interior vertex shared with another way.
+
+    The GDAL OSM driver returns whole ways; OSMnx edges run from
+    intersection to intersection. Pieces keep their way's attributes.
+    """
+    streets = streets[streets.geometry.type == "LineString"].reset_index(drop=True)
+    if streets.empty:
+        return streets
+    coords, line = shapely.get_coordinates(streets.geometry.to_numpy(), return_index=True)
+
+    # Vertices used by more than one way (OSM nodes are shared exactly)
+    _, vertex = np.unique(coords, axis=0, return_inverse=True)
+    vertex = vertex.ravel()
+    pairs = np.unique(np.column_stack([vertex, line]), axis=0)
+    shared = np.bincount(pairs[:, 0], minlength=vertex.max() + 1) > 1
+
+    first = np.r_[True, line[1:] != line[:-1]]
+    last = np.r_[line[1:] != line[:-1], True]
+    split = shared[vertex] & ~first & ~last
+
+    # A split vertex ends one piece and starts the next
+    repeat = 1 + split
+    coords, line = np.repeat(coords, repeat, axis=0), np.repeat(line, repeat)
+    starts = np.repeat(first, repeat)
+    starts[np.flatnonzero(np.repeat(split, repeat))[1::2]] = True
+    piece = np.cumsum(starts) - 1
+
+    geometry = shapely.linestrings(coords, indices=piece)
+    pieces = streets.iloc[line[starts]].reset_index(drop=True)
+    return pieces.set_geometry(gpd.GeoSeries(geometry, crs=streets.crs))
+
+
+def convert_pbf_to_geoparquet(pbf_path: str | Path, out_dir: str | Path) -> Path:
+    """Pre-convert a PBF into the GeoParquet directory layout for fast loading."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    buildings, streets = read_pbf(pbf_path)
+    buildings.to_parquet(out_dir / "buildings.parquet", engine="pyarrow")
+    streets.to_parquet(out_dir / "streets.parquet", engine="pyarrow")
+    logger.info("Converted %s → %s (%d buildings, %d streets)",
+                pbf_path, out_dir, len(buildings), len(streets))
+    return out_dir
+
+
+def _query(gdf: gpd.GeoDataFrame, bbox: tuple[float, float, float, float]) -> gpd.GeoDataFrame:
+    idx = gdf.sindex.query(box(*bbox), predicate="intersects")
+    return gdf.iloc[idx].copy()
+
+
+def _expand_other_tags(gdf: gpd.GeoDataFrame, tags: list[str]) -> gpd.GeoDataFrame:
+    """Pull selected keys out of the hstore-encoded 'other_tags' column."""
+    other = gdf.pop("other_tags") if "other_tags" in gdf.columns else pd.Series(
+        None, index=gdf.index, dtype=object
+    )
+    other = other.fillna("").astype(str)
+    for tag in tags:
+        gdf[tag] = other.str.extract(rf'"{tag}"=>"([^"]*)"', expand=False)
+    return gdf
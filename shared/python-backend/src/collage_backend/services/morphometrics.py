@@ -8,17 +8,54 @@ import logging
 import geopandas as gpd
 import momepy
 import numpy as np
-
-from collage_backend.utils.crs import ensure_projected
+import pandas as pd
+
+from collage_backend.services.incremental import (
+    CELL,
+    SELF,
+    align_previous,
+    dirty_inputs,
+    dirty_rows,
+    merge_columns,
+    rows_to_update,
+)
+from collage_backend.utils.crs import ProjectionContext
+from collage_backend.utils.io import json_floats
+from collage_backend.utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
 
+# Inputs each per-building metric reads (see services/incremental.py)
+METRIC_DEPENDENCIES = {
+    "dim_area": {SELF},
+    "dim_perimeter": {SELF},
+    "dim_longest_axis": {SELF},
+    "shape_circularity": {SELF},
+    "shape_elongation": {SELF},
+    "shape_convexity": {SELF},
+    "shape_rectangularity": {SELF},
+    "orientation": {SELF},
+    "gsi": {SELF, CELL},
+    "fsi": {SELF, CELL},
+    "osr": {SELF, CELL},
+    "layers": {SELF, CELL},
+    "gfa": {SELF},
+    "tess_area": {SELF, CELL},
+    "height_m_val": {SELF},
+}
+
+
+@traced("metrics.momepy")
 def compute_all_metrics(
     buildings_gdf: gpd.GeoDataFrame,
     streets_gdf: gpd.GeoDataFrame,
     tessellation_gdf: gpd.GeoDataFrame,
     metric_keys: list[str] | None = None,
+    output_format: str = "nested",
+    ctx: ProjectionContext | None = None,
+    previous: dict | None = None,
+    changed_ids: list[str] | None = None,
 ) -> dict:
     """Compute momepy morphometric metrics.
 
@@ -27,24 +64,72 @@ def compute_all_metrics(
         streets_gdf: Street LineStrings.
         tessellation_gdf: Tessellation cells.
         metric_keys: Specific metrics to compute, or None for all.
+        output_format: 'nested' for per_building {building_id: {metric: value}},
+            or 'columnar' for {"ids": [...], "columns": {metric: [...]}}.
+        ctx: Shared projection context; one is created from the buildings if omitted.
+        previous: Result of an earlier call (either format). With changed_ids,
+            only rows whose inputs changed are recomputed (incremental mode).
+        changed_ids: Ids of buildings added or modified since `previous`.
 
     Returns:
-        Dict mapping building_id → {metric_key: value}.
+        Dict with per-building values (nested or columnar) and aggregates.
     """
     if buildings_gdf.empty:
+        if output_format == "columnar":
+            return {"format": "columnar", "ids": [], "columns": {}, "aggregates": {}}
         return {}
 
     # Ensure projected CRS
-    bldg = ensure_projected(buildings_gdf)
-    streets = streets_gdf.to_crs(bldg.crs) if not streets_gdf.empty else streets_gdf
-    tess = tessellation_gdf.to_crs(bldg.crs) if not tessellation_gdf.empty else tessellation_gdf
+    ctx = ctx or ProjectionContext.for_layers(buildings_gdf)
+    bldg = ctx.project(buildings_gdf)
+    tess = ctx.project(tessellation_gdf)
+    ids = bldg["id"].tolist()
+
+    if previous is not None and changed_ids is not None:
+        prev_cols, known = align_previous(previous, ids)
+        masks = dirty_inputs(
+            bldg, changed_ids, known,
+            cell_area=_cell_areas(bldg, tess),
+            previous_cell_area=prev_cols.get("tess_area"),
+        )
+        update = rows_to_update(METRIC_DEPENDENCIES, masks, available=prev_cols)
+        rows = dirty_rows(update)
+        logger.info("Incremental morphometrics: %d of %d buildings dirty", len(rows), len(bldg))
+        target = bldg.iloc[rows].copy()
+        fresh = _building_metrics(target, tess) if len(rows) else {}
+        values = merge_columns(prev_cols, fresh, rows, update)
+        present = [col for col in METRIC_DEPENDENCIES if col in fresh or col in prev_cols]
+    else:
+        logger.info("Computing morphometrics for %d buildings", len(bldg))
+        values = _building_metrics(bldg, tess)
+        present = [col for col in METRIC_DEPENDENCIES if col in values]
+
+    columns = {col: json_floats(values[col]) for col in present}
 
-    results: dict[str, dict[str, float | None]] = {}
-    for bid in bldg["id"]:
-        results[bid] = {}
+    # --- Aggregate metrics ---
+    aggregates = {}
+    for col in present:
+        series = pd.Series(values[col]).dropna()
+        if len(series) > 0:
+            aggregates[f"{col}_mean"] = float(series.mean())
+            aggregates[f"{col}_std"] = float(series.std())
+            aggregates[f"{col}_min"] = float(series.min())
+            aggregates[f"{col}_max"] = float(series.max())
+
+    logger.info("Computed %d metrics per building, %d aggregates", len(present), len(aggregates))
+    if output_format == "columnar":
+        return {"format": "columnar", "ids": ids, "columns": columns, "aggregates": aggregates}
+
+    # dim_area is always present, so every building gets a row
+    records = zip(*columns.values(), strict=True)
+    results: dict[str, dict[str, float | None]] = {
+        bid: dict(zip(present, row, strict=True)) for bid, row in zip(ids, records, strict=True)
+    }
+    return {"per_building": results, "aggregates": aggregates}
 
-    logger.info("Computing morphometrics for %d buildings", len(bldg))
 
+def _building_metrics(bldg: gpd.GeoDataFrame, tess: gpd.GeoDataFrame) -> dict[str, np.ndarray]:
+    """Per-building metric columns for bldg (tess may cover more buildings)."""
     # --- Dimension metrics ---
     try:
         bldg["dim_area"] = bldg.geometry.area
@@ -72,11 +157,11 @@ def compute_all_metrics(
         logger.warning("Orientation failed: %s", e)
 
     # --- Spacematrix (from tessellation) ---
-    if not tess.empty and "building_id" in tess.columns:
+    cell_area = _cell_areas(bldg, tess)
+    if cell_area is not None:
         try:
             # Join tessellation areas to buildings
-            tess_areas = tess.groupby("building_id")["area_m2"].sum()
-            bldg["tess_area"] = bldg["id"].map(tess_areas).fillna(bldg.geometry.area)
+            bldg["tess_area"] = cell_area
             bldg["gsi"] = bldg["dim_area"] / bldg["tess_area"]
             height = bldg["height_m"].fillna(9.0)
             floors = (height / 3.0).round().clip(lower=1)
@@ -90,45 +175,30 @@ def compute_all_metrics(
     # --- Height statistics ---
     bldg["height_m_val"] = bldg["height_m"].fillna(9.0).astype(float)
 
-    # Build results dict
-    metric_cols = [
-        "dim_area", "dim_perimeter", "dim_longest_axis",
-        "shape_circularity", "shape_elongation", "shape_convexity", "shape_rectangularity",
-        "orientation", "gsi", "fsi", "osr", "layers", "gfa", "tess_area", "height_m_val",
-    ]
-
-    for _, row in bldg.iterrows():
-        bid = row["id"]
-        for col in metric_cols:
-            if col in bldg.columns:
-                val = row.get(col)
-                if val is not None and not (isinstance(val, float) and np.isnan(val)):
-                    results[bid][col] = float(val)
-                else:
-                    results[bid][col] = None
+    return {
+        col: bldg[col].to_numpy(dtype=float)
+        for col in METRIC_DEPENDENCIES if col in bldg.columns
+    }
 
-    # --- Aggregate metrics ---
-    aggregates = {}
-    for col in metric_cols:
-        if col in bldg.columns:
-            series = bldg[col].dropna()
-            if len(series) > 0:
-                aggregates[f"{col}_mean"] = float(series.mean())
-                aggregates[f"{col}_std"] = float(series.std())
-                aggregates[f"{col}_min"] = float(series.min())
-                aggregates[f"{col}_max"] = float(series.max())
-
-    logger.info("Computed %d metrics per building, %d aggregates", len(metric_cols), len(aggregates))
-    return {"per_building": results, "aggregates": aggregates}
+
+def _cell_areas(bldg: gpd.GeoDataFrame, tess: gpd.GeoDataFrame) -> np.ndarray | None:
+    """Tessellation area per building (footprint where it has no cell), or None."""
+    if tess.empty or "building_id" not in tess.columns:
+        return None
+    tess_areas = tess.groupby("building_id")["area_m2"].sum()
+    return bldg["id"].map(tess_areas).fillna(bldg.geometry.area).to_numpy(dtype=float)
 
 
+@traced("metrics.summary")
 def compute_summary_metrics(
     buildings_gdf: gpd.GeoDataFrame,
     streets_gdf: gpd.GeoDataFrame,
     tessellation_gdf: gpd.GeoDataFrame,
+    ctx: ProjectionContext | None = None,
 ) -> dict:
     """Compute fragment-level summary metrics (for the StandardFragmentProfile)."""
-    bldg = ensure_projected(buildings_gdf)
+    ctx = ctx or ProjectionContext.for_layers(buildings_gdf)
+    bldg = ctx.project(buildings_gdf)
 
     summary = {
         "building_count": len(bldg),
@@ -139,12 +209,12 @@ def compute_summary_metrics(
     }
 
     if not streets_gdf.empty:
-        streets = streets_gdf.to_crs(bldg.crs)
+        streets = ctx.project(streets_gdf)
         summary["total_street_length"] = float(streets.geometry.length.sum())
         summary["street_count"] = len(streets)
 
     if not tessellation_gdf.empty:
-        tess = tessellation_gdf.to_crs(bldg.crs)
+        tess = ctx.project(tessellation_gdf)
         summary["tessellation_cell_count"] = len(tess)
         summary["mean_cell_area"] = float(tess.geometry.area.mean())
 
@@ -0,0 +1,264 @@
+"""Extraction pipeline shared by /extract and the extraction job API.
+
+Pipeline: OSMnx → neatnet → height cascade → tessellation → summary metrics.
+Each stage is cached through services/stage_cache.py when enabled.
+"""
+
+import logging
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from typing import Any
+
+import geopandas as gpd
+
+from collage_backend.config import (
+    HEIGHT_DATASETS,
+    STAGE_CACHE_ENABLED,
+    TESSELLATION_SEGMENT,
+    TESSELLATION_SIMPLIFY,
+)
+from collage_backend.models.request import ExtractRequest
+from collage_backend.services.extraction import (
+    HEIGHT_PARSER_VERSION,
+    extract_buildings,
+    extract_streets,
+)
+from collage_backend.services.height_cascade import HEIGHT_TIERS, enrich_heights
+from collage_backend.services.height_source import height_data_fingerprint
+from collage_backend.services.local_source import source_fingerprint
+from collage_backend.services.morphometrics import compute_summary_metrics
+from collage_backend.services.stage_cache import get_stage_cache
+from collage_backend.services.tessellation import compute_tessellation
+from collage_backend.utils.crs import ProjectionContext
+from collage_backend.utils.geometry import buffer_bbox
+from collage_backend.utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Pipeline steps 1–5, in execution order
+PIPELINE_STAGES = ["buildings", "streets", "heights", "tessellation", "metrics"]
+
+
+class NoBuildingsError(LookupError):
+    """Raised when the requested bbox contains no buildings."""
+
+
+def iter_extract_stages(req: ExtractRequest) -> Iterator[tuple[str, Any]]:
+    """Run the pipeline, yielding (stage, result) as each of steps 1–5 completes.
+
+    Every stage in PIPELINE_STAGES is yielded exactly once; skipped or failed
+    optional stages yield None. 'heights' yields the enriched buildings.
+    """
+    bbox = tuple(req.bbox)
+    cache = get_stage_cache() if req.use_cache and STAGE_CACHE_ENABLED else None
+
+    def stage(name: str, key: str, compute):
+        # Span covers cache lookups too, so a hit shows up as a short stage
+        with span(f"extract.{name}") as s:
+            result = cache.get_or_compute(name, key, compute) if cache else compute()
+            if isinstance(result, gpd.GeoDataFrame):
+                s.features = len(result)
+            return result
+
+    # Stage keys chain upstream keys, so a changed input only invalidates
+    # the stages downstream of it.
+    source = {"source": req.source, "source_path": req.source_path}
+    # Raw buildings are keyed by the extent they cover, so a request that
+    # partly overlaps earlier ones only fetches the uncovered parts
+    extent = tuple(round(c, 7) for c in buffer_bbox(bbox, req.buffer_m))
+    buildings_scope = buildings_key = streets_key = ""
+    if cache:
+        fingerprint = source_fingerprint(**source)
+        buildings_scope = cache.key(
+            "buildings", source=fingerprint, height_parser=HEIGHT_PARSER_VERSION
+        )
+        buildings_key = cache.area_key(buildings_scope, extent)
+        # neatnet simplifies the network as a whole, so streets only match exactly
+        streets_key = cache.key(
+            "streets",
+            bbox=[round(c, 7) for c in bbox],
+            buffer_m=req.buffer_m,
+            source=fingerprint,
+            simplify=req.simplify_streets,
+        )
+
+    def fetch_buildings(part: tuple[float, float, float, float]) -> gpd.GeoDataFrame:
+        return extract_buildings(part, buffer_m=0, **source)
+
+    # Step 1: Extract buildings
+    logger.info("Step 1: Extracting buildings...")
+    buildings_gdf = stage(
+        "buildings", buildings_key,
+        (lambda: cache.compose_area("buildings", buildings_scope, extent, fetch_buildings))
+        if cache else lambda: extract_buildings(bbox, buffer_m=req.buffer_m, **source),
+    )
+
+    if buildings_gdf.empty:
+        raise NoBuildingsError("No buildings found in bbox")
+    yield "buildings", buildings_gdf
+
+    # One projected CRS for the whole fragment; each layer is projected once
+    ctx = ProjectionContext.for_layers(buildings_gdf)
+
+    # Step 2: Extract streets
+    logger.info("Step 2: Extracting streets...")
+    streets_gdf = stage(
+        "streets", streets_key,
+        lambda: extract_streets(
+            bbox, buffer_m=req.buffer_m, simplify=req.simplify_streets, **source
+        ),
+    )
+    yield "streets", streets_gdf
+
+    # Step 3: Height enrichment
+    enriched = None
+    if req.include_heights:
+        logger.info("Step 3: Enriching heights...")
+        upstream = buildings_gdf
+        buildings_key = cache.key(
+            "heights",
+            buildings=buildings_key,
+            tiers=HEIGHT_TIERS,
+            height_data=height_data_fingerprint(req.region),
+        ) if cache else ""
+        enriched = stage(
+            "heights", buildings_key,
+            lambda: enrich_heights(upstream, region=req.region, ctx=ctx),
+        )
+        buildings_gdf = enriched
+    yield "heights", enriched
+
+    # Step 4: Tessellation
+    tessellation_gdf = None
+    tessellation_key = ""
+    if req.include_tessellation and not streets_gdf.empty:
+        logger.info("Step 4: Computing tessellation...")
+        if cache:
+            tessellation_key = cache.key(
+                "tessellation",
+                buildings=buildings_key,
+                streets=streets_key,
+                segment=TESSELLATION_SEGMENT,
+                simplify=TESSELLATION_SIMPLIFY,
+            )
+        try:
+            tessellation_gdf = stage(
+                "tessellation", tessellation_key,
+                lambda: compute_tessellation(buildings_gdf, streets_gdf, ctx=ctx),
+            )
+        except Exception as e:
+            logger.warning("Tessellation failed: %s", e)
+    yield "tessellation", tessellation_gdf
+
+    # Step 5: Summary metrics
+    metrics = None
+    if req.include_metrics:
+        logger.info("Step 5: Computing summary metrics...")
+        try:
+            metrics_key = cache.key(
+                "metrics",
+                buildings=buildings_key,
+                streets=streets_key,
+                tessellation=tessellation_key if tessellation_gdf is not None else None,
+            ) if cache else ""
+            summary = stage(
+                "metrics", metrics_key,
+                lambda: compute_summary_metrics(
+                    buildings_gdf, streets_gdf,
+                    tessellation_gdf if tessellation_gdf is not None else buildings_gdf.iloc[:0],
+                    ctx=ctx,
+                ),
+            )
+            metrics = build_metrics(summary)
+        except Exception as e:
+            logger.warning("Metrics failed: %s", e)
+    yield "metrics", metrics
+
+
+def run_extract(
+    req: ExtractRequest,
+    on_stage: Callable[[int, str], None] | None = None,
+) -> dict:
+    """Run the full pipeline and return a FragmentPackage-shaped dict.
+
+    Layers are GeoDataFrames (tessellation/blocks may be None); serialize with
+    utils.transport.package_response.
+
+    Args:
+        req: Extraction request.
+        on_stage: Called with (step number 1–5, stage name) as each stage completes.
+    """
+    t0 = time.time()
+    results: dict[str, Any] = {}
+    for step, (name, value) in enumerate(iter_extract_stages(req), start=1):
+        results[name] = value
+        if on_stage is not None:
+            on_stage(step, name)
+
+    buildings_gdf = results["heights"] if results["heights"] is not None else results["buildings"]
+    streets_gdf = results["streets"]
+    tessellation_gdf = results["tessellation"]
+
+    elapsed = time.time() - t0
+    logger.info("Extraction complete in %.1fs: %d buildings, %d streets",
+                elapsed, len(buildings_gdf), len(streets_gdf))
+
+    return {
+        "metadata": build_metadata(tuple(req.bbox), buildings_gdf, streets_gdf, tessellation_gdf),
+        "buildings": buildings_gdf,
+        "streets": streets_gdf,
+        "tessellation": tessellation_gdf,
+        "blocks": None,
+        "metrics": results["metrics"],
+    }
+
+
+def build_metrics(summary: dict) -> dict:
+    """Wrap compute_summary_metrics output as a FragmentMetrics dict."""
+    return {
+        "fragment_id": str(uuid.uuid4())[:8],
+        "computed_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "tier1": [
+            {"key": k, "label": k.replace("_", " ").title(), "value": v,
+             "unit": "", "tier": 1, "category": "dimension"}
+            for k, v in summary.items()
+        ],
+        "tier2": [],
+        "tier3": [],
+    }
+
+
+def build_metadata(
+    bbox: tuple[float, float, float, float],
+    buildings_gdf: gpd.GeoDataFrame,
+    streets_gdf: gpd.GeoDataFrame,
+    tessellation_gdf: gpd.GeoDataFrame | None,
+) -> dict:
+    """FragmentPackage metadata block for an extraction."""
+    height_coverage = (
+        (buildings_gdf["height_source"] != "type_default").sum() / len(buildings_gdf)
+        if len(buildings_gdf) > 0 else 0
+    )
+    return {
+        "id": str(uuid.uuid4())[:8],
+        "name": f"Extract {bbox[0]:.4f},{bbox[1]:.4f}",
+        "city": "unknown",
+        "country": "unknown",
+        "extracted_at": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "crs": "EPSG:4326",
+        "bbox": list(bbox),
+        "data_sources": [
+            "osm",
+            *(d for d in HEIGHT_DATASETS if (buildings_gdf["height_source"] == d).any()),
+        ],
+        "building_count": len(buildings_gdf),
+        "street_segment_count": len(streets_gdf),
+        "tessellation_cell_count": len(tessellation_gdf) if tessellation_gdf is not None else 0,
+        "quality": {
+            "building_completeness": 1.0,
+            "height_coverage": float(height_coverage),
+            "street_network_connected": True,
+            "tessellation_success": tessellation_gdf is not None,
+        },
+    }
@@ -2,17 +2,45 @@
 
 Based on C3 spike: cityseer NAIN/NACH at [400, 800, 1600, 10000]m radii.
 Pre-computed at extraction time (AGPL mitigation: values are data, not software).
+Without cityseer, the same radius-limited analysis runs on a scipy CSR dual graph.
 """
 
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 import geopandas as gpd
+import numpy as np
+import shapely
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from collage_backend.config import SPACE_SYNTAX_N_JOBS, SPACE_SYNTAX_NETWORK_CACHE_SIZE
+from collage_backend.utils.geometry import line_ends, snap_nodes
+from collage_backend.utils.io import json_floats
+from collage_backend.utils.memo import LRUMemo, frame_digest
+from collage_backend.utils.parallel import pool_context, worker_count
+from collage_backend.utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_RADII = [400, 800, 1600, 10000]
 
+# Street midpoint → cleaned segment matching tolerance (meters)
+SEGMENT_MATCH_TOLERANCE_M = 1.0
 
+# csgraph fallback: end points closer than this share a node (meters);
+# sources per Dijkstra batch; networks smaller than this stay in-process
+NODE_SNAP_M = 0.01
+SOURCE_BATCH_SIZE = 128
+PARALLEL_MIN_SEGMENTS = 1000
+WEIGHT_EPS = 1e-9
+
+# Built networks (cityseer or csgraph) keyed by streets geometry digest
+_NETWORK_CACHE = LRUMemo("space_syntax_network", SPACE_SYNTAX_NETWORK_CACHE_SIZE)
+
+
+@traced("space_syntax")
 def compute_space_syntax(
     streets_gdf: gpd.GeoDataFrame,
     radii: list[int] | None = None,
@@ -20,17 +48,19 @@ def compute_space_syntax(
     """Compute NAIN/NACH at specified radii.
 
     Uses cityseer's Rust-backed node_centrality for performance.
-    Falls back to momepy dual-graph approach if cityseer is unavailable.
+    Falls back to a scipy CSR angular dual graph if cityseer is unavailable.
 
     Args:
         streets_gdf: Street LineStrings (WGS84 or projected).
         radii: Radii in meters (default: [400, 800, 1600, 10000]).
 
     Returns:
-        Dict with per-segment centrality values and aggregates.
+        Dict with per-segment values as columnar arrays
+        {"ids": [street id, ...], "columns": {"nain_400": [...], ...}}
+        (None where a street was dropped by network cleaning) and aggregates.
     """
     if streets_gdf.empty:
-        return {"per_segment": {}, "aggregates": {}}
+        return _empty_result()
 
     radii = radii or DEFAULT_RADII
 
@@ -39,16 +69,46 @@ def compute_space_syntax(
     try:
         return _compute_cityseer(streets_gdf, radii)
     except ImportError:
-        logger.warning("cityseer not available, falling back to momepy")
-        return _compute_momepy(streets_gdf, radii)
+        logger.warning("cityseer not available, falling back to scipy csgraph")
     except Exception as e:
-        logger.warning("cityseer failed: %s, falling back to momepy", e)
-        return _compute_momepy(streets_gdf, radii)
+        logger.warning("cityseer failed: %s, falling back to scipy csgraph", e)
+    return _compute_csgraph(streets_gdf, radii)
 
 
 def _compute_cityseer(streets_gdf: gpd.GeoDataFrame, radii: list[int]) -> dict:
-    """Compute via cityseer (Rust-backed, ~1.7s for 1000 segments)."""
+    """Compute via cityseer (Rust-backed, ~1.7s for 1000 segments).
+
+    Angular centrality runs on the dual graph (one node per merged street
+    segment), so every input street maps to the dual node of the segment it
+    lies on.
+    """
     from cityseer.metrics import networks as net_metrics
+
+    nodes_gdf, structure, segment_node = _NETWORK_CACHE.get_or_compute(
+        frame_digest(streets_gdf), lambda: _build_cityseer_network(streets_gdf)
+    )
+    # node_centrality_simplest adds columns in place; keep the cached frame clean
+    centrality_df = net_metrics.node_centrality_simplest(
+        structure, nodes_gdf.copy(deep=False), distances=radii
+    )
+
+    stats = {
+        key: np.array([
+            centrality_df[f"cc_{name}_{radius}_ang"].to_numpy(dtype=float) for radius in radii
+        ])
+        for key, name in (("node_count", "density"), ("total_depth", "farness"),
+                          ("choice", "betweenness"))
+    }
+    logger.info("cityseer computed centrality for %d segments", len(nodes_gdf))
+    return _package(streets_gdf, radii, segment_node, **stats)
+
+
+def _build_cityseer_network(streets_gdf: gpd.GeoDataFrame) -> tuple:
+    """(nodes_gdf, network_structure, segment_node) for a streets layer.
+
+    segment_node holds, per input street, the row in nodes_gdf of the dual
+    node it belongs to, or -1 where cleaning dropped the street.
+    """
     from cityseer.tools import graphs as graph_tools
     from cityseer.tools import io as cs_io
 
@@ -56,70 +116,242 @@ def _compute_cityseer(streets_gdf: gpd.GeoDataFrame, radii: list[int]) -> dict:
 
     streets_proj = ensure_projected(streets_gdf)
 
-    # Build cityseer network from GeoDataFrame
     G = cs_io.nx_from_generic_geopandas(streets_proj)
-    graph_tools.nx_remove_filler_nodes(G)
-    graph_tools.nx_remove_dangling_nodes(G)
+    G = graph_tools.nx_remove_filler_nodes(G)
+    G = graph_tools.nx_remove_dangling_nodes(G)
+    G_dual = graph_tools.nx_to_dual(G)
+    nodes_gdf, _, structure = cs_io.network_structure_from_nx(G_dual)
+
+    # A street's midpoint lies on the (merged) primal edge of its dual node
+    midpoints = shapely.line_interpolate_point(
+        streets_proj.geometry.to_numpy(), 0.5, normalized=True
+    )
+    if "primal_edge" in nodes_gdf.columns:
+        targets = gpd.GeoSeries(nodes_gdf["primal_edge"].to_numpy(), crs=streets_proj.crs)
+        max_distance = SEGMENT_MATCH_TOLERANCE_M
+    else:
+        targets = gpd.GeoSeries(nodes_gdf.geometry.to_numpy(), crs=streets_proj.crs)
+        max_distance = None
+    street_idx, node_idx = targets.sindex.nearest(
+        midpoints, max_distance=max_distance, return_all=False
+    )
+    segment_node = np.full(len(streets_proj), -1, dtype=np.int64)
+    segment_node[street_idx] = node_idx
 
-    struct = cs_io.network_structure_from_nx(G)
-    centrality_df = net_metrics.node_centrality_simplest(
-        struct,
-        distances=radii,
+    logger.info(
+        "cityseer network built: %d segments, %d/%d streets matched",
+        len(nodes_gdf), (segment_node >= 0).sum(), len(segment_node),
     )
+    return nodes_gdf, structure, segment_node
 
-    # Extract per-segment results
-    per_segment: dict[str, dict] = {}
-    aggregates: dict[str, float] = {}
 
-    for radius in radii:
-        nain_col = f"cc_beta_simplest_{radius}"
-        nach_col = f"cc_betweenness_simplest_{radius}"
+def _street_ids(streets_gdf: gpd.GeoDataFrame) -> list[str]:
+    if "id" in streets_gdf.columns:
+        return streets_gdf["id"].astype(str).tolist()
+    return streets_gdf.index.astype(str).tolist()
+
 
-        nain_vals = centrality_df[nain_col].values if nain_col in centrality_df.columns else []
-        nach_vals = centrality_df[nach_col].values if nach_col in centrality_df.columns else []
+def _empty_result(aggregates: dict | None = None) -> dict:
+    return {"per_segment": {"ids": [], "columns": {}}, "aggregates": aggregates or {}}
 
-        if len(nain_vals) > 0:
-            aggregates[f"nain_{radius}_mean"] = float(nain_vals.mean())
-            aggregates[f"nain_{radius}_std"] = float(nain_vals.std())
-        if len(nach_vals) > 0:
-            aggregates[f"nach_{radius}_mean"] = float(nach_vals.mean())
-            aggregates[f"nach_{radius}_std"] = float(nach_vals.std())
 
-    logger.info("cityseer computed %d aggregates", len(aggregates))
-    return {"per_segment": per_segment, "aggregates": aggregates}
+def _compute_csgraph(
+    streets_gdf: gpd.GeoDataFrame,
+    radii: list[int],
+    n_jobs: int = SPACE_SYNTAX_N_JOBS,
+) -> dict:
+    """Fallback: radius-limited angular analysis on a scipy CSR dual graph.
+
+    For each source segment, a metric Dijkstra (limit = largest radius)
+    finds the segments within each radius. An angular Dijkstra on the
+    subgraph they induce then gives angular depths, and the shortest-path
+    tree gives choice. Source batches run in a process pool on large
+    networks. Ties between equal-cost paths are not split, so choice can
+    differ slightly from cityseer on perfect grids.
+    """
+    angular, metric, segment_node = _NETWORK_CACHE.get_or_compute(
+        "csgraph:" + frame_digest(streets_gdf), lambda: _build_angular_graph(streets_gdf)
+    )
+    n = angular.shape[0]
+    if n == 0:
+        return _empty_result()
+    batches = [np.arange(i, min(i + SOURCE_BATCH_SIZE, n)) for i in range(0, n, SOURCE_BATCH_SIZE)]
+    workers = min(worker_count(n_jobs), len(batches))
+
+    if workers == 1 or n < PARALLEL_MIN_SEGMENTS:
+        parts = [_source_batch(batch, radii, (angular, metric)) for batch in batches]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=pool_context(),
+            initializer=_init_worker,
+            initargs=(angular, metric),
+        ) as pool:
+            parts = list(pool.map(_source_batch, batches, repeat(radii)))
+
+    logger.info("csgraph fallback computed %d segments on %d workers", n, workers)
+    return _package(
+        streets_gdf, radii, segment_node,
+        node_count=np.concatenate([p[0] for p in parts], axis=1),
+        total_depth=np.concatenate([p[1] for p in parts], axis=1),
+        choice=sum(p[2] for p in parts),
+    )
 
 
-def _compute_momepy(streets_gdf: gpd.GeoDataFrame, radii: list[int]) -> dict:
-    """Fallback: compute via momepy dual graph (slower, global radius only)."""
-    import momepy
-    import networkx as nx
+def _build_angular_graph(streets_gdf: gpd.GeoDataFrame) -> tuple:
+    """(angular, metric, segment_node) dual graph of a streets layer.
 
+    Segments are nodes; two segments are linked where their end points meet
+    (within NODE_SNAP_M). Link weights are the turn angle in units of 90°
+    (angular) and the midpoint-to-midpoint length (metric). segment_node maps
+    each input street to its graph node (-1 for empty geometries).
+    """
     from collage_backend.utils.crs import ensure_projected
 
-    streets_proj = ensure_projected(streets_gdf)
+    geoms = ensure_projected(streets_gdf).geometry.to_numpy()
+    valid, coords, first, last = line_ends(geoms)
+    lengths = shapely.length(geoms[valid])
+
+    # Segment ends: where they are and which way the segment leaves them
+    end_xy = np.concatenate([coords[first], coords[last]])
+    outward = np.concatenate([coords[first + 1] - coords[first], coords[last - 1] - coords[last]])
+    norm = np.linalg.norm(outward, axis=1, keepdims=True)
+    outward = np.divide(outward, norm, out=np.zeros_like(outward), where=norm > 0)
+    end_seg = np.tile(np.arange(len(valid)), 2)
+    _, end_node = snap_nodes(end_xy, NODE_SNAP_M)
+
+    # Pair up every two segment ends at the same node
+    order = np.argsort(end_node, kind="stable")
+    sorted_node = end_node[order]
+    a_parts, b_parts = [], []
+    for offset in range(1, len(order)):
+        same = sorted_node[offset:] == sorted_node[:-offset]
+        if not same.any():
+            break
+        a_parts.append(order[:-offset][same])
+        b_parts.append(order[offset:][same])
+    a = np.concatenate(a_parts) if a_parts else np.empty(0, dtype=int)
+    b = np.concatenate(b_parts) if b_parts else np.empty(0, dtype=int)
+    distinct = end_seg[a] != end_seg[b]
+    a, b = a[distinct], b[distinct]
+
+    # Arriving along a (against its outward direction) and leaving along b
+    cos = np.einsum("ij,ij->i", outward[a], outward[b]).clip(-1, 1)
+    turn = 180.0 - np.degrees(np.arccos(cos))
+    i, j = end_seg[a], end_seg[b]
+    src, dst = np.concatenate([i, j]), np.concatenate([j, i])
+    # Zero-weight links would vanish from the sparse matrix; keep them positive
+    angular = np.tile(turn / 90.0, 2) + WEIGHT_EPS
+    metric = np.tile((lengths[i] + lengths[j]) / 2, 2) + WEIGHT_EPS
+
+    # Segments meeting at both ends: keep the cheaper turn
+    keep = np.lexsort((angular, dst, src))
+    src, dst, angular, metric = src[keep], dst[keep], angular[keep], metric[keep]
+    unique = np.ones(len(src), dtype=bool)
+    unique[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+
+    shape = (len(valid), len(valid))
+    segment_node = np.full(len(geoms), -1, dtype=np.int64)
+    segment_node[valid] = np.arange(len(valid))
+    return (
+        csr_matrix((angular[unique], (src[unique], dst[unique])), shape=shape),
+        csr_matrix((metric[unique], (src[unique], dst[unique])), shape=shape),
+        segment_node,
+    )
 
-    try:
-        G = momepy.gdf_to_nx(streets_proj, approach="dual")
-    except Exception as e:
-        logger.warning("momepy dual graph construction failed: %s", e)
-        return {"per_segment": {}, "aggregates": {}}
 
-    aggregates: dict[str, float] = {}
+_WORKER_GRAPHS: tuple | None = None
 
-    # Global NAIN/NACH (momepy radius-limited is too slow for production)
-    try:
-        closeness = nx.closeness_centrality(G, distance="angle")
-        betweenness = nx.betweenness_centrality(G, weight="angle")
 
-        c_vals = list(closeness.values())
-        b_vals = list(betweenness.values())
+def _init_worker(angular: csr_matrix, metric: csr_matrix) -> None:
+    # Ship the graphs once per worker rather than once per batch
+    global _WORKER_GRAPHS
+    _WORKER_GRAPHS = (angular, metric)
 
-        if c_vals:
-            aggregates["nain_global_mean"] = float(sum(c_vals) / len(c_vals))
-        if b_vals:
-            aggregates["nach_global_mean"] = float(sum(b_vals) / len(b_vals))
-    except Exception as e:
-        logger.warning("momepy centrality failed: %s", e)
 
-    logger.info("momepy fallback computed %d aggregates", len(aggregates))
-    return {"per_segment": {}, "aggregates": aggregates}
+def _source_batch(
+    sources: np.ndarray,
+    radii: list[int],
+    graphs: tuple | None = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(node_count, total_depth, choice) contributions of a batch of sources.
+
+    node_count and total_depth are (radii, sources); choice is (radii, nodes).
+    """
+    angular, metric = graphs or _WORKER_GRAPHS
+    reach = dijkstra(metric, indices=sources, limit=max(radii))
+    node_count = np.zeros((len(radii), len(sources)))
+    total_depth = np.zeros((len(radii), len(sources)))
+    choice = np.zeros((len(radii), angular.shape[0]))
+
+    for k in range(len(sources)):
+        # Nearest first: the source is row 0 and each radius is a prefix, so
+        # the max-radius subgraph is sliced once and the others are cut from it
+        within = np.flatnonzero(np.isfinite(reach[k]))
+        within = within[np.argsort(reach[k][within], kind="stable")]
+        ends = np.searchsorted(reach[k][within], radii, side="right")
+        subgraph = angular[within][:, within]
+        for r, end in enumerate(ends):
+            graph = subgraph if end == len(within) else subgraph[:end, :end]
+            depth, pred = dijkstra(graph, indices=0, return_predecessors=True)
+            reached = np.isfinite(depth)
+            node_count[r, k] = reached.sum() - 1
+            total_depth[r, k] = depth[reached].sum()
+            through = _subtree_sizes(pred, reached) - reached
+            through[0] = 0
+            choice[r, within[:end]] += through
+    return node_count, total_depth, choice
+
+
+def _subtree_sizes(pred: np.ndarray, reached: np.ndarray) -> np.ndarray:
+    """Reached nodes in each node's shortest-path subtree (itself included)."""
+    sizes = reached.astype(float)
+    # Walk every node's ancestors up together, counting it once at each
+    ancestor = pred[pred >= 0]
+    while len(ancestor):
+        sizes += np.bincount(ancestor, minlength=len(pred))
+        ancestor = pred[ancestor]
+        ancestor = ancestor[ancestor >= 0]
+    return sizes
+
+
+def _package(
+    streets_gdf: gpd.GeoDataFrame,
+    radii: list[int],
+    segment_node: np.ndarray,
+    node_count: np.ndarray,
+    total_depth: np.ndarray,
+    choice: np.ndarray,
+) -> dict:
+    """Per-street NAIN/NACH columns and aggregates from per-node statistics.
+
+    NAIN/NACH follow Hillier et al. (2012):
+
+        NAIN = (NC + 2)^1.2 / (TD + 2)
+        NACH = log(CH + 1) / log(TD + 3)
+
+    with NC the node count, TD the total angular depth and CH the angular
+    choice within the radius; arrays are (radii, graph nodes).
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = {
+            "nain": (node_count + 2) ** 1.2 / (total_depth + 2),
+            "nach": np.log(choice + 1) / np.log(total_depth + 3),
+        }
+
+    columns: dict[str, list] = {}
+    aggregates: dict[str, float] = {}
+    matched = segment_node >= 0
+    for r, radius in enumerate(radii):
+        for name, node_values in values.items():
+            per_segment = np.full(len(segment_node), np.nan)
+            per_segment[matched] = node_values[r][segment_node[matched]]
+            columns[f"{name}_{radius}"] = json_floats(per_segment)
+            finite = node_values[r][np.isfinite(node_values[r])]
+            if len(finite):
+                aggregates[f"{name}_{radius}_mean"] = float(finite.mean())
+                aggregates[f"{name}_{radius}_std"] = float(finite.std())
+    return {
+        "per_segment": {"ids": _street_ids(streets_gdf), "columns": columns},
+        "aggregates": aggregates,
+    }
@@ -0,0 +1,309 @@
+"""Content-addressed on-disk cache for /extract pipeline stages.
+
+Each stage result is stored under CACHE_DIR/<stage>/<key>.parquet (GeoParquet)
+or <key>.json (dict results). Keys are SHA-256 hashes of the stage inputs,
+the keys of upstream stages and the versions of the libraries involved, so a
+changed parameter or library upgrade only invalidates the stages it touches.
+
+Eviction is LRU by last access (file atime) with an upper bound on total size,
+plus an age limit measured from creation (file mtime).
+
+Area-scoped stages (raw buildings) are keyed by the extent they cover as
+well, so a request that only partly overlaps earlier ones reuses their
+features and fetches just the uncovered parts (see compose_area).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+from importlib import metadata
+from pathlib import Path
+from typing import Any
+
+import geopandas as gpd
+import pandas as pd
+import shapely
+from shapely.geometry import box
+
+from collage_backend import __version__
+from collage_backend.config import (
+    CACHE_DIR,
+    STAGE_CACHE_ENABLED,
+    STAGE_CACHE_MAX_AGE_S,
+    STAGE_CACHE_MAX_BYTES,
+)
+from collage_backend.utils.geometry import bbox_difference
+
+logger = logging.getLogger(__name__)
+
+# Libraries whose versions are folded into every cache key
+VERSIONED_LIBRARIES = ["geopandas", "shapely", "pyproj", "osmnx", "neatnet", "momepy"]
+
+
+class StageCache:
+    """On-disk GeoParquet/JSON cache with size/age-based LRU eviction."""
+
+    def __init__(self, root: str | Path, max_bytes: int, max_age_s: float):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self._lock = threading.Lock()
+        self._hits: dict[str, int] = {}
+        self._misses: dict[str, int] = {}
+        self._partial_hits: dict[str, int] = {}
+
+    def key(self, stage: str, **inputs: Any) -> str:
+        """Hash stage inputs (plus library versions) into a cache key."""
+        payload = {
+            "stage": stage,
+            "inputs": inputs,
+            "versions": library_versions(),
+        }
+        blob = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha256(blob).hexdigest()[:32]
+
+    def area_key(self, scope: str, extent: tuple[float, float, float, float]) -> str:
+        """Key of an area-scoped entry: a key() of everything but the area, plus its extent."""
+        return "_".join([scope, *(f"{c:.7f}" for c in extent)])
+
+    def get(self, stage: str, key: str) -> Any | None:
+        """Return the cached value for (stage, key), or None on a miss."""
+        value = self._load(stage, key)
+        self._count(self._hits if value is not None else self._misses, stage)
+        return value
+
+    def _load(self, stage: str, key: str) -> Any | None:
+        for path in self._paths(stage, key):
+            if not path.exists():
+                continue
+            stat = path.stat()
+            if time.time() - stat.st_mtime > self.max_age_s:
+                path.unlink(missing_ok=True)
+                break
+            try:
+                value = _read(path)
+            except Exception as e:
+                logger.warning("Stage cache entry %s unreadable, dropping: %s", path, e)
+                path.unlink(missing_ok=True)
+                break
+            # Touch atime only — mtime keeps the creation time for age eviction
+            os.utime(path, (time.time(), stat.st_mtime))
+            return value
+        return None
+
+    def put(self, stage: str, key: str, value: Any) -> None:
+        """Store a GeoDataFrame or dict result. Failures are logged, not raised."""
+        if value is None:
+            return
+        ext = ".parquet" if isinstance(value, gpd.GeoDataFrame) else ".json"
+        path = self.root / stage / f"{key}{ext}"
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            _write(value, tmp)
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.warning("Stage cache write failed for %s/%s: %s", stage, key, e)
+            tmp.unlink(missing_ok=True)
+            return
+        self.evict()
+
+    def get_or_compute(self, stage: str, key: str, compute: Callable[[], Any]) -> Any:
+        """Return the cached stage result, computing and storing it on a miss."""
+        value = self.get(stage, key)
+        if value is not None:
+            logger.info("Stage cache hit: %s/%s", stage, key)
+            return value
+        value = compute()
+        self.put(stage, key, value)
+        return value
+
+    def compose_area(
+        self,
+        stage: str,
+        scope: str,
+        extent: tuple[float, float, float, float],
+        fetch: Callable[[tuple[float, float, float, float]], gpd.GeoDataFrame],
+    ) -> gpd.GeoDataFrame:
+        """Assemble features for extent from cached entries of the same scope.
+
+        Entries stored under area_key(scope, ...) that overlap extent are
+        reused, largest overlap first; fetch(bbox) is only called for the
+        parts of extent they leave uncovered. Features are kept where they
+        intersect extent, and once where several parts return the same
+        geometry (cached copies first, so their ids stay stable).
+        """
+        missing = [extent]
+        pieces = []
+        for cached_extent, key in self._overlapping(stage, scope, extent):
+            remaining = [part for m in missing for part in bbox_difference(m, cached_extent)]
+            if remaining == missing:
+                continue
+            value = self._load(stage, key)
+            if value is None:
+                continue
+            pieces.append(value)
+            missing = remaining
+            if not missing:
+                break
+
+        if pieces:
+            self._count(self._partial_hits, stage)
+            logger.info(
+                "Stage cache: %s reuses %d cached areas, fetching %d parts",
+                stage, len(pieces), len(missing),
+            )
+        pieces += [fetch(part) for part in missing]
+        combined = pd.concat(pieces, ignore_index=True)
+        combined = combined[combined.intersects(box(*extent))]
+        wkb = shapely.to_wkb(shapely.normalize(combined.geometry.to_numpy()))
+        return combined[~pd.Series(wkb).duplicated().to_numpy()].reset_index(drop=True)
+
+    def evict(self) -> int:
+        """Drop expired entries, then least-recently-used ones until under max_bytes."""
+        now = time.time()
+        entries = []
+        removed = 0
+        for path in self.root.glob("*/*"):
+            if path.name.startswith("."):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.max_age_s:
+                path.unlink(missing_ok=True)
+                removed += 1
+            else:
+                entries.append((stat.st_atime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+
+        if removed:
+            logger.info("Stage cache evicted %d entries (%.1f MB kept)", removed, total / 1e6)
+        return removed
+
+    def clear(self) -> int:
+        """Remove every cache entry. Returns the number of files removed."""
+        removed = 0
+        for path in self.root.glob("*/*"):
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        """Hit/miss counters per stage plus current on-disk footprint."""
+        with self._lock:
+            hits = dict(self._hits)
+            misses = dict(self._misses)
+            partial_hits = dict(self._partial_hits)
+        files = [p for p in self.root.glob("*/*") if not p.name.startswith(".")]
+        total_hits = sum(hits.values())
+        total_lookups = total_hits + sum(misses.values())
+        return {
+            "enabled": STAGE_CACHE_ENABLED,
+            "path": str(self.root),
+            "entries": len(files),
+            "size_bytes": sum(p.stat().st_size for p in files if p.exists()),
+            "max_bytes": self.max_bytes,
+            "max_age_s": self.max_age_s,
+            "hits": hits,
+            "misses": misses,
+            "partial_hits": partial_hits,
+            "hit_rate": total_hits / total_lookups if total_lookups else 0.0,
+        }
+
+    def _paths(self, stage: str, key: str) -> list[Path]:
+        return [self.root / stage / f"{key}.parquet", self.root / stage / f"{key}.json"]
+
+    def _overlapping(
+        self, stage: str, scope: str, extent: tuple[float, float, float, float]
+    ) -> list[tuple[tuple[float, ...], str]]:
+        """(extent, key) of the area entries of scope overlapping extent, largest overlap first."""
+        found = []
+        for path in (self.root / stage).glob(f"{scope}_*.parquet"):
+            key = path.name.removesuffix(".parquet")
+            try:
+                cached = tuple(float(c) for c in key.split("_")[1:])
+            except ValueError:
+                continue
+            overlap = _overlap_area(extent, cached) if len(cached) == 4 else 0.0
+            if overlap > 0:
+                found.append((overlap, cached, key))
+        return [(cached, key) for _, cached, key in sorted(found, reverse=True)]
+
+    def _count(self, counter: dict[str, int], stage: str) -> None:
+        with self._lock:
+            counter[stage] = counter.get(stage, 0) + 1
+
+
+_cache: StageCache | None = None
+
+
+def get_stage_cache() -> StageCache:
+    """Return the process-wide stage cache."""
+    global _cache
+    if _cache is None:
+        _cache = StageCache(CACHE_DIR, STAGE_CACHE_MAX_BYTES, STAGE_CACHE_MAX_AGE_S)
+    return _cache
+
+
+_versions: dict[str, str | None] | None = None
+
+
+def library_versions() -> dict[str, str | None]:
+    """Installed versions of the libraries that shape stage outputs."""
+    global _versions
+    if _versions is None:
+        versions: dict[str, str | None] = {"collage_backend": __version__}
+        for name in VERSIONED_LIBRARIES:
+            try:
+                versions[name] = metadata.version(name)
+            except metadata.PackageNotFoundError:
+                versions[name] = None
+        _versions = versions
+    return _versions
+
+
+def _overlap_area(a: tuple[float, ...], b: tuple[float, ...]) -> float:
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    return width * height if width > 0 and height > 0 else 0.0
+
+
+def _write(value: Any, path: Path) -> None:
+    if isinstance(value, gpd.GeoDataFrame):
+        _parquet_safe(value).to_parquet(path, engine="pyarrow")
+    else:
+        path.write_text(json.dumps(value, default=float))
+
+
+def _read(path: Path) -> Any:
+    if path.name.endswith(".parquet"):
+        return gpd.read_parquet(path)
+    return json.loads(path.read_text())
+
+
+def _parquet_safe(gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """Join list-valued OSM tags (e.g. lanes=['2', '3']) with ';' as OSM does."""
+    out = gdf
+    for col in gdf.columns:
+        if col == gdf.geometry.name or gdf[col].dtype != object:
+            continue
+        if gdf[col].map(lambda v: isinstance(v, list)).any():
+            if out is gdf:
+                out = gdf.copy()
+            out[col] = gdf[col].map(
+                lambda v: ";".join(map(str, v)) if isinstance(v, list) else v
+            )
+    return out
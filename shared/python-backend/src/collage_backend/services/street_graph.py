@@ -0,0 +1,235 @@
+"""Street network graph for distance queries, cached per streets layer.
+
+The streets are turned into a symmetric CSR adjacency matrix over their
+end points (weights = street length) plus a KD-tree over those nodes. Both
+are built once per streets geometry and kept in an in-memory LRU, so
+repeated isochrone requests on the same network go straight to scipy's
+multi-source Dijkstra.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Literal
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from pyproj import CRS
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+from shapely.ops import substring
+
+from collage_backend.config import STREET_GRAPH_CACHE_SIZE
+from collage_backend.utils.crs import ProjectionContext, ensure_projected
+from collage_backend.utils.geometry import line_ends, snap_nodes
+from collage_backend.utils.memo import LRUMemo, frame_digest
+from collage_backend.utils.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+IsochroneShape = Literal["edges", "concave", "convex"]
+
+# End points closer than this share a node (meters)
+NODE_SNAP_M = 0.01
+# Origins per Dijkstra call; bounds the (origins × nodes) distance matrix
+ISOCHRONE_BATCH_SIZE = 128
+CONCAVE_HULL_RATIO = 0.3
+# Arc segments per quarter circle for 'edges' buffers: ~3x faster than
+# shapely's 16, within ~1% of the exact area at the default 25 m buffer
+EDGE_BUFFER_QUAD_SEGS = 2
+# Zero-length streets would vanish from the sparse matrix; keep them positive
+WEIGHT_EPS = 1e-9
+
+_GRAPH_CACHE = LRUMemo("street_graph", STREET_GRAPH_CACHE_SIZE)
+
+
+@dataclass(frozen=True)
+class StreetGraph:
+    """Projected street network as a CSR graph over street end points."""
+
+    crs: CRS
+    nodes: np.ndarray  # (n, 2) node coordinates
+    adjacency: csr_matrix  # (n, n) street lengths, both directions
+    tree: cKDTree | None  # None for a network without streets
+    edge_u: np.ndarray  # start node of each graph edge (one per usable street)
+    edge_v: np.ndarray  # end node
+    edge_length: np.ndarray
+    edge_geometry: np.ndarray  # projected LineStrings, oriented u → v
+
+
+def get_street_graph(streets_gdf: gpd.GeoDataFrame) -> StreetGraph:
+    """StreetGraph for a streets layer, built on first use and then cached."""
+    return _GRAPH_CACHE.get_or_compute(
+        frame_digest(streets_gdf), lambda: _build_street_graph(streets_gdf)
+    )
+
+
+def _build_street_graph(streets_gdf: gpd.GeoDataFrame) -> StreetGraph:
+    streets = ensure_projected(streets_gdf)
+    geoms = streets.geometry.to_numpy()
+    valid, coords, first, last = line_ends(geoms)
+    # Only simple lines can be cut at a distance for isochrone frontiers
+    valid_lines = shapely.get_type_id(geoms[valid]) == 1
+    valid, first, last = valid[valid_lines], first[valid_lines], last[valid_lines]
+
+    nodes, node_of = snap_nodes(np.concatenate([coords[first], coords[last]]), NODE_SNAP_M)
+    edge_u, edge_v = node_of[: len(valid)], node_of[len(valid):]
+    edge_length = shapely.length(geoms[valid])
+
+    # Parallel streets between the same two nodes: the shortest one wins
+    src = np.concatenate([edge_u, edge_v])
+    dst = np.concatenate([edge_v, edge_u])
+    weight = np.tile(edge_length, 2) + WEIGHT_EPS
+    order = np.lexsort((weight, dst, src))
+    src, dst, weight = src[order], dst[order], weight[order]
+    unique = np.ones(len(src), dtype=bool)
+    unique[1:] = (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])
+    unique &= src != dst
+
+    logger.info("Street graph built: %d nodes, %d edges", len(nodes), len(valid))
+    return StreetGraph(
+        crs=streets.crs,
+        nodes=nodes,
+        adjacency=csr_matrix(
+            (weight[unique], (src[unique], dst[unique])), shape=(len(nodes), len(nodes))
+        ),
+        tree=cKDTree(nodes) if len(nodes) else None,
+        edge_u=edge_u,
+        edge_v=edge_v,
+        edge_length=edge_length,
+        edge_geometry=geoms[valid],
+    )
+
+
+@traced("network.isochrones")
+def compute_isochrones(
+    streets_gdf: gpd.GeoDataFrame,
+    origins: list[tuple[float, float]],
+    bands: list[float],
+    shape: IsochroneShape = "edges",
+    buffer_m: float = 25.0,
+) -> gpd.GeoDataFrame:
+    """Walking isochrones for many origins and distance bands at once.
+
+    Origins snap to the nearest street end point; the snap distance counts
+    towards the walk. Streets on the frontier of a band are cut at the exact
+    remaining distance.
+
+    Args:
+        streets_gdf: Street network GeoDataFrame.
+        origins: (longitude, latitude) per origin.
+        bands: Walk distances in meters.
+        shape: 'edges' buffers the reachable street pieces by buffer_m;
+            'concave' / 'convex' hull their end points. 'edges' is by far
+            the slowest: 1,000 origins × 2 bands on ~1,200 streets take
+            ~25 s, against ~1.3 s concave and ~0.4 s convex, nearly all
+            of it in the buffer union.
+        buffer_m: Buffer for 'edges' polygons (meters).
+
+    Returns:
+        WGS84 GeoDataFrame with one row per (origin, band): origin (index
+        into origins), band_m, snap_distance_m, reachable_nodes,
+        reachable_length_m and geometry (None when nothing is reachable).
+    """
+    graph = get_street_graph(streets_gdf)
+    bands = sorted(float(b) for b in bands)
+    columns = ["origin", "band_m", "snap_distance_m", "reachable_nodes", "reachable_length_m"]
+    if graph.tree is None or not origins or not bands:
+        return gpd.GeoDataFrame(columns=[*columns, "geometry"], geometry="geometry", crs="EPSG:4326")
+
+    lng, lat = np.asarray(origins, dtype=float).T
+    xy = np.column_stack(ProjectionContext(graph.crs).from_wgs84.transform(lng, lat))
+    snap_distance, snap_node = graph.tree.query(xy)
+
+    parts = []
+    for start in range(0, len(xy), ISOCHRONE_BATCH_SIZE):
+        batch = np.arange(start, min(start + ISOCHRONE_BATCH_SIZE, len(xy)))
+        sources, inverse = np.unique(snap_node[batch], return_inverse=True)
+        dist = dijkstra(graph.adjacency, indices=sources, limit=bands[-1])[inverse.ravel()]
+        dist += snap_distance[batch, None]
+        for band in bands:
+            geometry, reachable_nodes, reachable_length = _band(graph, dist, band, shape, buffer_m)
+            parts.append(gpd.GeoDataFrame(
+                {
+                    "origin": batch,
+                    "band_m": band,
+                    "snap_distance_m": snap_distance[batch],
+                    "reachable_nodes": reachable_nodes,
+                    "reachable_length_m": reachable_length,
+                },
+                geometry=geometry,
+                crs=graph.crs,
+            ))
+
+    result = pd.concat(parts, ignore_index=True).sort_values(["origin", "band_m"], ignore_index=True)
+    logger.info("Isochrones: %d origins × %d bands (%s)", len(xy), len(bands), shape)
+    return result.to_crs("EPSG:4326")
+
+
+def _band(
+    graph: StreetGraph,
+    dist: np.ndarray,
+    band: float,
+    shape: IsochroneShape,
+    buffer_m: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(geometry, reachable nodes, reachable street length) per origin row of dist."""
+    n_origins = len(dist)
+    length = graph.edge_length
+    # Distance still walkable along each street from either end (0 if unreached)
+    from_u = np.clip(band - dist[:, graph.edge_u], 0, length)
+    from_v = np.clip(band - dist[:, graph.edge_v], 0, length)
+    touched = (from_u > 0) | (from_v > 0)
+    full = touched & (from_u + from_v >= length)
+    reachable_length = np.where(full, length, from_u + from_v).sum(axis=1)
+    reachable_nodes = (dist <= band).sum(axis=1)
+
+    # Frontier pieces: walked from u (or v) but not all the way along
+    cut_u = touched & ~full & (from_u > 0)
+    cut_v = touched & ~full & (from_v > 0)
+    full_o, full_e = np.nonzero(full)
+    u_o, u_e = np.nonzero(cut_u)
+    v_o, v_e = np.nonzero(cut_v)
+
+    if shape == "edges":
+        pieces = np.concatenate([
+            graph.edge_geometry[full_e],
+            np.array(
+                [substring(graph.edge_geometry[e], 0, from_u[o, e]) for o, e in zip(u_o, u_e, strict=True)]
+                + [substring(graph.edge_geometry[e], length[e] - from_v[o, e], length[e])
+                   for o, e in zip(v_o, v_e, strict=True)],
+                dtype=object,
+            ),
+        ])
+        group = np.concatenate([full_o, u_o, v_o])
+        geometry = _collect(shapely.multilinestrings, pieces, group, n_origins)
+        return (
+            shapely.buffer(geometry, buffer_m, quad_segs=EDGE_BUFFER_QUAD_SEGS),
+            reachable_nodes,
+            reachable_length,
+        )
+
+    node_o, node_n = np.nonzero(dist <= band)
+    points = np.concatenate([
+        shapely.points(graph.nodes[node_n]),
+        shapely.line_interpolate_point(graph.edge_geometry[u_e], from_u[u_o, u_e]),
+        shapely.line_interpolate_point(graph.edge_geometry[v_e], length[v_e] - from_v[v_o, v_e]),
+    ])
+    group = np.concatenate([node_o, u_o, v_o])
+    geometry = _collect(shapely.multipoints, points, group, n_origins)
+    if shape == "concave":
+        return shapely.concave_hull(geometry, ratio=CONCAVE_HULL_RATIO), reachable_nodes, reachable_length
+    return shapely.convex_hull(geometry), reachable_nodes, reachable_length
+
+
+def _collect(constructor, parts: np.ndarray, group: np.ndarray, size: int) -> np.ndarray:
+    """One multi-geometry per group (None for groups without parts)."""
+    out = np.full(size, None, dtype=object)
+    if len(parts) == 0:
+        return out
+    present, rank = np.unique(group, return_inverse=True)
+    order = np.argsort(rank, kind="stable")
+    out[present] = constructor(parts[order], indices=rank[order])
+    return out
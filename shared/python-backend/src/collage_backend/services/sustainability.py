@@ -7,8 +7,23 @@ import logging
 
 import geopandas as gpd
 import numpy as np
+import pandas as pd
+import shapely
 
-from collage_backend.utils.crs import ensure_projected
+from collage_backend.services.incremental import (
+    CELL,
+    FACING,
+    SELF,
+    align_previous,
+    dirty_inputs,
+    dirty_rows,
+    merge_columns,
+    previous_columns,
+    rows_to_update,
+)
+from collage_backend.utils.crs import ProjectionContext
+from collage_backend.utils.io import json_floats
+from collage_backend.utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
@@ -20,112 +35,323 @@ RUNOFF_COEFFICIENTS = {
     "green_roof": 0.30,
 }
 
+CANYON_METHODS = ("nearest", "rays")
 
+# Height assumed when a building has none (3 storeys, matches the height cascade)
+DEFAULT_HEIGHT_M = 9.0
+# Canyons narrower than this are treated as this wide (avoids H/W blow-up)
+MIN_CANYON_WIDTH_M = 1.0
+# Ray casting: spacing of ray origins along each street, and max ray length
+RAY_SPACING_M = 10.0
+RAY_MAX_LENGTH_M = 100.0
+# The two facades one station's rays hit are up to this far apart, so an edit
+# can change ray widths of buildings this far from its old or new footprint
+RAY_FACING_DISTANCE_M = 2 * RAY_MAX_LENGTH_M
+
+METRIC_KEYS = [
+    "site_area_m2", "isr", "baf_proxy", "runoff_coefficient",
+    "canyon_width_m", "canyon_hw_ratio", "svf_proxy",
+]
+
+
+@traced("metrics.sustainability")
 def compute_sustainability_metrics(
     buildings_gdf: gpd.GeoDataFrame,
     streets_gdf: gpd.GeoDataFrame,
     tessellation_gdf: gpd.GeoDataFrame,
+    canyon_method: str = "nearest",
+    ctx: ProjectionContext | None = None,
+    previous: dict | None = None,
+    changed_ids: list[str] | None = None,
+    previous_buildings: gpd.GeoDataFrame | None = None,
 ) -> dict:
     """Compute all sustainability metrics.
 
     Returns dict with per-building and aggregate metrics:
-    - ISR (Impervious Surface Ratio)
+    - Site area (tessellation cell) and ISR (Impervious Surface Ratio)
     - BAF (Biotope Area Factor) proxy
     - Runoff coefficient
-    - Canyon H/W ratio
+    - Canyon width and H/W ratio
     - SVF (Sky View Factor) proxy
+
+    Args:
+        canyon_method: 'nearest' (2 × distance to the nearest street) or
+            'rays' (facade-to-facade width from rays cast across each street).
+        ctx: Shared projection context; one is created from the buildings if omitted.
+        previous: Result of an earlier call. With changed_ids, only rows whose
+            inputs changed are recomputed (incremental mode).
+        changed_ids: Ids of buildings added or modified since `previous`.
+            Removed buildings are those in `previous` but not in buildings_gdf.
+        previous_buildings: Buildings `previous` was computed for. With
+            canyon_method='rays', their old footprints locate the buildings
+            facing a removed or moved one; without them such edits fall back
+            to a full recompute.
     """
+    if canyon_method not in CANYON_METHODS:
+        raise ValueError(f"Unknown canyon method '{canyon_method}', expected one of {CANYON_METHODS}")
     if buildings_gdf.empty:
         return {"per_building": {}, "aggregates": {}}
 
-    bldg = ensure_projected(buildings_gdf)
-    streets = streets_gdf.to_crs(bldg.crs) if not streets_gdf.empty else streets_gdf
-    tess = tessellation_gdf.to_crs(bldg.crs) if not tessellation_gdf.empty else tessellation_gdf
+    ctx = ctx or ProjectionContext.for_layers(buildings_gdf)
+    bldg = ctx.project(buildings_gdf)
+    streets = ctx.project(streets_gdf)
+    tess = ctx.project(tessellation_gdf)
+    ids = bldg["id"].tolist()
+    site_area = _site_areas(bldg, tess)
+
+    previous_footprints = None
+    if previous is not None and changed_ids is not None and canyon_method == "rays":
+        previous_footprints = _edited_footprints(previous, ids, changed_ids, previous_buildings, ctx)
+        if previous_footprints is None:
+            logger.info("Removed or moved buildings without previous_buildings: full recompute")
+            previous = None
+
+    if previous is not None and changed_ids is not None:
+        prev_cols, known = align_previous(previous, ids)
+        masks = dirty_inputs(
+            bldg, changed_ids, known,
+            cell_area=site_area,
+            previous_cell_area=prev_cols.get("site_area_m2"),
+            facing_distance=RAY_FACING_DISTANCE_M if canyon_method == "rays" else None,
+            previous_footprints=previous_footprints,
+        )
+        update = rows_to_update(metric_dependencies(canyon_method), masks, available=prev_cols)
+        rows = dirty_rows(update)
+        logger.info("Incremental sustainability: %d of %d buildings dirty", len(rows), len(bldg))
+        fresh = _metric_columns(bldg, streets, site_area, canyon_method, rows) if len(rows) else {}
+        columns = merge_columns(prev_cols, fresh, rows, update)
+    else:
+        columns = _metric_columns(bldg, streets, site_area, canyon_method)
+
+    # --- Aggregates ---
+    aggregates = {}
+    for key in METRIC_KEYS:
+        values = columns[key][~np.isnan(columns[key])]
+        if values.size:
+            aggregates[f"{key}_mean"] = float(values.mean())
+            aggregates[f"{key}_std"] = float(values.std())
+
+    lists = {key: json_floats(columns[key]) for key in METRIC_KEYS}
+    results = {
+        bid: {key: lists[key][i] for key in METRIC_KEYS}
+        for i, bid in enumerate(ids)
+    }
+
+    logger.info("Sustainability metrics: %d buildings, %d aggregates", len(results), len(aggregates))
+    return {"per_building": results, "aggregates": aggregates}
+
+
+def metric_dependencies(canyon_method: str = "nearest") -> dict[str, set[str]]:
+    """Inputs each per-building metric reads (see services/incremental.py).
+
+    Ray-cast canyon widths also depend on the buildings across the street.
+    """
+    canyon = {SELF, FACING} if canyon_method == "rays" else {SELF}
+    return {
+        "site_area_m2": {SELF, CELL},
+        "isr": {SELF, CELL},
+        "baf_proxy": {SELF, CELL},
+        "runoff_coefficient": {SELF, CELL},
+        "canyon_width_m": canyon,
+        "canyon_hw_ratio": canyon,
+        "svf_proxy": canyon,
+    }
 
-    results: dict[str, dict[str, float | None]] = {}
-    for bid in bldg["id"]:
-        results[bid] = {}
+
+def _edited_footprints(
+    previous: dict,
+    ids: list[str],
+    changed_ids: list[str],
+    previous_buildings: gpd.GeoDataFrame | None,
+    ctx: ProjectionContext,
+) -> gpd.GeoSeries | None:
+    """Old footprints of the buildings removed or modified since `previous`.
+
+    None when there are some but previous_buildings does not hold them all.
+    """
+    before = set(previous_columns(previous)[0])
+    edited = (before - set(ids)) | (before & set(changed_ids))
+    if not edited:
+        return gpd.GeoSeries([], crs=ctx.crs)
+    if (
+        previous_buildings is None or previous_buildings.empty
+        or not edited <= set(previous_buildings["id"])
+    ):
+        return None
+    old = ctx.project(previous_buildings)
+    return old.geometry[old["id"].isin(edited)]
+
+
+def _metric_columns(
+    bldg: gpd.GeoDataFrame,
+    streets: gpd.GeoDataFrame,
+    site_area: np.ndarray | None,
+    canyon_method: str,
+    rows: np.ndarray | None = None,
+) -> dict[str, np.ndarray]:
+    """Metric arrays for the buildings at positions `rows` (all if None)."""
+    if rows is None:
+        rows = np.arange(len(bldg))
+    target = bldg.iloc[rows]
+    n = len(target)
+    footprint = target.geometry.area.to_numpy()
+    columns: dict[str, np.ndarray] = {}
 
     # --- ISR: building footprint / tessellation area ---
-    if not tess.empty and "building_id" in tess.columns:
-        tess_areas = tess.groupby("building_id")["area_m2"].sum()
-        for _, row in bldg.iterrows():
-            bid = row["id"]
-            bldg_area = row.geometry.area
-            tess_area = tess_areas.get(bid, bldg_area)
-            isr = bldg_area / tess_area if tess_area > 0 else 1.0
-            results[bid]["isr"] = min(float(isr), 1.0)
+    if site_area is not None:
+        columns["site_area_m2"] = site_area[rows]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            isr = np.where(site_area[rows] > 0, footprint / site_area[rows], 1.0)
+        columns["isr"] = np.minimum(isr, 1.0)
     else:
-        for _, row in bldg.iterrows():
-            results[row["id"]]["isr"] = None
+        columns["site_area_m2"] = np.full(n, np.nan)
+        columns["isr"] = np.full(n, np.nan)
 
     # --- BAF proxy: 1 - ISR (simplified; real BAF needs land cover data) ---
-    for bid, metrics in results.items():
-        isr = metrics.get("isr")
-        metrics["baf_proxy"] = 1.0 - isr if isr is not None else None
+    columns["baf_proxy"] = 1.0 - columns["isr"]
 
     # --- Runoff coefficient: weighted by ISR ---
-    for bid, metrics in results.items():
-        isr = metrics.get("isr")
-        if isr is not None:
-            metrics["runoff_coefficient"] = (
-                isr * RUNOFF_COEFFICIENTS["impervious"]
-                + (1 - isr) * RUNOFF_COEFFICIENTS["pervious"]
-            )
-        else:
-            metrics["runoff_coefficient"] = None
+    columns["runoff_coefficient"] = (
+        columns["isr"] * RUNOFF_COEFFICIENTS["impervious"]
+        + (1 - columns["isr"]) * RUNOFF_COEFFICIENTS["pervious"]
+    )
 
-    # --- Canyon H/W ratio ---
+    # --- Canyon width and H/W ratio ---
     if not streets.empty:
-        _compute_canyon_hw(bldg, streets, results)
+        heights = _building_heights(target)
+        width = _canyon_width_nearest(target, streets)
+        if canyon_method == "rays":
+            # Only streets within ray reach of the target buildings cast rays,
+            # but rays hit every building so facing facades are all found
+            if n < len(bldg):
+                near, _ = target.sindex.query(
+                    streets.geometry, predicate="dwithin", distance=RAY_MAX_LENGTH_M
+                )
+                streets = streets.iloc[np.unique(near)]
+            ray_width = (
+                _canyon_width_rays(bldg, streets)[rows] if not streets.empty
+                else np.full(n, np.nan)
+            )
+            # Buildings no ray reaches from both sides keep the nearest-street width
+            width = np.where(np.isnan(ray_width), width, ray_width)
+        width = np.maximum(width, MIN_CANYON_WIDTH_M)
+        columns["canyon_width_m"] = width
+        columns["canyon_hw_ratio"] = heights / width
     else:
-        for bid in results:
-            results[bid]["canyon_hw_ratio"] = None
+        columns["canyon_width_m"] = np.full(n, np.nan)
+        columns["canyon_hw_ratio"] = np.full(n, np.nan)
 
     # --- SVF proxy (simplified: based on canyon H/W) ---
-    for bid, metrics in results.items():
-        hw = metrics.get("canyon_hw_ratio")
-        if hw is not None and hw > 0:
-            # Johnson & Watson (1984) approximation: SVF ≈ cos(arctan(2*H/W))
-            metrics["svf_proxy"] = float(np.cos(np.arctan(2 * hw)))
-        else:
-            metrics["svf_proxy"] = None
+    # Johnson & Watson (1984) approximation: SVF ≈ cos(arctan(2*H/W))
+    hw = columns["canyon_hw_ratio"]
+    columns["svf_proxy"] = np.where(hw > 0, np.cos(np.arctan(2 * hw)), np.nan)
+    return columns
 
-    # --- Aggregates ---
-    aggregates = {}
-    metric_keys = ["isr", "baf_proxy", "runoff_coefficient", "canyon_hw_ratio", "svf_proxy"]
-    for key in metric_keys:
-        values = [m[key] for m in results.values() if m.get(key) is not None]
-        if values:
-            aggregates[f"{key}_mean"] = float(np.mean(values))
-            aggregates[f"{key}_std"] = float(np.std(values))
 
-    logger.info("Sustainability metrics: %d buildings, %d aggregates", len(results), len(aggregates))
-    return {"per_building": results, "aggregates": aggregates}
+def _site_areas(bldg: gpd.GeoDataFrame, tess: gpd.GeoDataFrame) -> np.ndarray | None:
+    """Tessellation area per building (footprint where it has no cell), or None."""
+    if tess.empty or "building_id" not in tess.columns:
+        return None
+    tess_areas = tess.groupby("building_id")["area_m2"].sum()
+    site_area = bldg["id"].map(tess_areas).to_numpy(dtype=float)
+    return np.where(np.isnan(site_area), bldg.geometry.area.to_numpy(), site_area)
 
 
-def _compute_canyon_hw(
+def _building_heights(buildings: gpd.GeoDataFrame) -> np.ndarray:
+    """Building heights in metres, DEFAULT_HEIGHT_M where missing or zero."""
+    if "height_m" not in buildings.columns:
+        return np.full(len(buildings), DEFAULT_HEIGHT_M)
+    heights = pd.to_numeric(buildings["height_m"], errors="coerce").to_numpy(dtype=float)
+    return np.where(np.isnan(heights) | (heights == 0), DEFAULT_HEIGHT_M, heights)
+
+
+def _canyon_width_nearest(
     buildings: gpd.GeoDataFrame,
     streets: gpd.GeoDataFrame,
-    results: dict,
-) -> None:
-    """Compute canyon H/W ratio for each building.
+) -> np.ndarray:
+    """Approximate canyon width as 2 × distance from centroid to the nearest street.
 
-    Uses nearest street distance as half-width, building height as H.
+    One STRtree nearest query for all buildings; ties keep the first street.
     """
-    from shapely.ops import nearest_points
-
-    street_union = streets.geometry.union_all()
-
-    for _, row in buildings.iterrows():
-        bid = row["id"]
-        height = float(row.get("height_m", 9) or 9)
-
-        try:
-            _, nearest_pt = nearest_points(row.geometry.centroid, street_union)
-            distance = row.geometry.centroid.distance(nearest_pt)
-            # W = 2 × distance to nearest street (approximate canyon width)
-            width = max(2 * distance, 1.0)
-            results[bid]["canyon_hw_ratio"] = height / width
-        except Exception:
-            results[bid]["canyon_hw_ratio"] = None
+    centroids = buildings.geometry.centroid.to_numpy()
+    (input_idx, _), distances = streets.sindex.nearest(
+        centroids, return_distance=True, return_all=False
+    )
+    width = np.full(len(buildings), np.nan)
+    width[input_idx] = 2 * distances
+    return width
+
+
+def _canyon_width_rays(
+    buildings: gpd.GeoDataFrame,
+    streets: gpd.GeoDataFrame,
+    spacing: float = RAY_SPACING_M,
+    max_length: float = RAY_MAX_LENGTH_M,
+) -> np.ndarray:
+    """Facade-to-facade canyon width from rays cast perpendicular to each street.
+
+    Ray origins are placed every `spacing` metres along each street; from each
+    origin one ray goes left and one right, and the first facade each ray hits
+    is found through the building STRtree. Where both rays hit, the canyon
+    width is the sum of the two hit distances. Each building gets the mean
+    width of the canyons it faces; buildings faced by none get NaN.
+    """
+    lines = streets.geometry.to_numpy()
+    lengths = shapely.length(lines)
+
+    # Evenly spaced stations along every street, at the centre of each interval
+    n_stations = np.maximum((lengths // spacing).astype(int), 1)
+    line_idx = np.repeat(np.arange(len(lines)), n_stations)
+    offsets = np.cumsum(n_stations) - n_stations
+    k = np.arange(n_stations.sum()) - np.repeat(offsets, n_stations)
+    step = (lengths / n_stations)[line_idx]
+    pos = (k + 0.5) * step
+
+    station_lines = lines[line_idx]
+    origin = shapely.get_coordinates(shapely.line_interpolate_point(station_lines, pos))
+    ahead = shapely.get_coordinates(
+        shapely.line_interpolate_point(station_lines, np.minimum(pos + 0.5, lengths[line_idx]))
+    )
+    behind = shapely.get_coordinates(
+        shapely.line_interpolate_point(station_lines, np.maximum(pos - 0.5, 0.0))
+    )
+
+    tangent = ahead - behind
+    norm = np.hypot(tangent[:, 0], tangent[:, 1])
+    valid = norm > 0
+    tangent[valid] /= norm[valid, None]
+    normal = np.column_stack([-tangent[:, 1], tangent[:, 0]])
+
+    # Rays 0..n-1 go left of the street, n..2n-1 go right
+    n = len(origin)
+    starts = np.vstack([origin, origin])
+    ends = starts + np.vstack([normal, -normal]) * max_length
+    rays = shapely.linestrings(np.stack([starts, ends], axis=1))
+    rays[~np.concatenate([valid, valid])] = None
+
+    ray_idx, bldg_idx = buildings.sindex.query(rays, predicate="intersects")
+    if ray_idx.size == 0:
+        return np.full(len(buildings), np.nan)
+
+    facades = shapely.boundary(buildings.geometry.to_numpy())
+    hits = shapely.intersection(rays[ray_idx], facades[bldg_idx])
+    hit_dist = shapely.distance(shapely.points(starts[ray_idx]), hits)
+
+    # Keep the closest facade per ray
+    order = np.lexsort((hit_dist, ray_idx))
+    first = order[np.r_[True, ray_idx[order][1:] != ray_idx[order][:-1]]]
+    ray_dist = np.full(2 * n, np.nan)
+    ray_bldg = np.full(2 * n, -1)
+    ray_dist[ray_idx[first]] = hit_dist[first]
+    ray_bldg[ray_idx[first]] = bldg_idx[first]
+
+    both = ~np.isnan(ray_dist[:n]) & ~np.isnan(ray_dist[n:])
+    station_width = ray_dist[:n][both] + ray_dist[n:][both]
+
+    # Average the canyon widths seen by each facing building
+    facing = np.concatenate([ray_bldg[:n][both], ray_bldg[n:][both]])
+    widths = np.concatenate([station_width, station_width])
+    total = np.bincount(facing, weights=widths, minlength=len(buildings))
+    count = np.bincount(facing, minlength=len(buildings))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(count > 0, total / count, np.nan)
@@ -1,25 +1,47 @@
 """Morphological tessellation via momepy.
 
 Based on C1 spike: momepy.enclosures + momepy.enclosed_tessellation.
+
+Above TESSELLATION_TILE_THRESHOLD buildings the enclosures are split into
+spatially coherent tiles (Hilbert order, balanced by building count) that are
+tessellated in a process pool. momepy tessellates every enclosure
+independently, so tiling by enclosure gives the same cells as a single run.
 """
 
+import hashlib
 import logging
-import uuid
+import warnings
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
 
 import geopandas as gpd
 import momepy
+import numpy as np
+import pandas as pd
 
-from collage_backend.utils.crs import ensure_projected
+from collage_backend.config import (
+    TESSELLATION_TILE_BUILDINGS,
+    TESSELLATION_TILE_THRESHOLD,
+)
+from collage_backend.utils.crs import ProjectionContext
+from collage_backend.utils.parallel import pool_context, worker_count
+from collage_backend.utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 
+TESSELLATION_COLUMNS = ["id", "building_id", "area_m2", "enclosure_id", "geometry"]
+SIMPLIFY_TOLERANCE_M = 0.5
+
 
+@traced("tessellation")
 def compute_tessellation(
     buildings_gdf: gpd.GeoDataFrame,
     streets_gdf: gpd.GeoDataFrame,
     segment: float = 1.0,
     simplify: bool = True,
     n_jobs: int = -1,
+    ctx: ProjectionContext | None = None,
+    tiled: bool | None = None,
 ) -> gpd.GeoDataFrame:
     """Compute enclosed tessellation.
 
@@ -30,28 +52,40 @@ def compute_tessellation(
         streets_gdf: Street LineStrings (WGS84 or projected).
         segment: Tessellation discretization parameter (meters).
         simplify: Whether to simplify output tessellation.
-        n_jobs: Parallelism (-1 = all CPUs).
+        n_jobs: Parallelism (-1 = all CPUs); worker processes in tiled mode.
+        ctx: Shared projection context; one is created from the buildings if
+            omitted. The projected cells are remembered in it, so downstream
+            services get them without reprojecting.
+        tiled: Tessellate enclosure tiles in a process pool. None enables it
+            above TESSELLATION_TILE_THRESHOLD buildings.
 
     Returns:
-        GeoDataFrame with tessellation cells in same CRS as input.
+        GeoDataFrame with tessellation cells in same CRS as input. Cell ids
+        are derived from (enclosure_id, building_id), so they are stable
+        across runs and between tiled and single-pass mode.
     """
     if buildings_gdf.empty or streets_gdf.empty:
         logger.warning("Empty input; returning empty tessellation")
         return gpd.GeoDataFrame(
-            columns=["id", "building_id", "area_m2", "enclosure_id", "geometry"],
+            columns=TESSELLATION_COLUMNS,
             geometry="geometry",
             crs=buildings_gdf.crs or "EPSG:4326",
         )
 
     # Ensure projected CRS for momepy
-    buildings_proj = ensure_projected(buildings_gdf)
-    streets_proj = streets_gdf.to_crs(buildings_proj.crs) if streets_gdf.crs != buildings_proj.crs else streets_gdf.copy()
+    ctx = ctx or ProjectionContext.for_layers(buildings_gdf)
+    buildings_proj = ctx.project(buildings_gdf).reset_index(drop=True)
+    streets_proj = ctx.project(streets_gdf)
+
+    if tiled is None:
+        tiled = len(buildings_proj) > TESSELLATION_TILE_THRESHOLD
 
     logger.info(
-        "Computing tessellation: %d buildings, %d streets, segment=%.1f",
+        "Computing tessellation: %d buildings, %d streets, segment=%.1f, tiled=%s",
         len(buildings_proj),
         len(streets_proj),
         segment,
+        tiled,
     )
 
     # Step 1: Compute enclosures from street network
@@ -59,34 +93,253 @@ def compute_tessellation(
     logger.info("Computed %d enclosures", len(enclosures))
 
     # Step 2: Enclosed tessellation
-    tess = momepy.enclosed_tessellation(
-        buildings_proj,
-        enclosures=enclosures,
-        segment=segment,
-        n_jobs=n_jobs,
-    )
+    if tiled and len(enclosures) > 1:
+        tess = _tiled_tessellation(buildings_proj, enclosures, segment, n_jobs)
+    else:
+        tess = _enclosed_tessellation(buildings_proj, enclosures, segment, n_jobs)
 
     if simplify and hasattr(tess, "simplify"):
-        tess["geometry"] = tess.geometry.simplify(tolerance=0.5)
+        tess["geometry"] = tess.geometry.simplify(tolerance=SIMPLIFY_TOLERANCE_M)
 
-    # Add metadata columns
-    tess["id"] = [str(uuid.uuid4())[:8] for _ in range(len(tess))]
+    projected = _finalize_cells(tess, buildings_proj)
+
+    # Convert back to input CRS
+    result = projected
+    if buildings_gdf.crs and buildings_gdf.crs.is_geographic:
+        result = projected.to_crs(buildings_gdf.crs)
+        ctx.remember(result, projected)
+    logger.info("Tessellation complete: %d cells", len(result))
+    return result
 
-    # building_id: link to building via spatial join if not already present
-    if "building_id" not in tess.columns:
-        tess["building_id"] = None
 
-    # Compute area in projected CRS
-    tess["area_m2"] = tess.geometry.area
+@traced("tessellation.update")
+def update_tessellation(
+    buildings_gdf: gpd.GeoDataFrame,
+    streets_gdf: gpd.GeoDataFrame,
+    previous_gdf: gpd.GeoDataFrame,
+    added: Iterable[str] = (),
+    removed: Iterable[str] = (),
+    modified: Iterable[str] = (),
+    segment: float = 1.0,
+    simplify: bool = True,
+    n_jobs: int = -1,
+    ctx: ProjectionContext | None = None,
+) -> tuple[gpd.GeoDataFrame, dict]:
+    """Re-tessellate only the enclosures touched by a building edit.
 
-    # enclosure_id
-    if "enclosure_id" not in tess.columns:
-        tess["enclosure_id"] = "unknown"
+    Affected enclosures are those holding a removed/modified building's old
+    cell, or whose cells the added/modified footprints intersect. They are
+    rebuilt by dissolving their previous cells, re-tessellated with the
+    current buildings and spliced into the previous result; all other cells
+    are kept as they are. Falls back to compute_tessellation when the previous
+    result cannot be reused (no enclosure ids, a building moved outside every
+    previous cell, or most enclosures are affected).
 
-    # Convert back to input CRS
+    Args:
+        buildings_gdf: Current (post-edit) buildings.
+        streets_gdf: Street LineStrings (unchanged by the edit).
+        previous_gdf: Tessellation returned for the pre-edit buildings.
+        added, removed, modified: Building ids changed by the edit.
+
+    Returns:
+        (tessellation in the input CRS, stats dict with mode and counts).
+    """
+    removed = set(removed)
+    moved = set(added) | set(modified)
+    stats = {"mode": "incremental", "affected_enclosures": 0, "recomputed_cells": 0}
+
+    def full(reason: str) -> tuple[gpd.GeoDataFrame, dict]:
+        logger.info("Incremental tessellation falling back to full recompute: %s", reason)
+        tess = compute_tessellation(
+            buildings_gdf, streets_gdf, segment=segment, simplify=simplify, n_jobs=n_jobs, ctx=ctx
+        )
+        return tess, {"mode": "full", "reason": reason, "recomputed_cells": len(tess)}
+
+    if previous_gdf.empty or "enclosure_id" not in previous_gdf.columns:
+        return full("previous tessellation has no enclosure ids")
+    if (previous_gdf["enclosure_id"] == "unknown").any():
+        return full("previous tessellation has no enclosure ids")
+    if buildings_gdf.empty or streets_gdf.empty:
+        return full("empty input")
+
+    ctx = ctx or ProjectionContext.for_layers(buildings_gdf)
+    buildings_proj = ctx.project(buildings_gdf).reset_index(drop=True)
+    previous = ctx.project(previous_gdf).reset_index(drop=True)
+
+    # Enclosures holding the old cells of removed/modified buildings...
+    affected = set(previous.loc[previous["building_id"].isin(removed | moved), "enclosure_id"])
+    # ...and those the new footprints of added/modified buildings fall into
+    changed = buildings_proj[buildings_proj["id"].isin(moved)]
+    if not changed.empty:
+        hit_changed, hit_cells = previous.sindex.query(changed.geometry, predicate="intersects")
+        if len(np.unique(hit_changed)) < len(changed):
+            return full("a changed building lies outside the previous tessellation")
+        affected |= set(previous["enclosure_id"].iloc[hit_cells])
+
+    stats["affected_enclosures"] = len(affected)
+    if not affected:
+        return previous_gdf.copy(), stats
+    if len(affected) > previous["enclosure_id"].nunique() / 2:
+        return full("edit touches most enclosures")
+
+    # Rebuild affected enclosures from their cells; a closing by the simplify
+    # tolerance seals slivers left between independently simplified cells
+    in_affected = previous["enclosure_id"].isin(affected).to_numpy()
+    enclosures = previous[in_affected].dissolve(by="enclosure_id")[["geometry"]]
+    enclosures.index.name = None  # momepy then labels cells in 'enclosure_index'
+    if simplify:
+        enclosures["geometry"] = (
+            enclosures.buffer(SIMPLIFY_TOLERANCE_M, join_style="mitre")
+            .buffer(-SIMPLIFY_TOLERANCE_M, join_style="mitre")
+        )
+
+    _, members = buildings_proj.sindex.query(enclosures.geometry, predicate="intersects")
+    subset = buildings_proj.iloc[np.unique(members)]
+    tess = _enclosed_tessellation(subset, enclosures, segment, n_jobs)
+    if simplify:
+        tess["geometry"] = tess.geometry.simplify(tolerance=SIMPLIFY_TOLERANCE_M)
+    fresh = _finalize_cells(tess, buildings_proj)
+    stats["recomputed_cells"] = len(fresh)
+
+    kept = previous.loc[~in_affected, TESSELLATION_COLUMNS]
+    projected = gpd.GeoDataFrame(
+        pd.concat([kept, fresh], ignore_index=True), geometry="geometry", crs=previous.crs
+    ).sort_values(["enclosure_id", "id"], kind="stable").reset_index(drop=True)
+
+    result = projected
     if buildings_gdf.crs and buildings_gdf.crs.is_geographic:
-        tess = tess.to_crs(buildings_gdf.crs)
+        result = projected.to_crs(buildings_gdf.crs)
+        ctx.remember(result, projected)
+    logger.info(
+        "Incremental tessellation: %d enclosures, %d of %d cells recomputed",
+        len(affected), len(fresh), len(result),
+    )
+    return result, stats
 
-    result = tess[["id", "building_id", "area_m2", "enclosure_id", "geometry"]].copy()
-    logger.info("Tessellation complete: %d cells", len(result))
-    return result
+
+def _finalize_cells(tess: gpd.GeoDataFrame, buildings: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+    """Map momepy's output index to building/enclosure ids and add cell ids.
+
+    momepy indexes cells by the building's index label and negative labels for
+    enclosures without buildings; 'enclosure_index' holds the enclosure label.
+    """
+    labels = tess.index.to_numpy()
+    has_building = labels >= 0
+    building_ids = np.full(len(tess), None, dtype=object)
+    building_ids[has_building] = buildings["id"].to_numpy()[labels[has_building]]
+
+    enclosure_ids = tess["enclosure_index"].astype(str).to_numpy()
+    out = gpd.GeoDataFrame(
+        {
+            "id": [
+                _cell_id(enc, bid) for enc, bid in zip(enclosure_ids, building_ids, strict=True)
+            ],
+            "building_id": building_ids,
+            "area_m2": tess.geometry.area.to_numpy(),
+            "enclosure_id": enclosure_ids,
+        },
+        geometry=tess.geometry.to_numpy(),
+        crs=buildings.crs,
+    )
+    # Deterministic order regardless of tiling/worker scheduling
+    return out.sort_values(["enclosure_id", "id"], kind="stable").reset_index(drop=True)
+
+
+def _enclosed_tessellation(
+    buildings: gpd.GeoDataFrame,
+    enclosures: gpd.GeoDataFrame,
+    segment: float,
+    n_jobs: int,
+) -> gpd.GeoDataFrame:
+    """momepy.enclosed_tessellation with the buildings' CRS set on the result.
+
+    In some projected CRSs (e.g. ProjectionContext's local projections)
+    momepy's Voronoi cells come back without a CRS, so its internal concat
+    warns and the result may have none; the CRS is set here instead.
+    """
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", "CRS not set for some", UserWarning)
+        tess = momepy.enclosed_tessellation(
+            buildings, enclosures=enclosures, segment=segment, n_jobs=n_jobs
+        )
+    return tess.set_crs(buildings.crs, allow_override=True)
+
+
+def _cell_id(enclosure_id: str, building_id: str | None) -> str:
+    return hashlib.blake2s(f"{enclosure_id}:{building_id}".encode(), digest_size=4).hexdigest()
+
+
+def _tiled_tessellation(
+    buildings: gpd.GeoDataFrame,
+    enclosures: gpd.GeoDataFrame,
+    segment: float,
+    n_jobs: int,
+) -> gpd.GeoDataFrame:
+    """Tessellate spatial tiles of enclosures in a process pool and stitch them."""
+    workers = worker_count(n_jobs)
+    tiles = _enclosure_tiles(buildings, enclosures, TESSELLATION_TILE_BUILDINGS, min_tiles=workers)
+    logger.info("Tiled tessellation: %d tiles on %d workers", len(tiles), workers)
+
+    if workers == 1 or len(tiles) == 1:
+        parts = [_tessellate_tile(b, e, segment) for b, e in tiles]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context()) as pool:
+            parts = list(pool.map(
+                _tessellate_tile,
+                [b for b, _ in tiles], [e for _, e in tiles], [segment] * len(tiles),
+            ))
+
+    # Empty-enclosure labels (-k..-1) restart in every tile; renumber them globally
+    empty = [p.index < 0 for p in parts]
+    n_empty = sum(int(m.sum()) for m in empty)
+    next_label = -n_empty
+    for part, mask in zip(parts, empty, strict=True):
+        if mask.any():
+            labels = part.index.to_numpy().copy()
+            labels[mask] = np.arange(next_label, next_label + mask.sum())
+            part.index = labels
+            next_label += int(mask.sum())
+    return pd.concat(parts)
+
+
+def _enclosure_tiles(
+    buildings: gpd.GeoDataFrame,
+    enclosures: gpd.GeoDataFrame,
+    buildings_per_tile: int,
+    min_tiles: int = 1,
+) -> list[tuple[gpd.GeoDataFrame, gpd.GeoDataFrame]]:
+    """Split enclosures into Hilbert-ordered tiles of ~buildings_per_tile buildings
+    (at least min_tiles, so every worker gets one).
+
+    Each tile carries the buildings intersecting its enclosures; a building
+    spanning a tile border goes to both tiles, as it would to both enclosures.
+    """
+    enc_pos, bldg_pos = buildings.sindex.query(enclosures.geometry, predicate="intersects")
+    per_enclosure = np.bincount(enc_pos, minlength=len(enclosures))
+
+    order = np.argsort(enclosures.hilbert_distance().to_numpy(), kind="stable")
+    # Weight empty enclosures as one building so they still spread across tiles
+    cumulative = np.cumsum(np.maximum(per_enclosure[order], 1))
+    n_tiles = max(min_tiles, int(np.ceil(cumulative[-1] / buildings_per_tile)))
+    tile_of = np.empty(len(enclosures), dtype=int)
+    tile_of[order] = np.minimum(
+        (cumulative - 1) * n_tiles // cumulative[-1], n_tiles - 1
+    )
+
+    tiles = []
+    for t in range(n_tiles):
+        enc_mask = tile_of == t
+        if not enc_mask.any():
+            continue
+        members = np.unique(bldg_pos[enc_mask[enc_pos]])
+        tiles.append((buildings.iloc[members], enclosures.iloc[np.flatnonzero(enc_mask)]))
+    return tiles
+
+
+def _tessellate_tile(
+    buildings: gpd.GeoDataFrame,
+    enclosures: gpd.GeoDataFrame,
+    segment: float,
+) -> gpd.GeoDataFrame:
+    """Process-pool entry point: tessellate one tile single-threaded."""
+    return _enclosed_tessellation(buildings, enclosures, segment, n_jobs=1)
@@ -3,7 +3,10 @@
 Based on D1 spike: custom tmerc CRS for fragment operations (not UTM).
 """
 
-from pyproj import CRS
+from functools import lru_cache
+
+import geopandas as gpd
+from pyproj import CRS, Transformer
 
 
 def custom_tmerc(center_lon: float, center_lat: float) -> CRS:
@@ -18,14 +21,79 @@ def custom_tmerc(center_lon: float, center_lat: float) -> CRS:
     )
 
 
-def ensure_projected(gdf, target_crs=None):
+def bounds_center(gdf) -> tuple[float, float]:
+    """Centre of a layer's bounding box (cheap stand-in for the union centroid)."""
+    minx, miny, maxx, maxy = gdf.total_bounds
+    return (minx + maxx) / 2, (miny + maxy) / 2
+
+
+class ProjectionContext:
+    """One projected CRS per fragment, shared by every service in a request.
+
+    Layers are projected at most once: project() memoizes by object identity
+    and hands out shallow copies, so services can add columns freely without
+    reprojecting or leaking them into each other. Create one per request with
+    for_layers() and pass it as `ctx` to the services.
+    """
+
+    def __init__(self, crs: CRS):
+        self.crs = crs
+        # id(source) → (source, projected); the source is kept so its id stays unique
+        self._projected: dict[int, tuple[gpd.GeoDataFrame, gpd.GeoDataFrame]] = {}
+
+    @classmethod
+    def for_layers(cls, *gdfs) -> "ProjectionContext":
+        """Context for the first non-empty layer: its own CRS if already
+        projected, else a custom tmerc at the centre of its bounds."""
+        for gdf in gdfs:
+            if gdf is None or gdf.empty:
+                continue
+            if gdf.crs is not None and not gdf.crs.is_geographic:
+                return cls(gdf.crs)
+            return cls(custom_tmerc(*bounds_center(gdf)))
+        return cls(custom_tmerc(0.0, 0.0))
+
+    def project(self, gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+        """Return gdf in the context CRS (empty layers pass through unchanged)."""
+        if gdf.empty or gdf.crs == self.crs:
+            return gdf.copy(deep=False)
+        cached = self._projected.get(id(gdf))
+        if cached is None or cached[0] is not gdf:
+            cached = (gdf, gdf.to_crs(self.crs))
+            self._projected[id(gdf)] = cached
+        return cached[1].copy(deep=False)
+
+    def remember(self, source: gpd.GeoDataFrame, projected: gpd.GeoDataFrame) -> None:
+        """Record an already-projected twin of source (e.g. a service output)."""
+        if projected.crs == self.crs:
+            self._projected[id(source)] = (source, projected)
+
+    @property
+    def to_wgs84(self) -> Transformer:
+        """Cached transformer from the context CRS to WGS84 (x=lon, y=lat)."""
+        return _transformer(self.crs, CRS.from_epsg(4326))
+
+    @property
+    def from_wgs84(self) -> Transformer:
+        """Cached transformer from WGS84 to the context CRS."""
+        return _transformer(CRS.from_epsg(4326), self.crs)
+
+
+@lru_cache(maxsize=64)
+def _transformer(source: CRS, target: CRS) -> Transformer:
+    return Transformer.from_crs(source, target, always_xy=True)
+
+
+def ensure_projected(gdf, target_crs=None, ctx: ProjectionContext | None = None):
     """Ensure a GeoDataFrame is in a projected CRS.
 
-    If no target_crs is given, uses a custom tmerc at the centroid.
+    With a ProjectionContext, projects through it (memoized). Otherwise, if no
+    target_crs is given, uses a custom tmerc at the centre of the layer bounds.
     """
+    if ctx is not None:
+        return ctx.project(gdf)
     if gdf.crs is None or gdf.crs.is_geographic:
         if target_crs is None:
-            centroid = gdf.geometry.union_all().centroid
-            target_crs = custom_tmerc(centroid.x, centroid.y)
+            target_crs = custom_tmerc(*bounds_center(gdf))
         return gdf.to_crs(target_crs)
     return gdf
@@ -1,5 +1,7 @@
-"""Geometry utilities — bbox helpers, polygon construction."""
+"""Geometry utilities — bbox helpers, polygon construction, line end points."""
 
+import numpy as np
+import shapely
 from shapely.geometry import box
 
 
@@ -27,3 +29,116 @@ def buffer_bbox(bbox: tuple[float, float, float, float], buffer_m: float):
         east + buffer_m * deg_per_m_lon,
         north + buffer_m * deg_per_m_lat,
     )
+
+
+def bbox_difference(
+    bbox: tuple[float, float, float, float],
+    other: tuple[float, float, float, float],
+) -> list[tuple[float, float, float, float]]:
+    """Parts of bbox not covered by other, as up to four disjoint bboxes."""
+    west, south, east, north = bbox
+    o_west, o_south, o_east, o_north = other
+    if o_west >= east or o_east <= west or o_south >= north or o_north <= south:
+        return [bbox]
+    parts = []
+    # Full-width strips below and above, then the side strips between them
+    if o_south > south:
+        parts.append((west, south, east, o_south))
+    if o_north < north:
+        parts.append((west, o_north, east, north))
+    mid_south, mid_north = max(south, o_south), min(north, o_north)
+    if o_west > west:
+        parts.append((west, mid_south, o_west, mid_north))
+    if o_east < east:
+        parts.append((o_east, mid_south, east, mid_north))
+    return parts
+
+
+def line_ends(geoms: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Vertex table of a line array and where each line starts and ends in it.
+
+    Returns (valid, coords, first, last): positions of the lines with at least
+    two vertices, all vertex coordinates, and for each valid line the index
+    of its first and last vertex in coords.
+    """
+    coords, part = shapely.get_coordinates(geoms, return_index=True)
+    n_coords = np.bincount(part, minlength=len(geoms))
+    valid = np.flatnonzero(n_coords >= 2)
+    first = np.searchsorted(part, valid)
+    return valid, coords, first, first + n_coords[valid] - 1
+
+
+def snap_nodes(xy: np.ndarray, tolerance: float) -> tuple[np.ndarray, np.ndarray]:
+    """Merge points closer than ~tolerance into nodes.
+
+    Returns (nodes, node_of): one coordinate per node and the node of each point.
+    """
+    _, first, node_of = np.unique(
+        np.round(xy / tolerance).astype(np.int64), axis=0, return_index=True, return_inverse=True
+    )
+    return xy[first], node_of.ravel()
+
+
+def split_lines_at(
+    lines: np.ndarray,
+    line_index: np.ndarray,
+    distances: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Cut LineStrings at distances along them, vectorized over all cuts.
+
+    Args:
+        lines: LineStrings.
+        line_index, distances: One entry per cut (which line, distance from
+            its start). Cuts at or beyond a line's ends are ignored.
+
+    Returns:
+        (pieces, piece_line, piece_part): the pieces, the line each came
+        from and its order along that line. Lines without cuts are omitted.
+    """
+    lengths = shapely.length(lines)
+    keep = (distances > 0) & (distances < lengths[line_index])
+    line_index, distances = line_index[keep], distances[keep]
+    cut = np.unique(line_index)
+    if len(cut) == 0:
+        return np.empty(0, dtype=object), np.empty(0, dtype=int), np.empty(0, dtype=int)
+
+    # Breakpoints per line (both ends included), sorted along the line
+    b_line = np.concatenate([line_index, cut, cut])
+    b_dist = np.concatenate([distances, np.zeros(len(cut)), lengths[cut]])
+    order = np.lexsort((b_dist, b_line))
+    b_line, b_dist = b_line[order], b_dist[order]
+    distinct = np.ones(len(b_line), dtype=bool)
+    distinct[1:] = (b_line[1:] != b_line[:-1]) | (b_dist[1:] - b_dist[:-1] > 1e-9)
+    b_line, b_dist = b_line[distinct], b_dist[distinct]
+
+    same = b_line[1:] == b_line[:-1]
+    piece_line, start, end = b_line[:-1][same], b_dist[:-1][same], b_dist[1:][same]
+    n_pieces = len(piece_line)
+    piece_part = np.arange(n_pieces) - np.searchsorted(piece_line, piece_line)
+
+    # Distance along its line of every vertex of the cut lines
+    coords, v_rank = shapely.get_coordinates(lines[cut], return_index=True)
+    step = np.linalg.norm(np.diff(coords, axis=0), axis=1)
+    step[v_rank[1:] != v_rank[:-1]] = 0
+    along = np.concatenate([[0.0], np.cumsum(step)])
+    along -= along[np.searchsorted(v_rank, v_rank)]
+
+    # Piece holding each vertex, via a (line, distance) key sorted like the pieces
+    scale = lengths[cut].max() + 1
+    piece_key = np.searchsorted(cut, piece_line) * scale + start
+    vertex_piece = np.searchsorted(piece_key, v_rank * scale + along, side="right") - 1
+    interior = (along > start[vertex_piece] + 1e-9) & (along < end[vertex_piece] - 1e-9)
+
+    # Each piece: interpolated start, interior vertices in order, interpolated end
+    source = lines[piece_line]
+    xy = np.concatenate([
+        shapely.get_coordinates(shapely.line_interpolate_point(source, start)),
+        coords[interior],
+        shapely.get_coordinates(shapely.line_interpolate_point(source, end)),
+    ])
+    piece = np.concatenate([np.arange(n_pieces), vertex_piece[interior], np.arange(n_pieces)])
+    stage = np.repeat([0, 1, 2], [n_pieces, int(interior.sum()), n_pieces])
+    sequence = np.concatenate([np.zeros(n_pieces), np.flatnonzero(interior), np.zeros(n_pieces)])
+    order = np.lexsort((sequence, stage, piece))
+    pieces = shapely.linestrings(xy[order], indices=piece[order])
+    return pieces, piece_line, piece_part
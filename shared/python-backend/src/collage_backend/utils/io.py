@@ -1,10 +1,15 @@
 """I/O utilities — GeoJSON/GeoParquet read/write, GeoDataFrame conversion."""
 
 import json
+import os
 from pathlib import Path
 
 import geopandas as gpd
-from shapely.geometry import shape
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import shapely
 
 
 def geojson_to_gdf(geojson_dict: dict) -> gpd.GeoDataFrame:
@@ -19,6 +24,15 @@ def gdf_to_geojson(gdf: gpd.GeoDataFrame) -> dict:
     return json.loads(gdf.to_json())
 
 
+def json_floats(values) -> list[float | None]:
+    """Numeric array/Series as a JSON-ready list of floats with NaN → None."""
+    arr = np.asarray(values, dtype=float)
+    out = arr.tolist()
+    for i in np.flatnonzero(np.isnan(arr)):
+        out[i] = None
+    return out
+
+
 def save_geoparquet(gdf: gpd.GeoDataFrame, path: str | Path) -> None:
     """Save a GeoDataFrame as GeoParquet."""
     path = Path(path)
@@ -29,3 +43,331 @@ def save_geoparquet(gdf: gpd.GeoDataFrame, path: str | Path) -> None:
 def load_geoparquet(path: str | Path) -> gpd.GeoDataFrame:
     """Load a GeoDataFrame from GeoParquet."""
     return gpd.read_parquet(Path(path))
+
+
+def resolve_under(path: str | Path, root: str | Path) -> Path:
+    """Resolve a client-supplied path (relative to root) and require it to stay inside root.
+
+    Raises:
+        ValueError: If the resolved path (after symlinks and '..') leaves root.
+    """
+    root = Path(root).resolve()
+    resolved = (root / path).resolve()
+    if not resolved.is_relative_to(root):
+        raise ValueError(f"Path '{path}' is outside {root}")
+    return resolved
+
+
+# --- Binary layer transport (Arrow IPC / GeoParquet) ---
+#
+# A request or response body carries several named layers plus a small JSON
+# "meta" dict (scalar request params, metadata, metrics).
+#
+# Arrow IPC: one IPC stream per layer, concatenated back to back. Each stream's
+# schema metadata holds the layer name; the first also holds the meta dict.
+# Readers such as apache-arrow's RecordBatchReader.readAll() iterate them.
+#
+# GeoParquet: a single file; layers are stacked with a 'layer' column and the
+# meta dict lives in the file key-value metadata, next to an index of each
+# layer's row count and own columns.
+
+LAYER_KEY = b"collage:layer"
+META_KEY = b"collage:meta"
+LAYERS_KEY = b"collage:layers"
+LAYER_COLUMN = "layer"
+
+
+def gdf_to_arrow(gdf: gpd.GeoDataFrame, geometry_encoding: str = "WKB") -> pa.Table:
+    """Convert a GeoDataFrame to an Arrow table (WGS84, WKB or GeoArrow geometry)."""
+    if gdf.crs and not gdf.crs.is_geographic:
+        gdf = gdf.to_crs("EPSG:4326")
+    return pa.table(gdf.to_arrow(index=False, geometry_encoding=geometry_encoding))
+
+
+def arrow_to_gdf(table: pa.Table) -> gpd.GeoDataFrame:
+    """Convert an Arrow table with GeoArrow or plain WKB geometry to a GeoDataFrame."""
+    metadata = {
+        k: v for k, v in (table.schema.metadata or {}).items() if k not in (LAYER_KEY, META_KEY)
+    }
+    table = table.replace_schema_metadata(metadata or None)
+    try:
+        gdf = gpd.GeoDataFrame.from_arrow(table)
+    except ValueError:
+        # No GeoArrow extension metadata: treat a 'geometry' binary column as WKB
+        geometry = shapely.from_wkb(table.column("geometry").to_numpy(zero_copy_only=False))
+        df = table.drop_columns(["geometry"]).to_pandas()
+        gdf = gpd.GeoDataFrame(df, geometry=geometry, crs="EPSG:4326")
+    if gdf.crs is None:
+        gdf = gdf.set_crs("EPSG:4326")
+    return gdf
+
+
+def encode_layers(
+    layers: dict[str, gpd.GeoDataFrame | pa.Table],
+    meta: dict | None = None,
+    fmt: str = "arrow",
+    geometry_encoding: str = "WKB",
+) -> bytes:
+    """Serialize named layers (+ meta dict) as concatenated Arrow IPC streams or GeoParquet."""
+    tables = {
+        name: layer if isinstance(layer, pa.Table) else gdf_to_arrow(layer, geometry_encoding)
+        for name, layer in layers.items()
+    }
+    if fmt == "parquet":
+        return _layers_to_parquet(tables, meta)
+
+    sink = pa.BufferOutputStream()
+    if not tables:
+        tables = {"": pa.table({})}
+    for i, (name, table) in enumerate(tables.items()):
+        metadata = dict(table.schema.metadata or {})
+        metadata[LAYER_KEY] = name.encode()
+        if i == 0 and meta:
+            metadata[META_KEY] = json.dumps(meta, default=str).encode()
+        table = table.replace_schema_metadata(metadata)
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def decode_layers(data: bytes, fmt: str = "arrow") -> tuple[dict[str, gpd.GeoDataFrame], dict]:
+    """Parse a body written by encode_layers into ({name: GeoDataFrame}, meta)."""
+    if fmt == "parquet":
+        return _layers_from_parquet(data)
+
+    source = pa.BufferReader(data)
+    layers: dict[str, gpd.GeoDataFrame] = {}
+    meta: dict = {}
+    while source.tell() < len(data):
+        start = source.tell()
+        with pa.ipc.open_stream(source) as reader:
+            table = reader.read_all()
+        if source.tell() == start:
+            break
+        metadata = table.schema.metadata or {}
+        if META_KEY in metadata:
+            meta.update(json.loads(metadata[META_KEY]))
+        name = metadata.get(LAYER_KEY, b"").decode()
+        if name and table.num_columns:
+            layers[name] = arrow_to_gdf(table)
+    return layers, meta
+
+
+def _layers_to_parquet(tables: dict[str, pa.Table], meta: dict | None) -> bytes:
+    stacked = [
+        t.append_column(LAYER_COLUMN, pa.array([name] * t.num_rows, pa.string()))
+        for name, t in tables.items()
+    ]
+    table = pa.concat_tables(stacked, promote_options="default") if stacked else pa.table({})
+    metadata = {
+        b"geo": json.dumps({
+            "version": "1.1.0",
+            "primary_column": "geometry",
+            "columns": {"geometry": {"encoding": "WKB", "geometry_types": []}},
+        }).encode(),
+        LAYERS_KEY: json.dumps(_layer_index(tables)).encode(),
+    }
+    if meta:
+        metadata[META_KEY] = json.dumps(meta, default=str).encode()
+    table = table.replace_schema_metadata(metadata)
+    sink = pa.BufferOutputStream()
+    pq.write_table(table, sink)
+    return sink.getvalue().to_pybytes()
+
+
+def _layers_from_parquet(data: bytes) -> tuple[dict[str, gpd.GeoDataFrame], dict]:
+    table = pq.read_table(pa.BufferReader(data))
+    metadata = table.schema.metadata or {}
+    meta = json.loads(metadata[META_KEY]) if META_KEY in metadata else {}
+    parts = _split_layers(table, _layer_columns(metadata))
+    return {name: arrow_to_gdf(part) for name, part in parts.items()}, meta
+
+
+def _layer_index(tables: dict[str, pa.Table]) -> dict[str, dict]:
+    """LAYERS_KEY entry: rows and own columns per layer, so readers can unstack exactly."""
+    return {
+        name: {
+            "rows": t.num_rows,
+            "columns": [c for c in t.column_names if c not in (LAYER_COLUMN, BBOX_COLUMN)],
+        }
+        for name, t in tables.items()
+    }
+
+
+def _layer_columns(metadata: dict) -> dict[str, list[str]] | None:
+    """Per-layer columns from the LAYERS_KEY metadata (None for older files)."""
+    index = json.loads(metadata.get(LAYERS_KEY, b"{}"))
+    if not index or not all(isinstance(v, dict) for v in index.values()):
+        return None
+    return {name: entry["columns"] for name, entry in index.items()}
+
+
+def _split_layers(
+    table: pa.Table,
+    columns: dict[str, list[str]] | None = None,
+) -> dict[str, pa.Table]:
+    """Unstack a table with a 'layer' column into {name: table}, in file order.
+
+    Writers stack each layer as one contiguous run, so layers are normally
+    zero-copy slices; interleaved layers fall back to a filter per layer.
+
+    Args:
+        table: Stacked table.
+        columns: Each layer's own columns (from LAYERS_KEY); columns read but
+            not listed for a layer belong to other layers and are dropped.
+            Without it (files written before the index listed columns), a
+            column that is entirely null within a layer is taken to belong
+            to another layer.
+    """
+    if LAYER_COLUMN not in table.column_names:
+        return {}
+    names = table.column(LAYER_COLUMN).to_numpy(zero_copy_only=False)
+    breaks = np.flatnonzero(names[1:] != names[:-1]) + 1
+    starts = np.concatenate([[0], breaks]).astype(int)
+    ends = np.concatenate([breaks, [len(names)]]).astype(int)
+    if len(names) and len(set(names[starts])) == len(starts):
+        parts = {names[a]: table.slice(a, b - a) for a, b in zip(starts, ends, strict=True)}
+    else:
+        parts = {
+            name: table.filter(pc.equal(table.column(LAYER_COLUMN), name))
+            for name in pc.unique(table.column(LAYER_COLUMN)).to_pylist()
+        }
+
+    layers: dict[str, pa.Table] = {}
+    for name, part in parts.items():
+        part = part.drop_columns([LAYER_COLUMN])
+        if columns is not None and name in columns:
+            own = set(columns[name])
+            keep = [c for c in part.column_names if c == "geometry" or c in own]
+        else:
+            keep = [
+                c for c in part.column_names
+                if c == "geometry" or part.column(c).null_count < len(part)
+            ]
+        layers[name] = part.select(keep).replace_schema_metadata(None)
+    return layers
+
+
+# --- Layered GeoParquet files (saved fragments) ---
+#
+# The same stacked layout as the GeoParquet transport, plus a GeoParquet 1.1
+# 'bbox' covering column (struct of xmin/ymin/xmax/ymax per row). Each layer
+# is Hilbert-sorted and written as its own run of row groups, so the
+# row-group statistics on 'layer' and 'bbox' let a reader skip everything
+# outside the requested layers and area without decoding geometry.
+
+BBOX_COLUMN = "bbox"
+_BBOX_FIELDS = ("xmin", "ymin", "xmax", "ymax")
+
+
+def is_layered_parquet(path: str | Path) -> bool:
+    """Whether path was written by write_layered_parquet (vs. a plain GeoParquet)."""
+    return LAYER_COLUMN in pq.read_schema(Path(path)).names
+
+
+def write_layered_parquet(
+    path: str | Path,
+    layers: dict[str, gpd.GeoDataFrame],
+    meta: dict | None = None,
+    row_group_size: int = 8192,
+) -> dict[str, int]:
+    """Write named layers (+ meta dict) to one GeoParquet file; returns rows per layer.
+
+    Empty layers are skipped. The file is written next to path and renamed
+    into place, so readers never see a partial file.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tables: dict[str, pa.Table] = {}
+    for name, gdf in layers.items():
+        if gdf is None or gdf.empty:
+            continue
+        if gdf.crs is None:
+            gdf = gdf.set_crs("EPSG:4326")
+        elif not gdf.crs.equals("EPSG:4326"):
+            gdf = gdf.to_crs("EPSG:4326")
+        gdf = gdf.iloc[np.argsort(gdf.hilbert_distance().to_numpy(), kind="stable")]
+        bounds = shapely.bounds(gdf.geometry.to_numpy())
+        bbox = pa.StructArray.from_arrays(
+            [pa.array(bounds[:, i], pa.float64()) for i in range(4)], names=list(_BBOX_FIELDS)
+        )
+        table = gdf_to_arrow(gdf).append_column(BBOX_COLUMN, bbox)
+        tables[name] = table.append_column(
+            LAYER_COLUMN, pa.array([name] * table.num_rows, pa.string())
+        )
+
+    counts = {name: t.num_rows for name, t in tables.items()}
+    if tables:
+        table = pa.concat_tables(tables.values(), promote_options="permissive")
+    else:
+        table = pa.table({
+            "geometry": pa.array([], pa.binary()),
+            BBOX_COLUMN: pa.array([], pa.struct([(f, pa.float64()) for f in _BBOX_FIELDS])),
+            LAYER_COLUMN: pa.array([], pa.string()),
+        })
+    metadata = {
+        b"geo": json.dumps({
+            "version": "1.1.0",
+            "primary_column": "geometry",
+            "columns": {"geometry": {
+                "encoding": "WKB",
+                "geometry_types": [],
+                "covering": {"bbox": {f: [BBOX_COLUMN, f] for f in _BBOX_FIELDS}},
+            }},
+        }).encode(),
+        LAYERS_KEY: json.dumps(_layer_index(tables)).encode(),
+    }
+    if meta:
+        metadata[META_KEY] = json.dumps(meta, default=str).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with pq.ParquetWriter(tmp, table.schema, write_statistics=True) as writer:
+        offset = 0
+        for n in counts.values():
+            # One write per layer: row groups never mix layers
+            writer.write_table(table.slice(offset, n), row_group_size=row_group_size)
+            offset += n
+    os.replace(tmp, path)
+    return counts
+
+
+def read_layered_parquet(
+    path: str | Path,
+    layers: list[str] | None = None,
+    columns: list[str] | None = None,
+    bbox: tuple[float, float, float, float] | None = None,
+) -> tuple[dict[str, pa.Table], dict]:
+    """Read ({name: Arrow table}, meta) from a write_layered_parquet file.
+
+    Args:
+        path: File path.
+        layers: Layer names to read (default: all).
+        columns: Attribute columns to keep besides geometry (default: all);
+            names a layer lacks are ignored.
+        bbox: (west, south, east, north) in WGS84; keeps rows whose bounding
+            box intersects it. Pushed down to row-group statistics.
+    """
+    path = Path(path)
+    schema = pq.read_schema(path)
+    metadata = schema.metadata or {}
+    meta = json.loads(metadata[META_KEY]) if META_KEY in metadata else {}
+
+    expr = None
+    if layers is not None:
+        expr = pc.field(LAYER_COLUMN).isin(list(layers))
+    if bbox is not None:
+        west, south, east, north = bbox
+        within = (
+            (pc.field(BBOX_COLUMN, "xmin") <= east)
+            & (pc.field(BBOX_COLUMN, "xmax") >= west)
+            & (pc.field(BBOX_COLUMN, "ymin") <= north)
+            & (pc.field(BBOX_COLUMN, "ymax") >= south)
+        )
+        expr = within if expr is None else expr & within
+
+    wanted = {"geometry", LAYER_COLUMN, *(columns if columns is not None else schema.names)}
+    read_columns = [c for c in schema.names if c in wanted and c != BBOX_COLUMN]
+    table = pq.read_table(path, columns=read_columns, filters=expr, memory_map=True)
+    return _split_layers(table, _layer_columns(metadata)), meta
@@ -0,0 +1,83 @@
+"""In-memory memoization of expensive per-layer structures.
+
+Graphs and spatial indexes built from a request's layers are cached by a
+digest of the layer geometry, so repeated requests on the same fragment
+(new radii, new origins) skip construction. Unlike the on-disk stage cache
+these objects are not serializable, and they live only in this process.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+import geopandas as gpd
+import shapely
+
+_REGISTRY: list["LRUMemo"] = []
+
+
+def frame_digest(gdf: gpd.GeoDataFrame, *columns: str) -> str:
+    """Content hash of a layer's geometry (plus CRS and the given columns).
+
+    Row order matters: cached structures are usually addressed by position.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(gdf.crs).encode())
+    h.update(len(gdf).to_bytes(8, "little"))
+    for wkb in shapely.to_wkb(gdf.geometry.to_numpy()):
+        h.update(wkb if wkb is not None else b"\0")
+    for col in columns:
+        h.update(gdf[col].to_numpy().astype(str).tobytes())
+    return h.hexdigest()
+
+
+class LRUMemo:
+    """Thread-safe LRU mapping of key → value with hit/miss counters."""
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self._items: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        _REGISTRY.append(self)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Return the value for key, computing (outside the lock) on a miss."""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self._hits += 1
+                return self._items[key]
+            self._misses += 1
+        value = compute()
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> dict:
+        """Counters in the same shape as StageCache.stats() for /metrics."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._items),
+                "max_entries": self.maxsize,
+                "hits": {self.name: self._hits},
+                "misses": {self.name: self._misses},
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+
+def memo_stats() -> dict[str, dict]:
+    """stats() of every LRUMemo created in this process, by name."""
+    return {memo.name: memo.stats() for memo in _REGISTRY}
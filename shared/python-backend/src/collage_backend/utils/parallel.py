@@ -0,0 +1,25 @@
+"""Process-pool helpers shared by the CPU-bound services."""
+
+import multiprocessing as mp
+import os
+
+
+def worker_count(n_jobs: int) -> int:
+    """Workers for an n_jobs setting (-1 or 0 = all CPUs)."""
+    return n_jobs if n_jobs >= 1 else os.cpu_count() or 1
+
+
+def pool_context(preload: list[str] | None = None):
+    """Multiprocessing context for worker pools started from the server.
+
+    Args:
+        preload: Modules the forkserver imports once, so every worker forked
+            from it starts with them loaded (only before its first use).
+    """
+    # forkserver avoids forking the threaded server process itself
+    if "forkserver" in mp.get_all_start_methods():
+        ctx = mp.get_context("forkserver")
+        if preload:
+            ctx.set_forkserver_preload(preload)
+        return ctx
+    return mp.get_context("spawn")
@@ -0,0 +1,226 @@
+"""Request tracing: timed spans around service calls, Prometheus export.
+
+Wrap a service entry point with @traced("name") or a block with
+``with span("name") as s: ...``. Each finished span is
+
+- observed into Prometheus histograms (latency, input feature count and,
+  when TRACE_MEMORY is on, tracemalloc peak) labelled by stage, and
+- appended to the current request's trace, which TracingMiddleware turns
+  into a Server-Timing header so browser devtools show per-stage timings.
+
+prometheus_client is optional (the 'observability' extra); without it spans
+still feed Server-Timing and GET /metrics answers 503. tracemalloc is global,
+so memory peaks of concurrently running requests overlap.
+"""
+
+import functools
+import logging
+import re
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from collage_backend.config import TRACE_MEMORY
+
+logger = logging.getLogger(__name__)
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, Gauge, Histogram, generate_latest
+except ImportError:  # optional dependency
+    CONTENT_TYPE_LATEST = "text/plain"
+    Gauge = Histogram = generate_latest = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+FEATURE_BUCKETS = (10, 100, 500, 1000, 2000, 5000, 10_000, 50_000, 100_000, 500_000)
+MEMORY_BUCKETS = tuple(2**p * 1024**2 for p in range(0, 13))  # 1 MiB … 4 GiB
+
+if Histogram is not None:
+    REQUEST_SECONDS = Histogram(
+        "collage_request_seconds", "HTTP request latency",
+        ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+    )
+    REQUESTS_IN_FLIGHT = Gauge("collage_requests_in_flight", "Requests currently being served")
+    STAGE_SECONDS = Histogram(
+        "collage_stage_seconds", "Service stage latency", ["stage"], buckets=LATENCY_BUCKETS,
+    )
+    STAGE_FEATURES = Histogram(
+        "collage_stage_features", "Input features per service stage", ["stage"],
+        buckets=FEATURE_BUCKETS,
+    )
+    STAGE_PEAK_BYTES = Histogram(
+        "collage_stage_peak_memory_bytes", "tracemalloc peak above the stage's starting usage",
+        ["stage"], buckets=MEMORY_BUCKETS,
+    )
+    CACHE_LOOKUPS = Gauge(
+        "collage_cache_lookups", "Cache lookups since start", ["cache", "stage", "result"],
+    )
+    CACHE_HIT_RATIO = Gauge("collage_cache_hit_ratio", "Cache hit ratio since start", ["cache"])
+
+
+@dataclass
+class Span:
+    """One timed stage of a request."""
+
+    name: str
+    features: int | None = None
+    start: float = field(default_factory=time.perf_counter)
+    duration: float | None = None
+    mem_start: int = 0
+    mem_peak: int = 0
+    parent: "Span | None" = None
+
+    @property
+    def peak_bytes(self) -> int | None:
+        return self.mem_peak - self.mem_start if self.mem_peak else None
+
+
+_trace: ContextVar[list[Span] | None] = ContextVar("collage_trace", default=None)
+_current: ContextVar[Span | None] = ContextVar("collage_span", default=None)
+
+
+@contextmanager
+def span(name: str, features: int | None = None) -> Iterator[Span]:
+    """Time a block as a named stage. Set `s.features` inside to record a count."""
+    parent = _current.get()
+    s = Span(name, features=features, parent=parent)
+    measure = TRACE_MEMORY and tracemalloc.is_tracing()
+    if measure:
+        current, peak = tracemalloc.get_traced_memory()
+        if parent is not None:
+            # Our reset_peak() would hide the parent's peak so far; hand it over
+            parent.mem_peak = max(parent.mem_peak, peak)
+        tracemalloc.reset_peak()
+        s.mem_start = current
+    token = _current.set(s)
+    try:
+        yield s
+    finally:
+        _current.reset(token)
+        s.duration = time.perf_counter() - s.start
+        if measure:
+            s.mem_peak = max(s.mem_peak, tracemalloc.get_traced_memory()[1])
+            if parent is not None:
+                parent.mem_peak = max(parent.mem_peak, s.mem_peak)
+        _record(s)
+
+
+def traced(name: str) -> Callable:
+    """Decorator running a function inside span(name).
+
+    When the first positional argument is a (Geo)DataFrame its length is
+    recorded as the feature count.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            layer = args[0] if args else None
+            features = len(layer) if hasattr(layer, "columns") else None
+            with span(name, features=features):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _record(s: Span) -> None:
+    trace = _trace.get()
+    if trace is not None:
+        trace.append(s)
+    if Histogram is None:
+        return
+    STAGE_SECONDS.labels(s.name).observe(s.duration)
+    if s.features is not None:
+        STAGE_FEATURES.labels(s.name).observe(s.features)
+    if s.peak_bytes is not None:
+        STAGE_PEAK_BYTES.labels(s.name).observe(s.peak_bytes)
+
+
+def server_timing(spans: list[Span], total: float) -> str:
+    """Server-Timing header value: one entry per span plus the total."""
+    entries = []
+    for i, s in enumerate(spans):
+        # Metric names are HTTP tokens and must be unique within the header
+        token = re.sub(r"[^A-Za-z0-9_.-]", "_", s.name)
+        desc = f"{s.name} ({s.features} features)" if s.features is not None else s.name
+        entries.append(f'{token}-{i};dur={s.duration * 1000:.1f};desc="{desc}"')
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class TracingMiddleware:
+    """Per-request trace, Server-Timing header, latency and in-flight metrics.
+
+    Pure ASGI so streamed responses pass through unbuffered; their stages run
+    after the headers are sent and therefore only reach Prometheus.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        spans: list[Span] = []
+        token = _trace.set(spans)
+        t0 = time.perf_counter()
+        status = 500
+        if Histogram is not None:
+            REQUESTS_IN_FLIGHT.inc()
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                value = server_timing(spans, time.perf_counter() - t0)
+                headers.append((b"server-timing", value.encode("latin-1", "replace")))
+                # Lets cross-origin frontends read the timings in devtools/JS
+                headers.append((b"timing-allow-origin", b"*"))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _trace.reset(token)
+            if Histogram is not None:
+                REQUESTS_IN_FLIGHT.dec()
+                # Label by route template, not raw path, to bound cardinality
+                matched = scope.get("route")
+                template = getattr(matched, "path", "unmatched")
+                REQUEST_SECONDS.labels(scope["method"], template, str(status)).observe(
+                    time.perf_counter() - t0
+                )
+
+
+def export_metrics(caches: dict[str, dict]) -> bytes | None:
+    """Prometheus exposition text, or None without prometheus_client.
+
+    Args:
+        caches: Cache name → stats dict with per-stage 'hits'/'misses' dicts
+            and 'hit_rate', refreshed into gauges at scrape time.
+    """
+    if generate_latest is None:
+        return None
+    for cache, stats in caches.items():
+        for result in ("hits", "misses"):
+            for stage, count in stats.get(result, {}).items():
+                CACHE_LOOKUPS.labels(cache, stage, result).set(count)
+        CACHE_HIT_RATIO.labels(cache).set(stats.get("hit_rate", 0.0))
+    return generate_latest()
+
+
+def start_memory_tracing() -> None:
+    """Start tracemalloc when TRACE_MEMORY is on (call once at startup)."""
+    if TRACE_MEMORY and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        logger.info("tracemalloc enabled for stage memory peaks")
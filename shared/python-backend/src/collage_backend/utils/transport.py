@@ -0,0 +1,213 @@
+"""Content negotiation between GeoJSON and binary (Arrow IPC / GeoParquet) bodies.
+
+Requests: Content-Type selects the body codec. JSON bodies are validated
+against the endpoint's Pydantic model as before; binary bodies carry layers
+as Arrow/GeoParquet (see utils/io.encode_layers) and the model's scalar fields
+in the meta dict.
+
+Responses: Accept selects the codec. GeoJSON stays the default; binary
+responses accept a ``geometry=geoarrow`` media type parameter for native
+GeoArrow coordinates instead of WKB.
+"""
+
+from collections.abc import Callable
+from typing import Any, NamedTuple
+
+import geopandas as gpd
+import pyarrow as pa
+from fastapi import HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+from shapely.errors import ShapelyError
+
+from collage_backend.utils.io import (
+    arrow_to_gdf,
+    decode_layers,
+    encode_layers,
+    gdf_to_geojson,
+    geojson_to_gdf,
+)
+
+GEOJSON = "geojson"
+ARROW = "arrow"
+PARQUET = "parquet"
+
+MEDIA_TYPES = {
+    ARROW: "application/vnd.apache.arrow.stream",
+    PARQUET: "application/vnd.apache.parquet",
+}
+_FORMATS = {
+    "application/vnd.apache.arrow.stream": ARROW,
+    "application/vnd.apache.arrow": ARROW,
+    "application/vnd.apache.parquet": PARQUET,
+    "application/x-parquet": PARQUET,
+}
+
+# Layers of a FragmentPackage
+PACKAGE_LAYERS = ("buildings", "streets", "tessellation", "blocks")
+
+EMPTY_FEATURE_COLLECTION = {"type": "FeatureCollection", "features": []}
+
+
+class LayerBody(NamedTuple):
+    """A parsed request: validated model plus its geometry layers as GeoDataFrames."""
+
+    req: Any
+    layers: dict[str, gpd.GeoDataFrame]
+
+
+def request_format(request: Request) -> str:
+    """Body codec from the Content-Type header."""
+    media_type, _ = _parse_media_type(request.headers.get("content-type", ""))
+    return _FORMATS.get(media_type, GEOJSON)
+
+
+def response_format(request: Request) -> tuple[str, str]:
+    """(codec, geometry encoding) from the Accept header; first binary match wins."""
+    for item in request.headers.get("accept", "").split(","):
+        media_type, params = _parse_media_type(item)
+        if media_type in _FORMATS and params.get("q") != "0":
+            encoding = "geoarrow" if params.get("geometry") == "geoarrow" else "WKB"
+            return _FORMATS[media_type], encoding
+    return GEOJSON, "WKB"
+
+
+def layer_body(
+    model: type[BaseModel],
+    layers: tuple[str, ...] = (),
+    package: str | None = None,
+) -> Callable:
+    """FastAPI dependency parsing a JSON or binary body into a LayerBody.
+
+    Args:
+        model: Pydantic request model (validated for both codecs).
+        layers: Model fields holding GeoJSON FeatureCollections.
+        package: Model field holding a whole FragmentPackage; its layers are
+            decoded to GeoDataFrames in place and 'metadata'/'metrics' taken
+            from the binary meta dict.
+    """
+
+    async def dependency(request: Request) -> LayerBody:
+        fmt = request_format(request)
+        body = await request.body()
+        try:
+            if fmt == GEOJSON:
+                req = model.model_validate_json(body)
+                decoded = {
+                    name: geojson_to_gdf(getattr(req, name))
+                    for name in layers
+                    if getattr(req, name) is not None
+                }
+                if package:
+                    _decode_package(getattr(req, package))
+            else:
+                try:
+                    decoded, meta = decode_layers(body, fmt)
+                except (pa.ArrowInvalid, OSError, ValueError, ShapelyError) as e:
+                    # Truncated stream, not Arrow/Parquet at all, bad WKB or meta JSON
+                    raise HTTPException(
+                        status_code=400, detail=f"Malformed {fmt} body: {e}"
+                    ) from e
+                params = {k: v for k, v in meta.items() if k in model.model_fields}
+                for name in layers:
+                    params[name] = EMPTY_FEATURE_COLLECTION
+                if package:
+                    params[package] = {
+                        "metadata": meta.get("metadata", {}),
+                        "metrics": meta.get("metrics"),
+                        **{name: decoded.pop(name, _empty_gdf()) for name in PACKAGE_LAYERS},
+                    }
+                req = model.model_validate(params)
+        except ValidationError as e:
+            raise RequestValidationError(e.errors()) from e
+
+        for name in layers:
+            decoded.setdefault(name, _empty_gdf())
+        return LayerBody(req, decoded)
+
+    return dependency
+
+
+def body_openapi(model: type[BaseModel]) -> dict:
+    """openapi_extra documenting a layer_body endpoint's accepted bodies."""
+    schema = {"schema": model.model_json_schema()}
+    binary = {"schema": {"type": "string", "format": "binary"}}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": schema,
+                MEDIA_TYPES[ARROW]: binary,
+                MEDIA_TYPES[PARQUET]: binary,
+            },
+        }
+    }
+
+
+def layer_response(request: Request, gdf: gpd.GeoDataFrame, name: str = "features"):
+    """Single-layer response: a FeatureCollection, or one binary layer."""
+    fmt, encoding = response_format(request)
+    if fmt == GEOJSON:
+        return gdf_to_geojson(gdf)
+    return _binary(fmt, encoding, {name: gdf}, None)
+
+
+def package_response(request: Request, package: dict):
+    """FragmentPackage-shaped response; layers are GeoDataFrames, WKB Arrow tables or None."""
+    fmt, encoding = response_format(request)
+    if fmt == GEOJSON:
+        return package_geojson(package)
+    layers = {k: v for k, v in package.items() if isinstance(v, (gpd.GeoDataFrame, pa.Table))}
+    meta = {k: v for k, v in package.items() if k not in layers and v is not None}
+    return _binary(fmt, encoding, layers, meta)
+
+
+def package_geojson(package: dict) -> dict:
+    """FragmentPackage with every layer as a GeoJSON FeatureCollection."""
+    return {
+        k: gdf_to_geojson(arrow_to_gdf(v) if isinstance(v, pa.Table) else v)
+        if isinstance(v, (gpd.GeoDataFrame, pa.Table))
+        else EMPTY_FEATURE_COLLECTION if k in PACKAGE_LAYERS and v is None
+        else v
+        for k, v in package.items()
+    }
+
+
+def passes_wkb_tables(request: Request) -> bool:
+    """Whether the response codec can take WKB Arrow tables as read, without decoding."""
+    fmt, encoding = response_format(request)
+    return fmt == PARQUET or (fmt == ARROW and encoding == "WKB")
+
+
+def _binary(fmt: str, encoding: str, layers: dict, meta: dict | None) -> Response:
+    if fmt == PARQUET:
+        encoding = "WKB"  # GeoParquet bodies always carry WKB
+    elif encoding != "WKB":
+        # Arrow tables carry WKB as stored; GeoArrow coordinates need a decode
+        layers = {k: arrow_to_gdf(v) if isinstance(v, pa.Table) else v for k, v in layers.items()}
+    return Response(
+        content=encode_layers(layers, meta, fmt=fmt, geometry_encoding=encoding),
+        media_type=MEDIA_TYPES[fmt],
+    )
+
+
+def _decode_package(package: dict) -> None:
+    for name in PACKAGE_LAYERS:
+        value = package.get(name)
+        if isinstance(value, dict) and "features" in value:
+            package[name] = geojson_to_gdf(value)
+        elif value is None:
+            package[name] = _empty_gdf()
+
+
+def _empty_gdf() -> gpd.GeoDataFrame:
+    return gpd.GeoDataFrame(geometry=[], crs="EPSG:4326")
+
+
+def _parse_media_type(value: str) -> tuple[str, dict[str, str]]:
+    parts = [p.strip() for p in value.split(";")]
+    params = {}
+    for part in parts[1:]:
+        key, _, val = part.partition("=")
+        params[key.strip().lower()] = val.strip().strip('"')
+    return parts[0].lower(), params
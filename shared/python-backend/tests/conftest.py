@@ -7,3 +7,32 @@ import pytest
 def barcelona_bbox():
     """Barcelona Eixample bounding box (small area for testing)."""
     return (2.1600, 41.3850, 2.1750, 41.3950)
+
+
+@pytest.fixture
+def grid_layers():
+    """(buildings, streets) on a 4 x 4 block street grid in EPSG:3857, 4 buildings per block.
+
+    Blocks are 100 m apart; ids are b<block>-<k> and s<i>.
+    """
+    gpd = pytest.importorskip("geopandas")
+    from shapely.geometry import LineString, box
+
+    n, step = 4, 100.0
+    lines = [LineString([(0, i * step), (n * step, i * step)]) for i in range(n + 1)]
+    lines += [LineString([(i * step, 0), (i * step, n * step)]) for i in range(n + 1)]
+    streets = gpd.GeoDataFrame(
+        {"id": [f"s{i}" for i in range(len(lines))]}, geometry=lines, crs="EPSG:3857"
+    )
+
+    ids, footprints, heights = [], [], []
+    for block in range(n * n):
+        x0, y0 = (block % n) * step, (block // n) * step
+        for k, (dx, dy) in enumerate([(15, 15), (55, 15), (15, 55), (55, 55)]):
+            ids.append(f"b{block}-{k}")
+            footprints.append(box(x0 + dx, y0 + dy, x0 + dx + 25 + k, y0 + dy + 20))
+            heights.append(6.0 + 3 * ((block + k) % 5))
+    buildings = gpd.GeoDataFrame(
+        {"id": ids, "height_m": heights}, geometry=footprints, crs="EPSG:3857"
+    )
+    return buildings, streets
@@ -0,0 +1,42 @@
+"""Tests for the vectorized Spacematrix/LCZ scoring kernels."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("geopandas")
+
+from collage_backend.services.classification import (  # noqa: E402
+    _LCZ_BOUNDS,
+    LCZ_INDICATORS,
+    LCZ_THRESHOLDS,
+    _membership,
+    _penalty_matrix,
+)
+
+
+def _scalar_penalty(values, thresholds):
+    score = 0.0
+    for value, (low, high) in zip(values, thresholds, strict=True):
+        if low is not None and value < low:
+            score += ((low - value) / max(abs(low), 1)) ** 2
+        elif high is not None and value > high:
+            score += ((value - high) / max(abs(high), 1)) ** 2
+    return score
+
+
+def test_penalty_matrix_matches_scalar_scoring():
+    values = np.array([[0.5, 30.0, 2.5], [0.05, 2.0, 0.05], [0.3, 12.0, 0.5]])
+    penalty = _penalty_matrix(values, *_LCZ_BOUNDS)
+
+    assert penalty.shape == (3, len(LCZ_THRESHOLDS))
+    for i, row in enumerate(values):
+        for j, thresholds in enumerate(LCZ_THRESHOLDS.values()):
+            expected = _scalar_penalty(row, [thresholds[k] for k in LCZ_INDICATORS])
+            assert penalty[i, j] == pytest.approx(expected)
+
+
+def test_membership_rows_sum_to_one():
+    membership = _membership(np.array([[0.0, 1.0, 1e6], [2.0, 2.0, 2.0]]))
+
+    np.testing.assert_allclose(membership.sum(axis=1), 1.0)
+    assert membership[0].argmax() == 0
@@ -0,0 +1,39 @@
+"""Tests for the request-scoped ProjectionContext."""
+
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+
+from shapely.geometry import box  # noqa: E402
+
+from collage_backend.utils.crs import ProjectionContext  # noqa: E402
+
+
+@pytest.fixture
+def buildings():
+    return gpd.GeoDataFrame(
+        {"id": ["a", "b"]},
+        geometry=[box(2.16, 41.385, 2.161, 41.386), box(2.162, 41.385, 2.163, 41.386)],
+        crs="EPSG:4326",
+    )
+
+
+def test_context_centres_tmerc_on_bounds(buildings):
+    ctx = ProjectionContext.for_layers(buildings)
+    projected = ctx.project(buildings)
+
+    assert not projected.crs.is_geographic
+    minx, miny, maxx, maxy = projected.total_bounds
+    assert abs(minx + maxx) < 1.0 and abs(miny + maxy) < 1.0
+
+
+def test_project_is_memoized_and_isolated(buildings, monkeypatch):
+    ctx = ProjectionContext.for_layers(buildings)
+    first = ctx.project(buildings)
+    first["extra"] = 1
+
+    monkeypatch.setattr(gpd.GeoDataFrame, "to_crs", lambda *a, **k: pytest.fail("reprojected"))
+    second = ctx.project(buildings)
+
+    assert "extra" not in second.columns
+    assert second.geometry.equals(first.geometry)
@@ -0,0 +1,72 @@
+"""Shape of the /extract/stream NDJSON events."""
+
+import json
+
+import pytest
+
+pytest.importorskip("geopandas")
+pytest.importorskip("fastapi")
+
+from collage_backend.models.request import ExtractRequest
+from collage_backend.routes.extract import _ndjson_stages, _stage_event
+from collage_backend.services.pipeline import PIPELINE_STAGES
+
+
+@pytest.fixture
+def stage_results(grid_layers):
+    """(stage, result) pairs as iter_extract_stages yields them, without the network."""
+    buildings, streets = grid_layers
+    buildings, streets = buildings.to_crs("EPSG:4326"), streets.to_crs("EPSG:4326")
+    enriched = buildings.assign(
+        floor_count=(buildings["height_m"] // 3).astype(int),
+        height_source=["osm_tag", None] * (len(buildings) // 2),
+    )
+    enriched.loc[1, "height_m"] = None
+    return [
+        ("buildings", buildings),
+        ("streets", streets),
+        ("heights", enriched),
+        ("tessellation", None),
+        ("metrics", {"building_count": len(buildings)}),
+    ]
+
+
+def test_heights_event_is_a_columnar_patch(stage_results):
+    enriched = stage_results[2][1]
+    event = _stage_event("heights", enriched)
+
+    assert event["stage"] == "heights" and event["step"] == 3
+    data = event["data"]
+    assert set(data) == {"id", "height_m", "floor_count", "height_source"}
+    assert data["id"] == enriched["id"].tolist()
+    for values in data.values():
+        assert len(values) == len(enriched)
+    assert data["height_m"][1] is None
+    assert data["height_source"][:2] == ["osm_tag", None]
+
+
+def test_stream_events_in_step_order(stage_results):
+    req = ExtractRequest(bbox=(0.0, 0.0, 0.004, 0.004))
+    lines = list(_ndjson_stages(req, stage_results[0], iter(stage_results[1:])))
+    events = [json.loads(line) for line in lines]
+
+    assert [e["stage"] for e in events] == [*PIPELINE_STAGES, "done"]
+    assert [e["step"] for e in events[:-1]] == [1, 2, 3, 4, 5]
+    for event in events[:2]:
+        assert event["data"]["type"] == "FeatureCollection"
+    assert len(events[0]["data"]["features"]) == len(stage_results[0][1])
+    assert events[3]["data"] is None
+    assert events[4]["data"] == {"building_count": len(stage_results[0][1])}
+    assert events[-1]["metadata"]["building_count"] == len(stage_results[0][1])
+
+
+def test_stream_reports_a_late_failure(stage_results):
+    def stages():
+        yield stage_results[1]
+        raise RuntimeError("tessellation exploded")
+
+    req = ExtractRequest(bbox=(0.0, 0.0, 0.004, 0.004))
+    events = [json.loads(line) for line in _ndjson_stages(req, stage_results[0], stages())]
+
+    assert [e["stage"] for e in events] == ["buildings", "streets", "error"]
+    assert events[-1]["detail"] == "tessellation exploded"
@@ -0,0 +1,89 @@
+"""Fragment catalog: register saved fragments, query by bbox, city and metrics."""
+
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+pytest.importorskip("momepy")
+
+from shapely.geometry import box  # noqa: E402
+
+from collage_backend.services.fragment_catalog import FragmentCatalog  # noqa: E402
+
+
+def _buildings(lng: float, lat: float, n: int, height: float) -> gpd.GeoDataFrame:
+    return gpd.GeoDataFrame(
+        {"id": [f"b{i}" for i in range(n)], "height_m": [height] * n},
+        geometry=[box(lng + i * 1e-4, lat, lng + i * 1e-4 + 5e-5, lat + 5e-5) for i in range(n)],
+        crs="EPSG:4326",
+    )
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = FragmentCatalog(tmp_path / "catalog.sqlite")
+    catalog.register(
+        tmp_path / "barcelona.parquet",
+        {"buildings": _buildings(2.16, 41.38, 10, 21.0)},
+        {"name": "Eixample", "city": "Barcelona"},
+    )
+    catalog.register(
+        tmp_path / "paris.parquet",
+        {"buildings": _buildings(2.35, 48.85, 4, 18.0)},
+        {"name": "Marais", "city": "Paris"},
+    )
+    return catalog
+
+
+def test_bbox_and_city_queries(catalog):
+    hits = catalog.query(bbox=(2.0, 41.0, 2.5, 42.0))
+    assert [f["name"] for f in hits["fragments"]] == ["Eixample"]
+    assert hits["fragments"][0]["building_count"] == 10
+    west, south, east, north = hits["fragments"][0]["bbox"]
+    lng, lat = hits["fragments"][0]["centroid"]
+    assert west <= lng <= east and south <= lat <= north
+
+    assert catalog.query(city="paris")["total"] == 1
+    assert catalog.query()["total"] == 2
+
+
+def test_metric_ranges(catalog):
+    hits = catalog.query(metrics={"building_count": (5, None)})
+    assert [f["name"] for f in hits["fragments"]] == ["Eixample"]
+    assert catalog.query(metrics={"mean_height": (None, 19.0)})["fragments"][0]["city"] == "Paris"
+    assert catalog.query(metrics={"no_such_metric": (0, None)})["total"] == 0
+
+
+def test_reregister_replaces_entry(catalog, tmp_path):
+    catalog.register(
+        tmp_path / "paris.parquet", {"buildings": _buildings(2.35, 48.85, 6, 18.0)}, {"city": "Paris"}
+    )
+    hits = catalog.query(city="Paris")
+    assert hits["total"] == 1
+    assert hits["fragments"][0]["metrics"]["building_count"] == 6
+    assert catalog.remove(tmp_path / "paris.parquet")
+    assert catalog.query()["total"] == 1
+
+
+def test_reindex_endpoint_stays_under_fragment_dir(tmp_path, monkeypatch):
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from collage_backend.main import app
+    from collage_backend.routes import fragment
+
+    fragment_dir = tmp_path / "fragments"
+    (fragment_dir / "city").mkdir(parents=True)
+    scanned = []
+    monkeypatch.setattr(fragment, "FRAGMENT_DIR", str(fragment_dir))
+    monkeypatch.setattr(fragment, "reindex_fragments", lambda root: scanned.append(root) or 0)
+    client = TestClient(app)
+
+    for root in ("../", "/etc", str(tmp_path)):
+        response = client.post("/fragment/catalog/reindex", json={"root": root})
+        assert response.status_code == 400
+        assert "outside" in response.json()["detail"]
+    assert scanned == []
+
+    assert client.post("/fragment/catalog/reindex", json={"root": "city"}).status_code == 200
+    assert client.post("/fragment/catalog/reindex", json={}).status_code == 200
+    assert scanned == [(fragment_dir / "city").resolve(), fragment_dir.resolve()]
@@ -0,0 +1,100 @@
+"""Multi-layer fragment GeoParquet: save, partial load, legacy files."""
+
+import json
+
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from shapely.geometry import LineString, box  # noqa: E402
+
+from collage_backend.services import fragment_catalog  # noqa: E402
+from collage_backend.services.fragment_ops import load_fragment, save_fragment  # noqa: E402
+from collage_backend.utils.io import decode_layers, encode_layers  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def catalog(tmp_path, monkeypatch):
+    """Keep save_fragment's catalog entries out of the real data dir."""
+    catalog = fragment_catalog.FragmentCatalog(tmp_path / "catalog.sqlite")
+    monkeypatch.setattr(fragment_catalog, "_catalog", catalog)
+    return catalog
+
+
+def _fragment():
+    buildings = gpd.GeoDataFrame(
+        {"id": ["a", "b"], "height_m": [6.0, 12.0], "use": ["house", "office"]},
+        geometry=[box(0.0, 0.0, 0.001, 0.001), box(0.01, 0.01, 0.011, 0.011)],
+        crs="EPSG:4326",
+    )
+    streets = gpd.GeoDataFrame(
+        {"id": ["s"], "highway": ["residential"]},
+        geometry=[LineString([(0.0, -0.001), (0.011, -0.001)])],
+        crs="EPSG:4326",
+    )
+    return {
+        "metadata": {"name": "test"},
+        "buildings": buildings,
+        "streets": streets,
+        "metrics": {"building_count": 2},
+    }
+
+
+def test_round_trip_all_layers(tmp_path):
+    path = save_fragment(_fragment(), tmp_path / "f.parquet")
+    loaded = load_fragment(path)
+
+    assert loaded["metadata"] == {"name": "test"}
+    assert loaded["metrics"] == {"building_count": 2}
+    assert sorted(loaded["buildings"]["id"]) == ["a", "b"]
+    assert list(loaded["streets"]["highway"]) == ["residential"]
+    # Columns of other layers are not smeared across
+    assert "highway" not in loaded["buildings"].columns
+    assert loaded["tessellation"] is None
+
+    geo = json.loads(pq.read_schema(path).metadata[b"geo"])
+    assert geo["columns"]["geometry"]["covering"]["bbox"]["xmin"] == ["bbox", "xmin"]
+
+
+def test_all_null_layer_column_is_kept(tmp_path):
+    fragment = _fragment()
+    fragment["buildings"]["name"] = None
+    loaded = load_fragment(save_fragment(fragment, tmp_path / "f.parquet"))
+
+    assert loaded["buildings"]["name"].isna().all()
+    assert "name" not in loaded["streets"].columns
+
+
+def test_load_subset(tmp_path):
+    path = save_fragment(_fragment(), tmp_path / "f.parquet")
+    loaded = load_fragment(
+        path, layers=["buildings"], columns=["height_m"], bbox=(0.005, 0.005, 0.02, 0.02)
+    )
+
+    assert loaded["streets"] is None
+    assert list(loaded["buildings"].columns) == ["height_m", "geometry"]
+    assert list(loaded["buildings"]["height_m"]) == [12.0]
+
+
+def test_undecoded_tables_pass_through(tmp_path):
+    path = save_fragment(_fragment(), tmp_path / "f.parquet")
+    loaded = load_fragment(path, layers=["buildings"], decode=False)
+
+    table = loaded["buildings"]
+    assert isinstance(table, pa.Table)
+    assert table.num_rows == 2
+    layers, _ = decode_layers(encode_layers({"buildings": table}))
+    assert sorted(layers["buildings"]["id"]) == ["a", "b"]
+    assert layers["buildings"].geometry.geom_type.tolist() == ["Polygon", "Polygon"]
+
+
+def test_legacy_buildings_file(tmp_path):
+    path = tmp_path / "old.parquet"
+    _fragment()["buildings"].to_parquet(path)
+    path.with_suffix(".meta.json").write_text(json.dumps({"name": "old"}))
+
+    loaded = load_fragment(path, bbox=(-1, -1, 0.005, 0.005))
+    assert loaded["metadata"] == {"name": "old"}
+    assert list(loaded["buildings"]["id"]) == ["a"]
@@ -0,0 +1,68 @@
+"""GMM registry: fit on saved fragments, persist, predict across fragments."""
+
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+pytest.importorskip("sklearn")
+
+import numpy as np  # noqa: E402
+from shapely.geometry import box  # noqa: E402
+
+from collage_backend.services import gmm_registry  # noqa: E402
+from collage_backend.services.gmm_registry import GMMRegistry, gmm_features  # noqa: E402
+
+
+def _fragment(offset: float) -> gpd.GeoDataFrame:
+    # Small houses and large blocks, in EPSG:3857 so no projection is needed
+    small = [box(x, offset, x + 8, offset + 8) for x in range(0, 400, 20)]
+    large = [box(x, offset + 100, x + 40, offset + 140) for x in range(0, 1000, 50)]
+    return gpd.GeoDataFrame(
+        {"id": [f"b{i}" for i in range(40)], "height_m": [6.0] * 20 + [24.0] * 20},
+        geometry=small + large,
+        crs="EPSG:3857",
+    )
+
+
+def test_fit_persist_and_reload(tmp_path):
+    paths = []
+    for i in range(2):
+        path = tmp_path / "fragments" / f"f{i}.parquet"
+        path.parent.mkdir(exist_ok=True)
+        _fragment(i * 1000).to_parquet(path)
+        paths.append(str(path))
+
+    registry = GMMRegistry(tmp_path / "models")
+    model = registry.fit(2, paths)
+    assert (tmp_path / "models" / "k2.joblib").exists()
+
+    # A fresh registry (new process) loads the same model from disk
+    reloaded = GMMRegistry(tmp_path / "models").get(2)
+    assert reloaded.version == model.version
+
+    features = gmm_features(_fragment(5000))
+    labels, probability = reloaded.predict(features)
+    # Same building type → same cluster id, whichever fragment it is in
+    assert len(set(labels[:20])) == 1 and len(set(labels[20:])) == 1
+    assert labels[0] != labels[20]
+    assert (probability > 0.5).all()
+
+    refit = registry.fit(2, paths, warm_start=True)
+    assert refit.warm_started
+    assert (refit.predict(features)[0] == labels).all()
+
+
+def test_features_default_missing_and_zero_heights():
+    buildings = _fragment(0).iloc[:3].assign(height_m=[None, 0.0, 12.0])
+    height = gmm_features(buildings)[:, 2]
+    np.testing.assert_allclose(height, [gmm_registry.DEFAULT_HEIGHT_M] * 2 + [12.0])
+
+
+def test_submit_fit_rejects_paths_outside_fragment_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(gmm_registry, "FRAGMENT_DIR", str(tmp_path / "fragments"))
+    registry = GMMRegistry(tmp_path / "models")
+    try:
+        for path in ("../models/k2.joblib", str(tmp_path / "other.parquet")):
+            with pytest.raises(ValueError, match="outside"):
+                registry.submit_fit(2, [path])
+    finally:
+        registry.shutdown()
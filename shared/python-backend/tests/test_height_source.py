@@ -0,0 +1,54 @@
+"""Local height dataset tier: partition index, largest-overlap join."""
+
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+pytest.importorskip("scipy")
+
+from shapely.geometry import box  # noqa: E402
+
+from collage_backend.services import height_source  # noqa: E402
+from collage_backend.services.height_cascade import enrich_heights  # noqa: E402
+
+
+@pytest.fixture
+def region(tmp_path, monkeypatch):
+    monkeypatch.setattr(height_source, "HEIGHT_DATA_DIR", tmp_path)
+    root = tmp_path / "testland" / "overture"
+    root.mkdir(parents=True)
+    # Two tiles; the second one lies far away and must not be read
+    gpd.GeoDataFrame(
+        {"height": [20.0, 35.0]},
+        geometry=[box(2.1600, 41.3800, 2.16030, 41.3803), box(2.16030, 41.3800, 2.1604, 41.3803)],
+        crs="EPSG:4326",
+    ).to_parquet(root / "tile_0.parquet")
+    gpd.GeoDataFrame(
+        {"height": [99.0]}, geometry=[box(10.0, 50.0, 10.001, 50.001)], crs="EPSG:4326"
+    ).to_parquet(root / "tile_1.parquet")
+    return "testland"
+
+
+def test_largest_overlap_wins(region):
+    buildings = gpd.GeoDataFrame(
+        {
+            "height_m": [9.0, 9.0],
+            "height_source": ["type_default", "type_default"],
+            "use": ["yes", "yes"],
+        },
+        # First building mostly over the 20 m footprint; second outside any footprint
+        geometry=[box(2.1601, 41.3800, 2.16035, 41.3803), box(2.1700, 41.39, 2.1701, 41.3901)],
+        crs="EPSG:4326",
+    )
+    enriched = enrich_heights(buildings, region=region)
+
+    assert enriched["height_m"].iloc[0] == pytest.approx(20.0)
+    assert enriched["height_source"].iloc[0] == "overture"
+    assert enriched["height_source"].iloc[1] == "type_default"
+
+
+def test_partition_index_and_missing_region(region):
+    (dataset,) = height_source.region_datasets(region)
+    assert len(dataset.partitions()) == 2
+    assert height_source.region_datasets("nowhere") == []
+    with pytest.raises(ValueError):
+        height_source.region_datasets("../etc")
@@ -0,0 +1,67 @@
+"""Height tag parsing and the kNN tier of the height cascade."""
+
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+pytest.importorskip("osmnx")
+pytest.importorskip("scipy")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from shapely.geometry import box  # noqa: E402
+
+from collage_backend.services.extraction import parse_heights, parse_levels  # noqa: E402
+from collage_backend.services.height_cascade import enrich_heights  # noqa: E402
+
+
+def test_parse_heights_units_ranges_and_lists():
+    values = pd.Series(["12", "12,5 m", "40 ft", "10'6\"", "12-15", "8;20", "tall", None, 3.0])
+    expected = [12.0, 12.5, 12.192, 3.2004, 13.5, 20.0, np.nan, np.nan, 3.0]
+    np.testing.assert_allclose(parse_heights(values).to_numpy(), expected, atol=1e-4)
+
+
+def test_parse_levels():
+    values = pd.Series(["3", "2-4", "5;6", "0", "many"], index=[10, 11, 12, 13, 14])
+    parsed = parse_levels(values)
+    assert list(parsed.index) == [10, 11, 12, 13, 14]
+    np.testing.assert_allclose(parsed.to_numpy(), [3.0, 3.0, 6.0, np.nan, np.nan])
+
+
+def test_knn_imputes_from_same_use_neighbours():
+    # Row of buildings 20 m apart (EPSG:3857); only the untagged ones get imputed
+    buildings = gpd.GeoDataFrame(
+        {
+            "height_m": [30.0, 30.0, 9.0, 6.0, 9.0],
+            "height_source": ["osm_tag", "osm_tag", "type_default", "osm_tag", "type_default"],
+            "floor_count": [10, 10, 3, 2, 3],
+            "use": ["apartments", "apartments", "apartments", "house", "church"],
+        },
+        geometry=[box(x, 0, x + 10, 10) for x in range(0, 100, 20)],
+        crs="EPSG:3857",
+    )
+    enriched = enrich_heights(buildings)
+
+    assert enriched["height_m"].iloc[2] == pytest.approx(30.0)
+    assert enriched["height_source"].iloc[2] == "knn_imputed"
+    # No tagged church nearby: the default stays
+    assert enriched["height_source"].iloc[4] == "type_default"
+    assert enriched["height_m"].iloc[3] == 6.0
+
+
+def test_heights_from_other_sources_are_kept():
+    buildings = gpd.GeoDataFrame(
+        {
+            "height_m": [30.0, 12.0, np.nan],
+            "height_source": ["gba", None, None],
+            "floor_count": [np.nan, np.nan, np.nan],
+            "use": ["yes", "yes", "yes"],
+        },
+        geometry=[box(x, 0, x + 10, 10) for x in (0, 1000, 2000)],
+        crs="EPSG:3857",
+    )
+    enriched = enrich_heights(buildings)
+
+    assert enriched["height_m"].tolist() == [30.0, 12.0, 9.0]
+    assert enriched["height_source"].iloc[0] == "gba"
+    assert pd.isna(enriched["height_source"].iloc[1])
+    assert enriched["height_source"].iloc[2] == "type_default"
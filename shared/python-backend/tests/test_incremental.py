@@ -0,0 +1,212 @@
+"""Incremental metric recomputation must match a full recompute."""
+
+import numpy as np
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+pytest.importorskip("momepy")
+
+from shapely.affinity import translate  # noqa: E402
+from shapely.geometry import LineString, box  # noqa: E402
+
+from collage_backend.services.incremental import CELL, FACING, SELF, dirty_inputs  # noqa: E402
+from collage_backend.services.morphometrics import compute_all_metrics  # noqa: E402
+from collage_backend.services.sustainability import (  # noqa: E402
+    RAY_FACING_DISTANCE_M,
+    compute_sustainability_metrics,
+)
+
+CRS = "EPSG:3857"
+
+
+@pytest.fixture
+def layers():
+    buildings = gpd.GeoDataFrame(
+        {"id": [f"b{i}" for i in range(6)], "height_m": [9.0, 12.0, 15.0, 6.0, 21.0, 9.0]},
+        geometry=[box(x, 5, x + 10, 15) for x in range(0, 60, 20)]
+        + [box(x, -15, x + 10, -5) for x in range(0, 60, 20)],
+        crs=CRS,
+    )
+    streets = gpd.GeoDataFrame({"id": ["s0"]}, geometry=[LineString([(-10, 0), (70, 0)])], crs=CRS)
+    return buildings, streets, gpd.GeoDataFrame(geometry=[], crs=CRS)
+
+
+@pytest.mark.parametrize("canyon_method", ["nearest", "rays"])
+def test_incremental_matches_full(layers, canyon_method):
+    buildings, streets, tess = layers
+    previous = compute_sustainability_metrics(buildings, streets, tess, canyon_method)
+
+    edited = buildings.copy()
+    edited.loc[1, "geometry"] = translate(edited.geometry[1], yoff=4)
+    edited.loc[4, "height_m"] = 30.0
+
+    full = compute_sustainability_metrics(edited, streets, tess, canyon_method)
+    incremental = compute_sustainability_metrics(
+        edited, streets, tess, canyon_method, previous=previous, changed_ids=["b1", "b4"],
+        previous_buildings=buildings,
+    )
+
+    assert incremental["per_building"].keys() == full["per_building"].keys()
+    for bid, expected in full["per_building"].items():
+        assert incremental["per_building"][bid] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("with_previous_buildings", [True, False])
+def test_incremental_rays_after_removal(layers, with_previous_buildings):
+    # Removing b4 widens the canyons of its neighbours across the street
+    buildings, streets, tess = layers
+    previous = compute_sustainability_metrics(buildings, streets, tess, "rays")
+    edited = buildings[buildings["id"] != "b4"]
+
+    full = compute_sustainability_metrics(edited, streets, tess, "rays")
+    incremental = compute_sustainability_metrics(
+        edited, streets, tess, "rays", previous=previous, changed_ids=[],
+        previous_buildings=buildings if with_previous_buildings else None,
+    )
+
+    assert full["per_building"]["b1"] != previous["per_building"]["b1"]
+    assert incremental["per_building"].keys() == full["per_building"].keys()
+    for bid, expected in full["per_building"].items():
+        assert incremental["per_building"][bid] == pytest.approx(expected)
+
+
+def test_metrics_missing_from_previous_are_recomputed(layers):
+    buildings, streets, tess = layers
+    previous = compute_sustainability_metrics(buildings, streets, tess)
+    for row in previous["per_building"].values():
+        del row["svf_proxy"]
+
+    result = compute_sustainability_metrics(
+        buildings, streets, tess, previous=previous, changed_ids=["b0"]
+    )
+    full = compute_sustainability_metrics(buildings, streets, tess)
+    for bid, expected in full["per_building"].items():
+        assert result["per_building"][bid] == pytest.approx(expected)
+
+
+@pytest.fixture
+def tessellated_edit(grid_layers):
+    """Buildings and tessellation before and after moving b5-1 10 m north."""
+    from collage_backend.services.tessellation import compute_tessellation
+
+    buildings, streets = grid_layers
+    edited = buildings.copy()
+    moved = edited["id"] == "b5-1"
+    edited.loc[moved, "geometry"] = edited.loc[moved].geometry.translate(0, 10)
+    before = compute_tessellation(buildings, streets, n_jobs=1)
+    after = compute_tessellation(edited, streets, n_jobs=1)
+    return buildings, edited, streets, before, after
+
+
+def _cell_area(buildings, tess):
+    return buildings["id"].map(tess.groupby("building_id")["area_m2"].sum()).to_numpy()
+
+
+def test_masks_follow_the_real_tessellation(tessellated_edit):
+    buildings, edited, _, before, after = tessellated_edit
+    masks = dirty_inputs(
+        edited, ["b5-1"], np.ones(len(edited), dtype=bool),
+        cell_area=_cell_area(edited, after),
+        previous_cell_area=_cell_area(buildings, before),
+        facing_distance=RAY_FACING_DISTANCE_M,
+        previous_footprints=buildings.geometry[buildings["id"] == "b5-1"],
+    )
+    ids = edited["id"].to_numpy()
+
+    assert list(ids[masks[SELF]]) == ["b5-1"]
+    # Only cells of the edited block's enclosure change
+    cell_dirty = set(ids[masks[CELL]])
+    assert "b5-1" in cell_dirty and len(cell_dirty) > 1
+    assert all(bid.startswith("b5-") for bid in cell_dirty)
+    # FACING: everything within twice the ray length of the old or new footprint
+    old = buildings.geometry[buildings["id"] == "b5-1"].iloc[0]
+    new = edited.geometry[edited["id"] == "b5-1"].iloc[0]
+    expected = (
+        (edited.geometry.distance(old) <= RAY_FACING_DISTANCE_M)
+        | (edited.geometry.distance(new) <= RAY_FACING_DISTANCE_M)
+    ).to_numpy()
+    assert (masks[FACING] == expected).all()
+    assert not masks[FACING].all()
+
+
+@pytest.mark.parametrize("output_format", ["nested", "columnar"])
+def test_incremental_morphometrics_match_full(tessellated_edit, output_format):
+    buildings, edited, streets, before, after = tessellated_edit
+    previous = compute_all_metrics(buildings, streets, before, output_format=output_format)
+
+    full = compute_all_metrics(edited, streets, after, output_format=output_format)
+    incremental = compute_all_metrics(
+        edited, streets, after, output_format=output_format,
+        previous=previous, changed_ids=["b5-1"],
+    )
+
+    if output_format == "columnar":
+        assert incremental["ids"] == full["ids"]
+        assert incremental["columns"].keys() == full["columns"].keys()
+        for key, values in full["columns"].items():
+            np.testing.assert_allclose(
+                np.array(incremental["columns"][key], dtype=float),
+                np.array(values, dtype=float),
+                rtol=1e-9,
+            )
+    else:
+        for bid, expected in full["per_building"].items():
+            assert incremental["per_building"][bid] == pytest.approx(expected, rel=1e-9)
+    assert incremental["aggregates"] == pytest.approx(full["aggregates"], rel=1e-9)
+
+
+def test_incremental_sustainability_with_real_cells(tessellated_edit):
+    buildings, edited, streets, before, after = tessellated_edit
+    previous = compute_sustainability_metrics(buildings, streets, before, "rays")
+
+    full = compute_sustainability_metrics(edited, streets, after, "rays")
+    incremental = compute_sustainability_metrics(
+        edited, streets, after, "rays", previous=previous, changed_ids=["b5-1"],
+        previous_buildings=buildings,
+    )
+    for bid, expected in full["per_building"].items():
+        assert incremental["per_building"][bid] == pytest.approx(expected, rel=1e-9)
+
+
+def test_incremental_sustainability_after_removal_with_real_cells(grid_layers):
+    from collage_backend.services.tessellation import compute_tessellation
+
+    buildings, streets = grid_layers
+    edited = buildings[buildings["id"] != "b5-1"].reset_index(drop=True)
+    before = compute_tessellation(buildings, streets, n_jobs=1)
+    after = compute_tessellation(edited, streets, n_jobs=1)
+    previous = compute_sustainability_metrics(buildings, streets, before, "rays")
+
+    full = compute_sustainability_metrics(edited, streets, after, "rays")
+    incremental = compute_sustainability_metrics(
+        edited, streets, after, "rays", previous=previous, changed_ids=[],
+        previous_buildings=buildings,
+    )
+    assert incremental["per_building"].keys() == full["per_building"].keys()
+    for bid, expected in full["per_building"].items():
+        assert incremental["per_building"][bid] == pytest.approx(expected, rel=1e-9)
+
+
+def test_incremental_rays_reach_across_a_wide_canyon():
+    # A is 120 m from B's new footprint: more than one ray length, less than two
+    buildings = gpd.GeoDataFrame(
+        {"id": ["a", "b"], "height_m": [9.0, 9.0]},
+        geometry=[box(0, 90, 40, 100), box(0, -70, 40, -60)],
+        crs=CRS,
+    )
+    streets = gpd.GeoDataFrame({"id": ["s0"]}, geometry=[LineString([(-10, 0), (50, 0)])], crs=CRS)
+    tess = gpd.GeoDataFrame(geometry=[], crs=CRS)
+    previous = compute_sustainability_metrics(buildings, streets, tess, "rays")
+
+    edited = buildings.copy()
+    edited.loc[1, "geometry"] = translate(edited.geometry[1], yoff=30)
+    full = compute_sustainability_metrics(edited, streets, tess, "rays")
+    incremental = compute_sustainability_metrics(
+        edited, streets, tess, "rays", previous=previous, changed_ids=["b"],
+        previous_buildings=buildings,
+    )
+
+    assert previous["per_building"]["a"]["canyon_width_m"] == pytest.approx(150)
+    assert full["per_building"]["a"]["canyon_width_m"] == pytest.approx(120)
+    for bid, expected in full["per_building"].items():
+        assert incremental["per_building"][bid] == pytest.approx(expected)
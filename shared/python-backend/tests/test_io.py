@@ -0,0 +1,54 @@
+"""Tests for binary layer transport in utils/io.py."""
+
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+pytest.importorskip("pyarrow")
+
+from shapely.geometry import LineString, box  # noqa: E402
+
+from collage_backend.utils.io import decode_layers, encode_layers  # noqa: E402
+
+
+@pytest.fixture
+def layers():
+    buildings = gpd.GeoDataFrame(
+        {"id": ["a", "b"], "height_m": [9.0, 12.5]},
+        geometry=[box(2.16, 41.385, 2.161, 41.386), box(2.162, 41.385, 2.163, 41.386)],
+        crs="EPSG:4326",
+    )
+    streets = gpd.GeoDataFrame(
+        {"id": ["s1"], "highway": ["residential"]},
+        geometry=[LineString([(2.16, 41.384), (2.165, 41.384)])],
+        crs="EPSG:4326",
+    )
+    return {"buildings": buildings, "streets": streets}
+
+
+@pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+def test_layers_round_trip(layers, fmt):
+    data = encode_layers(layers, {"region": "europe"}, fmt=fmt)
+    decoded, meta = decode_layers(data, fmt=fmt)
+
+    assert meta == {"region": "europe"}
+    assert set(decoded) == {"buildings", "streets"}
+    assert list(decoded["buildings"]["id"]) == ["a", "b"]
+    assert "highway" not in decoded["buildings"].columns
+    assert decoded["streets"].geometry.iloc[0].equals(layers["streets"].geometry.iloc[0])
+
+
+def test_geoarrow_encoding_round_trip(layers):
+    data = encode_layers(layers, fmt="arrow", geometry_encoding="geoarrow")
+    decoded, _ = decode_layers(data)
+
+    assert decoded["buildings"].geometry.iloc[1].equals(layers["buildings"].geometry.iloc[1])
+
+
+@pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+def test_all_null_columns_of_a_layer_survive(layers, fmt):
+    layers["buildings"]["name"] = None
+    decoded, _ = decode_layers(encode_layers(layers, fmt=fmt), fmt=fmt)
+
+    assert "name" in decoded["buildings"].columns
+    assert decoded["buildings"]["name"].isna().all()
+    assert "name" not in decoded["streets"].columns
@@ -0,0 +1,78 @@
+"""Extraction jobs: submit, per-stage progress, cancel, expiry."""
+
+import time
+
+import pytest
+
+pytest.importorskip("geopandas")
+pytest.importorskip("osmnx")
+
+from collage_backend.models.request import ExtractRequest
+from collage_backend.services.jobs import JobManager
+from collage_backend.services.pipeline import PIPELINE_STAGES
+
+REQ = ExtractRequest(bbox=(2.16, 41.385, 2.175, 41.395))
+
+
+def _quick_worker(req, conn):
+    for name in PIPELINE_STAGES:
+        conn.send(("stage", name))
+    conn.send(("result", {"bbox": list(req.bbox)}))
+    conn.close()
+
+
+def _stuck_worker(req, conn):
+    conn.send(("stage", PIPELINE_STAGES[0]))
+    time.sleep(60)
+
+
+def _wait(manager, job_id, predicate, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if predicate(job):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} stuck in {manager.get(job_id).status}")
+
+
+def test_submit_reports_progress_and_result():
+    manager = JobManager(max_workers=1, worker=_quick_worker)
+    job = manager.submit(REQ)
+    assert job.status in ("queued", "running")
+
+    job = _wait(manager, job.id, lambda j: j.finished)
+    assert job.status == "done"
+    assert job.result == {"bbox": list(REQ.bbox)}
+    status = job.to_dict()
+    assert status["progress"] == 1.0
+    assert all(stage["done"] for stage in status["stages"])
+
+
+def test_cancel_running_and_queued_jobs():
+    manager = JobManager(max_workers=1, worker=_stuck_worker)
+    running = manager.submit(REQ)
+    queued = manager.submit(REQ)
+    running = _wait(manager, running.id, lambda j: j.stages_done)
+    assert running.to_dict()["current_stage"] == PIPELINE_STAGES[1]
+    assert manager.get(queued.id).status == "queued"
+
+    assert manager.cancel(queued.id).status == "cancelled"
+    assert manager.cancel(running.id).status == "cancelled"
+    running.process.join(timeout=10)
+    assert not running.process.is_alive()
+    # The terminated worker's EOF does not overwrite the cancellation
+    time.sleep(0.2)
+    assert manager.get(running.id).status == "cancelled"
+    assert manager.get(queued.id).process is None
+
+
+def test_finished_jobs_expire_after_ttl():
+    manager = JobManager(max_workers=1, ttl_s=0.0, worker=_quick_worker)
+    first = manager.submit(REQ)
+    _wait(manager, first.id, lambda j: j.finished)
+
+    second = manager.submit(REQ)
+    assert manager.get(first.id) is None
+    assert manager.get(second.id) is not None
+    assert manager.cancel("unknown") is None
@@ -0,0 +1,90 @@
+"""Local OSM extracts: path restriction, PBF street splitting, source cache."""
+
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+pyogrio = pytest.importorskip("pyogrio")
+
+from collage_backend.services import local_source  # noqa: E402
+from collage_backend.services.local_source import (  # noqa: E402
+    InvalidSourceError,
+    get_local_source,
+    read_pbf,
+    resolve_source,
+)
+
+# Two streets crossing at node 2, a proposed (dropped) way and one building
+OSM_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" version="1" lat="51.5000" lon="-0.1010"/>
+  <node id="2" version="1" lat="51.5000" lon="-0.1000"/>
+  <node id="3" version="1" lat="51.5000" lon="-0.0990"/>
+  <node id="4" version="1" lat="51.4990" lon="-0.1000"/>
+  <node id="5" version="1" lat="51.5010" lon="-0.1000"/>
+  <node id="6" version="1" lat="51.5010" lon="-0.0990"/>
+  <node id="10" version="1" lat="51.5002" lon="-0.0998"/>
+  <node id="11" version="1" lat="51.5002" lon="-0.0995"/>
+  <node id="12" version="1" lat="51.5005" lon="-0.0995"/>
+  <node id="13" version="1" lat="51.5005" lon="-0.0998"/>
+  <way id="100" version="1">
+    <nd ref="1"/><nd ref="2"/><nd ref="3"/>
+    <tag k="highway" v="residential"/><tag k="name" v="East Street"/><tag k="lanes" v="2"/>
+  </way>
+  <way id="101" version="1">
+    <nd ref="4"/><nd ref="2"/><nd ref="5"/><nd ref="6"/>
+    <tag k="highway" v="tertiary"/><tag k="name" v="North Street"/>
+  </way>
+  <way id="102" version="1">
+    <nd ref="3"/><nd ref="6"/><tag k="highway" v="proposed"/>
+  </way>
+  <way id="200" version="1">
+    <nd ref="10"/><nd ref="11"/><nd ref="12"/><nd ref="13"/><nd ref="10"/>
+    <tag k="building" v="yes"/><tag k="height" v="12"/>
+  </way>
+</osm>
+"""
+
+
+@pytest.fixture
+def osm_dir(tmp_path, monkeypatch):
+    (tmp_path / "city.osm").write_text(OSM_XML)
+    monkeypatch.setattr(local_source, "LOCAL_OSM_PATH", tmp_path)
+    return tmp_path
+
+
+def test_streets_are_split_at_shared_nodes(osm_dir):
+    buildings, streets = read_pbf(osm_dir / "city.osm")
+
+    assert list(buildings["height"]) == ["12"]
+    # Each way is cut at node 2; node 5 is only on one way, the proposed way is dropped
+    assert sorted(streets["name"]) == ["East Street"] * 2 + ["North Street"] * 2
+    assert sorted(len(g.coords) for g in streets.geometry) == [2, 2, 2, 3]
+    assert set(streets.loc[streets["name"] == "East Street", "lanes"]) == {"2"}
+    assert streets.crs.equals("EPSG:4326")
+
+
+def test_source_path_must_stay_under_local_osm_path(osm_dir, tmp_path_factory):
+    assert resolve_source("local", "city.osm") == ("local", str(osm_dir / "city.osm"))
+    assert resolve_source("local", None) == ("local", str(osm_dir))
+
+    outside = tmp_path_factory.mktemp("elsewhere") / "other.osm"
+    for path in ("../etc/passwd", "/etc/passwd", str(outside)):
+        with pytest.raises(InvalidSourceError, match="outside"):
+            resolve_source("local", path)
+    with pytest.raises(InvalidSourceError):
+        resolve_source("carrier-pigeon", None)
+
+
+def test_local_sources_are_cached_and_bounded(osm_dir, monkeypatch):
+    monkeypatch.setattr(local_source._SOURCE_CACHE, "maxsize", 1)
+    local_source._SOURCE_CACHE.clear()
+    for name in ("a.osm", "b.osm"):
+        (osm_dir / name).write_text(OSM_XML)
+
+    first = get_local_source(osm_dir / "a.osm")
+    assert get_local_source(osm_dir / "a.osm") is first
+    assert len(first.buildings((-0.101, 51.499, -0.099, 51.501))) == 1
+
+    get_local_source(osm_dir / "b.osm")
+    assert local_source._SOURCE_CACHE.stats()["entries"] == 1
+    assert get_local_source(osm_dir / "a.osm") is not first
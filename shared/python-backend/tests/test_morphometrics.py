@@ -0,0 +1,44 @@
+"""Output shapes of compute_all_metrics."""
+
+import pytest
+
+pytest.importorskip("geopandas")
+pytest.importorskip("momepy")
+
+from collage_backend.services.morphometrics import compute_all_metrics
+from collage_backend.services.tessellation import compute_tessellation
+
+
+@pytest.fixture
+def metric_layers(grid_layers):
+    buildings, streets = grid_layers
+    return buildings, streets, compute_tessellation(buildings, streets, n_jobs=1)
+
+
+def test_columnar_output_shape(metric_layers):
+    result = compute_all_metrics(*metric_layers, output_format="columnar")
+
+    assert set(result) == {"format", "ids", "columns", "aggregates"}
+    assert result["format"] == "columnar"
+    assert result["ids"] == metric_layers[0]["id"].tolist()
+    assert "dim_area" in result["columns"]
+    for name, values in result["columns"].items():
+        assert len(values) == len(result["ids"]), name
+    assert result["aggregates"]["dim_area_mean"] > 0
+
+
+def test_columnar_matches_nested(metric_layers):
+    columnar = compute_all_metrics(*metric_layers, output_format="columnar")
+    nested = compute_all_metrics(*metric_layers)
+
+    assert nested["aggregates"] == columnar["aggregates"]
+    for i, bid in enumerate(columnar["ids"]):
+        row = {name: values[i] for name, values in columnar["columns"].items()}
+        assert nested["per_building"][bid] == row
+
+
+def test_columnar_output_for_no_buildings(metric_layers):
+    buildings, streets, tess = metric_layers
+    result = compute_all_metrics(buildings.iloc[:0], streets, tess, output_format="columnar")
+
+    assert result == {"format": "columnar", "ids": [], "columns": {}, "aggregates": {}}
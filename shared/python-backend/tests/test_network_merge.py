@@ -0,0 +1,48 @@
+"""Edge-split snapping in merge_networks."""
+
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+
+import numpy as np  # noqa: E402
+import shapely  # noqa: E402
+from shapely.geometry import LineString  # noqa: E402
+
+from collage_backend.services.fragment_ops import merge_networks  # noqa: E402
+from collage_backend.utils.geometry import split_lines_at  # noqa: E402
+
+CRS = "EPSG:3857"
+
+
+def test_split_lines_at_keeps_vertices():
+    line = LineString([(0, 0), (10, 0), (10, 10)])
+    pieces, piece_line, piece_part = split_lines_at(
+        np.array([line], dtype=object), np.array([0, 0]), np.array([5.0, 15.0])
+    )
+    assert [p.wkt for p in pieces] == [
+        "LINESTRING (0 0, 5 0)",
+        "LINESTRING (5 0, 10 0, 10 5)",
+        "LINESTRING (10 5, 10 10)",
+    ]
+    assert list(piece_line) == [0, 0, 0]
+    assert list(piece_part) == [0, 1, 2]
+
+
+def test_design_end_joins_context_mid_edge():
+    context = gpd.GeoDataFrame(
+        {"id": ["ctx"]}, geometry=[LineString([(0, 0), (100, 0)])], crs=CRS
+    )
+    # Design street ending 10 m short of the context street
+    design = gpd.GeoDataFrame(
+        {"id": ["des"]}, geometry=[LineString([(40, 60), (40, 10)])], crs=CRS
+    )
+    merged = merge_networks(design, context, snap_threshold_m=50)
+
+    assert sorted(merged["id"]) == ["ctx-0", "ctx-1", "des", "des-c0"]
+    assert set(merged["source"]) == {"design", "context", "connector"}
+    connector = merged.loc[merged["source"] == "connector"].geometry.iloc[0]
+    assert connector.length == pytest.approx(10)
+    # The split point is shared by both context pieces and the connector
+    assert shapely.unary_union(merged.geometry).is_valid
+    pieces = merged.loc[merged["source"] == "context"].geometry
+    assert {p.coords[-1] for p in pieces} & {p.coords[0] for p in pieces} == {(40.0, 0.0)}
@@ -0,0 +1,58 @@
+"""Batch relocation: every layer moves, shapes are preserved."""
+
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+
+import numpy as np  # noqa: E402
+from shapely.geometry import box  # noqa: E402
+
+from collage_backend.services.fragment_ops import (  # noqa: E402
+    relocate_fragment,
+    relocate_fragment_batch,
+)
+from collage_backend.utils.crs import ProjectionContext  # noqa: E402
+
+
+def _fragment():
+    buildings = gpd.GeoDataFrame(
+        {"id": ["a", "b"], "height_m": [6.0, 12.0]},
+        geometry=[box(2.160, 41.380, 2.1605, 41.3805), box(2.161, 41.380, 2.1615, 41.3805)],
+        crs="EPSG:4326",
+    )
+    tessellation = gpd.GeoDataFrame(
+        {"id": ["a", "b"]},
+        geometry=[box(2.1595, 41.3795, 2.1607, 41.381), box(2.1607, 41.3795, 2.162, 41.381)],
+        crs="EPSG:4326",
+    )
+    return {"metadata": {"name": "t"}, "buildings": buildings, "tessellation": tessellation}
+
+
+def _areas(gdf):
+    return ProjectionContext.for_layers(gdf).project(gdf).geometry.area.to_numpy()
+
+
+def test_batch_moves_all_layers_and_keeps_shape():
+    fragment = _fragment()
+    targets = [(-0.1276, 51.5072), (139.6917, 35.6895)]
+    results = list(relocate_fragment_batch(fragment, targets))
+
+    assert len(results) == 2
+    for (lng, lat), moved in zip(targets, results, strict=True):
+        assert list(moved["buildings"]["id"]) == ["a", "b"]
+        center = moved["buildings"].geometry.union_all().centroid
+        assert center.x == pytest.approx(lng, abs=1e-6)
+        assert center.y == pytest.approx(lat, abs=1e-6)
+        np.testing.assert_allclose(
+            _areas(moved["buildings"]), _areas(fragment["buildings"]), rtol=1e-3
+        )
+        assert moved["tessellation"].total_bounds[0] == pytest.approx(lng, abs=0.01)
+
+
+def test_single_relocate_matches_batch():
+    fragment = _fragment()
+    single = relocate_fragment(fragment, (-0.1276, 51.5072))
+    (batch,) = relocate_fragment_batch(fragment, [(-0.1276, 51.5072)])
+    assert single["buildings"].geometry.geom_equals_exact(
+        batch["buildings"].geometry, tolerance=1e-12
+    ).all()
@@ -0,0 +1,75 @@
+"""scipy csgraph fallback for angular NAIN/NACH."""
+
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+pytest.importorskip("scipy")
+
+from shapely.geometry import LineString  # noqa: E402
+
+from collage_backend.services.space_syntax import (  # noqa: E402
+    _build_cityseer_network,
+    _compute_cityseer,
+    _compute_csgraph,
+)
+
+
+def test_csgraph_choice_and_radius():
+    # Straight street of three segments plus a side street off the middle one
+    streets = gpd.GeoDataFrame(
+        {"id": ["a", "b", "c", "side"]},
+        geometry=[
+            LineString([(0, 0), (100, 0)]),
+            LineString([(100, 0), (200, 0)]),
+            LineString([(200, 0), (300, 0)]),
+            LineString([(200, 0), (200, 100)]),
+        ],
+        crs="EPSG:3857",
+    )
+    result = _compute_csgraph(streets, [150, 1000], n_jobs=1)
+    assert result["per_segment"]["ids"] == ["a", "b", "c", "side"]
+
+    columns = result["per_segment"]["columns"]
+    nach = dict(zip(result["per_segment"]["ids"], columns["nach_1000"], strict=True))
+    # Only the middle segment lies between others; end segments carry no choice
+    assert nach["b"] > 0
+    assert nach["a"] == 0
+
+    # Within 150 m 'a' reaches only 'b', so it is less integrated than globally
+    assert columns["nain_150"][0] != columns["nain_1000"][0]
+
+
+def _grid_streets(n: int = 15, step: float = 100.0) -> gpd.GeoDataFrame:
+    """Block-by-block segments of an n x n node grid plus one isolated street."""
+    lines = [
+        LineString([(i * step, j * step), ((i + 1) * step, j * step)])
+        for i in range(n - 1) for j in range(n)
+    ]
+    lines += [
+        LineString([(i * step, j * step), (i * step, (j + 1) * step)])
+        for i in range(n) for j in range(n - 1)
+    ]
+    # Far from the grid, so network cleaning drops it as a disconnected component
+    lines.append(LineString([(5000, 5000), (5050, 5000)]))
+    return gpd.GeoDataFrame(
+        {"id": [f"s{i}" for i in range(len(lines) - 1)] + ["isolated"]},
+        geometry=lines,
+        crs="EPSG:3857",
+    )
+
+
+def test_cityseer_per_segment_alignment():
+    pytest.importorskip("cityseer")
+    streets = _grid_streets()
+
+    _, _, segment_node = _build_cityseer_network(streets)
+    assert len(segment_node) == 421
+    assert (segment_node[:420] >= 0).all()
+    assert segment_node[420] == -1
+
+    result = _compute_cityseer(streets, [400, 10000])
+    assert result["per_segment"]["ids"] == streets["id"].tolist()
+    for name, values in result["per_segment"]["columns"].items():
+        assert len(values) == 421, name
+        assert values[420] is None, name
+        assert all(v is not None for v in values[:420]), name
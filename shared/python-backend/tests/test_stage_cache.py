@@ -0,0 +1,205 @@
+"""On-disk stage cache: get/put, eviction, partial-overlap reuse and endpoints."""
+
+import os
+import time
+
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+pytest.importorskip("pyarrow")
+
+from shapely.geometry import box  # noqa: E402
+
+from collage_backend.services import stage_cache  # noqa: E402
+from collage_backend.services.stage_cache import StageCache  # noqa: E402
+from collage_backend.utils.geometry import bbox_difference  # noqa: E402
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return StageCache(tmp_path / "cache", max_bytes=10**9, max_age_s=3600)
+
+
+@pytest.fixture
+def world():
+    """Small squares every 0.002° over [0, 0.02]², standing in for OSM buildings."""
+    steps = [i * 0.002 for i in range(10)]
+    squares = [box(x, y, x + 0.001, y + 0.001) for x in steps for y in steps]
+    return gpd.GeoDataFrame(
+        {"id": [f"w{i}" for i in range(len(squares))]}, geometry=squares, crs="EPSG:4326"
+    )
+
+
+def _fetcher(world, calls):
+    def fetch(part):
+        calls.append(part)
+        found = world[world.intersects(box(*part))].copy()
+        # Every extraction hands out fresh ids, as extract_buildings does
+        found["id"] = [f"fetched-{len(calls)}-{i}" for i in range(len(found))]
+        return found.reset_index(drop=True)
+    return fetch
+
+
+def test_put_get_round_trip(cache, world):
+    key = cache.key("buildings", bbox=[0, 0, 1, 1])
+    assert cache.get("buildings", key) is None
+
+    cache.put("buildings", key, world)
+    cache.put("metrics", key, {"building_count": 100})
+
+    assert cache.get("buildings", key)["id"].tolist() == world["id"].tolist()
+    assert cache.get("metrics", key) == {"building_count": 100}
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["hits"] == {"buildings": 1, "metrics": 1}
+    assert stats["misses"] == {"buildings": 1}
+
+
+def test_key_depends_on_inputs(cache):
+    assert cache.key("streets", simplify=True) == cache.key("streets", simplify=True)
+    assert cache.key("streets", simplify=True) != cache.key("streets", simplify=False)
+    assert cache.key("streets", simplify=True) != cache.key("buildings", simplify=True)
+
+
+def test_expired_entries_are_dropped(cache):
+    cache.put("metrics", "k", {"a": 1})
+    path = cache.root / "metrics" / "k.json"
+    created = time.time() - 2 * cache.max_age_s
+    os.utime(path, (created, created))
+
+    assert cache.get("metrics", "k") is None
+    assert not path.exists()
+
+
+def test_evicts_least_recently_used_beyond_max_bytes(cache):
+    for i, key in enumerate(["old", "mid", "new"]):
+        cache.put("metrics", key, {"values": list(range(100))})
+        path = cache.root / "metrics" / f"{key}.json"
+        os.utime(path, (time.time() - 100 + i, path.stat().st_mtime))
+    cache.max_bytes = 2 * path.stat().st_size
+
+    assert cache.evict() == 1
+    assert cache.get("metrics", "old") is None
+    assert cache.get("metrics", "mid") is not None
+
+
+def test_clear_removes_everything(cache, world):
+    cache.put("buildings", "a", world)
+    cache.put("metrics", "b", {"a": 1})
+
+    assert cache.clear() == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_bbox_difference():
+    assert bbox_difference((0, 0, 4, 4), (5, 5, 6, 6)) == [(0, 0, 4, 4)]
+    assert bbox_difference((0, 0, 4, 4), (-1, -1, 5, 5)) == []
+    assert bbox_difference((0, 0, 4, 4), (2, -1, 5, 5)) == [(0, 0, 2, 4)]
+    parts = bbox_difference((0, 0, 4, 4), (1, 1, 3, 3))
+    assert sum((e - w) * (n - s) for w, s, e, n in parts) == 16 - 4
+
+
+def test_compose_area_fetches_only_uncovered_parts(cache, world):
+    scope = cache.key("buildings", source="test")
+    calls = []
+    fetch = _fetcher(world, calls)
+
+    first = (0.0, 0.0, 0.0105, 0.0105)
+    cached = fetch(first)
+    cache.put("buildings", cache.area_key(scope, first), cached)
+    calls.clear()
+
+    # Overlaps the cached area on its west half
+    second = (0.005, 0.0, 0.0155, 0.0105)
+    result = cache.compose_area("buildings", scope, second, fetch)
+
+    assert calls == [(0.0105, 0.0, 0.0155, 0.0105)]
+    expected = world[world.intersects(box(*second))]
+    assert sorted(result.geometry.to_wkt()) == sorted(expected.geometry.to_wkt())
+    # Features the cached area already had keep their ids
+    kept = result[result.intersects(box(*first))]
+    assert set(kept["id"]) <= set(cached["id"])
+    assert cache.stats()["partial_hits"] == {"buildings": 1}
+
+
+def test_compose_area_inside_a_cached_area_fetches_nothing(cache, world):
+    scope = cache.key("buildings", source="test")
+    full = (0.0, 0.0, 0.02, 0.02)
+    cache.put("buildings", cache.area_key(scope, full), world)
+
+    inner = (0.004, 0.004, 0.0085, 0.0085)
+    result = cache.compose_area("buildings", scope, inner, _fetcher(world, calls := []))
+
+    assert calls == []
+    assert set(result["id"]) == set(world[world.intersects(box(*inner))]["id"])
+
+
+def test_compose_area_ignores_other_scopes(cache, world):
+    extent = (0.0, 0.0, 0.01, 0.01)
+    cache.put("buildings", cache.area_key(cache.key("buildings", source="a"), extent), world)
+
+    calls = []
+    cache.compose_area(
+        "buildings", cache.key("buildings", source="b"), extent, _fetcher(world, calls)
+    )
+    assert calls == [extent]
+
+
+def test_cache_endpoints(tmp_path, world, monkeypatch):
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from collage_backend.main import app
+
+    cache = StageCache(tmp_path / "cache", max_bytes=10**9, max_age_s=3600)
+    monkeypatch.setattr(stage_cache, "_cache", cache)
+    cache.put("buildings", "k", world)
+    cache.get("buildings", "k")
+
+    client = TestClient(app)
+    stats = client.get("/extract/cache").json()
+    assert stats["entries"] == 1
+    assert stats["hits"] == {"buildings": 1}
+    assert stats["path"] == str(cache.root)
+
+    assert client.delete("/extract/cache").json() == {"status": "ok", "removed": 1}
+    assert client.get("/extract/cache").json()["entries"] == 0
+
+
+def test_pipeline_reuses_overlapping_buildings(tmp_path, world, monkeypatch):
+    from collage_backend.models.request import ExtractRequest
+    from collage_backend.services import pipeline
+
+    monkeypatch.setattr(
+        stage_cache, "_cache", StageCache(tmp_path / "cache", max_bytes=10**9, max_age_s=3600)
+    )
+    building_calls, street_calls = [], []
+    fetch = _fetcher(world, building_calls)
+    monkeypatch.setattr(
+        pipeline, "extract_buildings", lambda bbox, buffer_m, **_: fetch(bbox)
+    )
+
+    def extract_streets(bbox, buffer_m, simplify, **_):
+        street_calls.append(simplify)
+        return gpd.GeoDataFrame({"id": []}, geometry=[], crs="EPSG:4326")
+
+    monkeypatch.setattr(pipeline, "extract_streets", extract_streets)
+
+    def run(bbox, **options):
+        req = ExtractRequest(
+            bbox=bbox, buffer_m=0, include_heights=False, include_tessellation=False,
+            include_metrics=False, **options,
+        )
+        return dict(pipeline.iter_extract_stages(req))
+
+    run((0.0, 0.0, 0.01, 0.01))
+    second = run((0.005, 0.0, 0.015, 0.01))
+
+    assert building_calls == [(0.0, 0.0, 0.01, 0.01), (0.01, 0.0, 0.015, 0.01)]
+    expected = world[world.intersects(box(0.005, 0.0, 0.015, 0.01))]
+    assert len(second["buildings"]) == len(expected)
+
+    # Streets are keyed by the simplify option the request asked for
+    run((0.0, 0.0, 0.01, 0.01))
+    run((0.0, 0.0, 0.01, 0.01), simplify_streets=False)
+    assert street_calls == [True, True, False]
@@ -0,0 +1,46 @@
+"""Cached street graph and multi-origin isochrones."""
+
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+pytest.importorskip("scipy")
+
+from shapely.geometry import LineString  # noqa: E402
+
+from collage_backend.services.street_graph import compute_isochrones, get_street_graph  # noqa: E402
+
+
+@pytest.fixture
+def streets():
+    # A ~330 m straight street in three segments plus a far-away stub
+    x = [2.170, 2.1713, 2.1726, 2.1739]
+    lines = [LineString([(x[i], 41.39), (x[i + 1], 41.39)]) for i in range(3)]
+    lines.append(LineString([(2.20, 41.42), (2.201, 41.42)]))
+    return gpd.GeoDataFrame({"id": list("abcd")}, geometry=lines, crs="EPSG:4326")
+
+
+def test_graph_is_cached(streets):
+    assert get_street_graph(streets) is get_street_graph(streets.copy())
+
+
+@pytest.mark.parametrize("shape", ["edges", "concave", "convex"])
+def test_isochrones_per_origin_and_band(streets, shape):
+    result = compute_isochrones(streets, [(2.170, 41.39), (2.1739, 41.39)], [50, 500], shape=shape)
+    assert list(result["origin"]) == [0, 0, 1, 1]
+    assert list(result["band_m"]) == [50, 500, 50, 500]
+
+    near, far = result.iloc[0], result.iloc[1]
+    assert near["reachable_length_m"] == pytest.approx(50, rel=1e-3)
+    # The whole connected street (~330 m) but not the detached stub
+    assert 300 < far["reachable_length_m"] < 500
+    assert far.geometry.length > near.geometry.length
+
+
+def test_edge_buffer_stays_close_to_exact(streets):
+    result = compute_isochrones(streets, [(2.170, 41.39)], [500], shape="edges", buffer_m=25)
+    crs = result.estimate_utm_crs()
+    street = streets.iloc[:3].to_crs(crs).union_all()
+
+    # Coarse round caps trade a little area for a much cheaper buffer
+    exact = street.buffer(25).area
+    assert result.to_crs(crs).area.iloc[0] == pytest.approx(exact, rel=0.02)
@@ -0,0 +1,37 @@
+"""Synthetic benchmark cities must tessellate like real extracts."""
+
+import math
+
+import pytest
+
+pytest.importorskip("geopandas")
+momepy = pytest.importorskip("momepy")
+
+from benchmarks.synthetic import BUILDINGS_PER_SIDE, grid_city  # noqa: E402
+
+from collage_backend.services.tessellation import compute_tessellation  # noqa: E402
+from collage_backend.utils.crs import ProjectionContext  # noqa: E402
+
+
+def _blocks(n_buildings: int) -> int:
+    return math.ceil(math.sqrt(math.ceil(n_buildings / BUILDINGS_PER_SIDE**2))) ** 2
+
+
+@pytest.mark.parametrize("n_buildings", [100, 500, 2000])
+def test_grid_city_has_one_enclosure_per_block(n_buildings):
+    buildings, streets = grid_city(n_buildings)
+    # Same WGS84 → local projection round trip the services apply
+    ctx = ProjectionContext.for_layers(buildings)
+    enclosures = momepy.enclosures(ctx.project(streets))
+
+    assert len(enclosures) == _blocks(n_buildings)
+
+
+def test_grid_city_tessellates():
+    buildings, streets = grid_city(100)
+    tess = compute_tessellation(buildings, streets, n_jobs=1)
+
+    assert set(tess["building_id"].dropna()) == set(buildings["id"])
+    assert tess["building_id"].dropna().is_unique
+    assert (tess.geom_type == "Polygon").all()
+    assert tess["enclosure_id"].nunique() == _blocks(100)
@@ -1,6 +1,86 @@
-"""Tests for tessellation service. Stub — task #90 adds real tests."""
+"""Tests for tessellation service."""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("geopandas")
+pytest.importorskip("momepy")
+
+from collage_backend.services import tessellation
+from collage_backend.services.tessellation import compute_tessellation, update_tessellation
+from collage_backend.utils.io import gdf_to_geojson
 
 
 def test_placeholder():
     """Placeholder test to verify test infrastructure works."""
     assert True
+
+
+def test_tiled_matches_single_pass(grid_layers, monkeypatch):
+    buildings, streets = grid_layers
+    single = compute_tessellation(buildings, streets, n_jobs=1, tiled=False)
+
+    # Tile far below the default threshold: 16 blocks in tiles of ~10 buildings
+    monkeypatch.setattr(tessellation, "TESSELLATION_TILE_THRESHOLD", 10)
+    monkeypatch.setattr(tessellation, "TESSELLATION_TILE_BUILDINGS", 10)
+    tiled = compute_tessellation(buildings, streets, n_jobs=2)
+
+    assert len(single) == len(buildings)
+    assert list(tiled["id"]) == list(single["id"])
+    assert list(tiled["building_id"]) == list(single["building_id"])
+    np.testing.assert_allclose(tiled["area_m2"], single["area_m2"], rtol=1e-9)
+
+
+def _edit(buildings):
+    """Remove one building and move its neighbour 10 m north (block 5)."""
+    edited = buildings[buildings["id"] != "b5-0"].copy()
+    moved = edited["id"] == "b5-1"
+    edited.loc[moved, "geometry"] = edited.loc[moved].geometry.translate(0, 10)
+    return edited
+
+
+@pytest.mark.filterwarnings("error::UserWarning")
+def test_update_matches_full_recompute(grid_layers):
+    # GeoJSON-like WGS84 input, so cells go through a local projection
+    buildings, streets = (gdf.to_crs("EPSG:4326") for gdf in grid_layers)
+    edited = _edit(grid_layers[0]).to_crs("EPSG:4326")
+    previous = compute_tessellation(buildings, streets, n_jobs=1)
+
+    updated, stats = update_tessellation(
+        edited, streets, previous, removed=["b5-0"], modified=["b5-1"], n_jobs=1
+    )
+    full = compute_tessellation(edited, streets, n_jobs=1)
+
+    assert stats["mode"] == "incremental"
+    assert stats["affected_enclosures"] == 1
+    assert updated.crs.equals("EPSG:4326")
+    assert list(updated["id"]) == list(full["id"])
+    assert list(updated["building_id"]) == list(full["building_id"])
+    np.testing.assert_allclose(updated["area_m2"], full["area_m2"], rtol=1e-7)
+
+
+def test_update_endpoint(grid_layers):
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from collage_backend.main import app
+
+    buildings, streets = (gdf.to_crs("EPSG:4326") for gdf in grid_layers)
+    edited = _edit(grid_layers[0]).to_crs("EPSG:4326")
+    previous = compute_tessellation(buildings, streets, n_jobs=1)
+    response = TestClient(app).post("/tessellate/update", json={
+        "buildings": gdf_to_geojson(edited),
+        "streets": gdf_to_geojson(streets),
+        "tessellation": gdf_to_geojson(previous),
+        "removed": ["b5-0"],
+        "modified": ["b5-1"],
+        "n_jobs": 1,
+    })
+
+    assert response.status_code == 200
+    assert response.headers["X-Tessellation-Update"] == "incremental"
+    cells = {f["properties"]["id"]: f["properties"] for f in response.json()["features"]}
+    full = compute_tessellation(edited, streets, n_jobs=1)
+    assert set(cells) == set(full["id"])
+    for cell_id, area in zip(full["id"], full["area_m2"], strict=True):
+        assert cells[cell_id]["area_m2"] == pytest.approx(area, rel=1e-7)
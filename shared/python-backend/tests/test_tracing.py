@@ -0,0 +1,34 @@
+"""Span collection and Server-Timing formatting."""
+
+import pytest
+
+pytest.importorskip("starlette")
+
+from collage_backend.utils.tracing import _trace, server_timing, span, traced
+
+
+def test_spans_collected_per_request():
+    spans = []
+    token = _trace.set(spans)
+    try:
+        with span("outer", features=3), span("inner"):
+            pass
+    finally:
+        _trace.reset(token)
+
+    assert [s.name for s in spans] == ["inner", "outer"]
+    assert spans[0].parent is spans[1]
+    assert spans[1].duration >= spans[0].duration
+
+    header = server_timing(spans, total=0.5)
+    assert header.startswith('inner-0;dur=')
+    assert 'desc="outer (3 features)"' in header
+    assert header.endswith("total;dur=500.0")
+
+
+def test_traced_without_request_context():
+    @traced("double")
+    def double(x):
+        return 2 * x
+
+    assert double(4) == 8
@@ -0,0 +1,32 @@
+"""Content negotiation of request bodies (utils/transport.py)."""
+
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from shapely.geometry import box  # noqa: E402
+
+from collage_backend.main import app  # noqa: E402
+from collage_backend.utils.io import encode_layers  # noqa: E402
+from collage_backend.utils.transport import MEDIA_TYPES  # noqa: E402
+
+client = TestClient(app)
+
+
+def _buildings():
+    return gpd.GeoDataFrame(
+        {"id": ["a"]}, geometry=[box(2.16, 41.385, 2.161, 41.386)], crs="EPSG:4326"
+    )
+
+
+@pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+def test_malformed_binary_body_is_a_client_error(fmt):
+    body = encode_layers({"buildings": _buildings()}, fmt=fmt)
+    for garbage in (b"not arrow at all", body[: len(body) // 2]):
+        response = client.post(
+            "/tessellate", content=garbage, headers={"content-type": MEDIA_TYPES[fmt]}
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"].startswith(f"Malformed {fmt} body")
@@ -7,7 +7,14 @@ export interface BuildingProperties {
   height_m: number | null;
   floor_count: number | null;
   use: string | null;
-  height_source: 'osm_tag' | 'osm_levels' | 'gba_raster' | 'type_default' | null;
+  height_source:
+    | 'osm_tag'
+    | 'osm_levels'
+    | 'overture'
+    | 'gba'
+    | 'knn_imputed'
+    | 'type_default'
+    | null;
 }
 
 export type BuildingFeature = Feature<Polygon | MultiPolygon, BuildingProperties>;